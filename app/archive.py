@@ -0,0 +1,298 @@
+"""
+Retention: merged PR history moved off the database into segment files.
+
+python -m app.archive --older-than-days 180 writes merged PRs older than the
+cutoff, with their reviewers, into append-only segment files partitioned by
+merge date, then deletes the rows in batches:
+
+    ARCHIVE_DIR/2026-03-14/20261019T020000123456.seg   zlib blocks of records
+    ARCHIVE_DIR/2026-03-14/20261019T020000123456.idx   JSON: block offsets,
+                                                       reviewer -> blocks,
+                                                       author -> merged PRs
+
+A segment is never rewritten. Its index is first written as .idx.pending
+(with the archived row ids), the rows are deleted, and only then is the index
+renamed to .idx and the segment seen by readers. A run that died in between
+is rolled forward by the next one: the segment is complete, so its remaining
+rows are deleted and the index published. No history is lost or read twice.
+
+Readers (/users/getReview?include_archived=true, team_stats carry-over when an
+author changes teams) memory-map segments and decompress only the blocks the
+index points at. Indexes are immutable and cached per process.
+"""
+import argparse
+import glob
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import create_engine, delete, insert, select
+from sqlalchemy.engine import Engine
+
+from app import config
+from app.models import ArchivedPullRequest, PullRequest, User, pr_reviewers
+
+MAGIC = b"PRSEG1\n"
+BLOCK_RECORDS = 512
+# Record layout inside a block (a JSON list per record)
+FIELDS = ("pk", "pull_request_id", "pull_request_name", "author_id", "created_at", "merged_at", "reviewers")
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    """Naive timestamps (SQLite) are UTC"""
+    if value is None:
+        return None
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+
+
+def _fsync_dir(path: str):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_json(path: str, data: dict):
+    """Durably replace path with data"""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(path))
+
+
+class _SegmentWriter:
+    def __init__(self, directory: str, name: str):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, name + ".seg")
+        self._file = open(self.path + ".tmp", "wb")
+        self._file.write(MAGIC)
+        self._pending: list[list] = []
+        self.blocks: list[tuple[int, int, int]] = []
+        self.reviewers: dict[str, list[int]] = defaultdict(list)
+        self.authors: Counter[str] = Counter()
+        self.pks: list[int] = []
+
+    def add(self, record: list):
+        self._pending.append(record)
+        if len(self._pending) == BLOCK_RECORDS:
+            self._flush_block()
+
+    def _flush_block(self):
+        if not self._pending:
+            return
+        block = len(self.blocks)
+        data = zlib.compress(json.dumps(self._pending, separators=(",", ":")).encode(), 6)
+        self.blocks.append((self._file.tell(), len(data), len(self._pending)))
+        self._file.write(data)
+        for record in self._pending:
+            self.pks.append(record[0])
+            self.authors[record[3]] += 1
+            for user_id in record[6]:
+                if not self.reviewers[user_id] or self.reviewers[user_id][-1] != block:
+                    self.reviewers[user_id].append(block)
+        self._pending = []
+
+    def close(self) -> str:
+        """Make the segment durable and write its pending index; returns the index path"""
+        self._flush_block()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.path + ".tmp", self.path)
+        index_path = self.path[:-len(".seg")] + ".idx.pending"
+        _write_json(index_path, {
+            "version": 1,
+            "records": len(self.pks),
+            "blocks": self.blocks,
+            "reviewers": self.reviewers,
+            "authors": self.authors,
+            "pks": self.pks
+        })
+        return index_path
+
+
+class Segment:
+    def __init__(self, path: str, index: dict):
+        self.path = path
+        self.index = index
+
+    def records(self, blocks: Optional[Iterable[int]] = None) -> Iterator[list]:
+        """Records of some blocks (all by default), read through a read-only memory map"""
+        if blocks is None:
+            blocks = range(len(self.index["blocks"]))
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for block in blocks:
+                offset, length, _ = self.index["blocks"][block]
+                yield from json.loads(zlib.decompress(mapped[offset:offset + length]))
+
+
+class ArchiveReader:
+    """Published segments of a directory; new ones are picked up on the next call"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._segments: dict[str, Segment] = {}
+        self._lock = threading.Lock()
+
+    def segments(self) -> List[Segment]:
+        index_paths = sorted(glob.glob(os.path.join(self.directory, "*", "*.idx")))
+        with self._lock:
+            for index_path in index_paths:
+                if index_path not in self._segments:
+                    with open(index_path) as f:
+                        self._segments[index_path] = Segment(index_path[:-len(".idx")] + ".seg", json.load(f))
+            return [self._segments[index_path] for index_path in index_paths]
+
+    def reviews_of(self, user_id: str) -> List[dict]:
+        """Archived PRs a user reviewed, in getReview row shape, oldest first"""
+        found = []
+        for segment in self.segments():
+            blocks = segment.index["reviewers"].get(user_id)
+            if blocks:
+                found.extend(record for record in segment.records(blocks) if user_id in record[6])
+        found.sort(key=lambda record: record[0])
+        return [
+            {"pull_request_id": r[1], "pull_request_name": r[2], "author_id": r[3], "status": "MERGED"}
+            for r in found
+        ]
+
+    def merged_counts(self, author_ids: Iterable[str]) -> dict[str, int]:
+        """Archived PRs per author"""
+        author_ids = list(author_ids)
+        counts: Counter[str] = Counter()
+        for segment in self.segments():
+            authors = segment.index["authors"]
+            for author_id in author_ids:
+                counts[author_id] += authors.get(author_id, 0)
+        return {author_id: count for author_id, count in counts.items() if count}
+
+    def iter_records(self) -> Iterator[dict]:
+        """Every archived PR, partition by partition (e.g. for exports)"""
+        for segment in self.segments():
+            for record in segment.records():
+                yield {**dict(zip(FIELDS, record, strict=True)), "status": "MERGED"}
+
+
+reader = ArchiveReader(config.ARCHIVE_DIR)
+
+
+def _delete_rows(engine: Engine, pks: List[int], batch_size: int) -> int:
+    """Delete archived PRs and their reviewer rows, one transaction per batch.
+
+    The deleted PRs' ids are kept in archived_pull_requests in the same
+    transaction, so /pullRequest/create keeps refusing them.
+    """
+    deleted = 0
+    for start in range(0, len(pks), batch_size):
+        chunk = pks[start:start + batch_size]
+        archived = (PullRequest.id.in_(chunk), PullRequest.status == "MERGED")
+        with engine.begin() as conn:
+            deleted += conn.execute(delete(pr_reviewers).where(pr_reviewers.c.pull_request_pk.in_(chunk))).rowcount
+            conn.execute(insert(ArchivedPullRequest.__table__).from_select(
+                ["pull_request_id"], select(PullRequest.pull_request_id).where(*archived)
+            ))
+            conn.execute(delete(PullRequest.__table__).where(*archived))
+    return deleted
+
+
+def _publish(index_path: str):
+    with open(index_path) as f:
+        index = json.load(f)
+    del index["pks"]
+    _write_json(index_path[:-len(".pending")], index)
+    os.remove(index_path)
+
+
+def archive(
+    engine: Engine,
+    *,
+    older_than_days: float,
+    directory: str = None,
+    batch_size: int = 5000,
+    now: datetime = None
+) -> dict:
+    """Move merged PRs merged before now - older_than_days into segments; returns counts"""
+    directory = directory or config.ARCHIVE_DIR
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=older_than_days)
+    counts = Counter()
+
+    # Roll forward runs that stopped after writing their segments
+    for index_path in sorted(glob.glob(os.path.join(directory, "*", "*.idx.pending"))):
+        with open(index_path) as f:
+            pks = json.load(f)["pks"]
+        counts["pr_reviewers"] += _delete_rows(engine, pks, batch_size)
+        _publish(index_path)
+        counts["recovered_segments"] += 1
+
+    name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    writers: dict[str, _SegmentWriter] = {}
+    last_pk = 0
+    with engine.connect() as conn:
+        while True:
+            prs = conn.execute(
+                select(
+                    PullRequest.id, PullRequest.pull_request_id, PullRequest.pull_request_name,
+                    PullRequest.author_id, PullRequest.created_at, PullRequest.merged_at
+                ).where(
+                    PullRequest.status == "MERGED", PullRequest.merged_at < cutoff, PullRequest.id > last_pk
+                ).order_by(PullRequest.id).limit(batch_size)
+            ).all()
+            if not prs:
+                break
+            last_pk = prs[-1].id
+            reviewers = defaultdict(list)
+            for pull_request_pk, user_id in conn.execute(
+                select(pr_reviewers.c.pull_request_pk, User.user_id).join(
+                    User, User.id == pr_reviewers.c.user_pk
+                ).where(pr_reviewers.c.pull_request_pk.in_([pr.id for pr in prs]))
+            ):
+                reviewers[pull_request_pk].append(user_id)
+            for pr in prs:
+                merged_at = _isoformat(pr.merged_at)
+                partition = merged_at[:10]
+                writer = writers.get(partition)
+                if writer is None:
+                    writer = writers[partition] = _SegmentWriter(os.path.join(directory, partition), name)
+                writer.add([
+                    pr.id, pr.pull_request_id, pr.pull_request_name, pr.author_id,
+                    _isoformat(pr.created_at), merged_at, sorted(reviewers[pr.id])
+                ])
+        conn.rollback()
+
+    pending = [(writer.close(), writer.pks) for writer in writers.values()]
+    for index_path, pks in pending:
+        counts["pull_requests"] += len(pks)
+        counts["pr_reviewers"] += _delete_rows(engine, pks, batch_size)
+        _publish(index_path)
+    counts["segments"] = len(pending)
+    return dict(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move merged PR history into compressed segment files")
+    parser.add_argument("--older-than-days", type=float, required=True, help="archive PRs merged before this")
+    parser.add_argument("--dir", default=config.ARCHIVE_DIR, help="segment directory (ARCHIVE_DIR)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per read and per delete transaction")
+    args = parser.parse_args()
+
+    connect_args = {"check_same_thread": False} if config.DATABASE_URL.startswith("sqlite") else {}
+    engine = create_engine(config.DATABASE_URL, connect_args=connect_args)
+    started = time.perf_counter()
+    counts = archive(engine, older_than_days=args.older_than_days, directory=args.dir, batch_size=args.batch_size)
+    for key, count in counts.items():
+        print(f"{key:>18}: {count:>10,}")
+    print(f"Archived in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Compact in-memory index of everything reviewer selection needs per user.
+
+Holds one __slots__ record per user (surrogate pk, user_id, team, active flag,
+open-review count) grouped by team, so assign_reviewers and reassign_reviewer
+pick candidates without loading ORM objects or querying the database. The
+least loaded candidates are tried first (least_loaded_first). Each
+team's fallback teams (team_fallbacks, in priority order) are loaded with its
+roster, so a replacement search walks the whole chain from memory.
+
+The index is rebuilt at startup, updated in place by this worker's write paths
+and loaded team by team after an invalidation. Membership and activity changes
+of single users are patched in on every worker (apply_members) instead of
+reloading the team. Open-review counts of other workers' writes are picked up
+the next time the team is loaded. Users without a team are never indexed.
+"""
+import random
+import threading
+from collections import defaultdict
+from typing import Iterable, List, Mapping, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import PullRequest, Team, TeamFallback, User, pr_reviewers
+
+
+class UserRecord:
+    __slots__ = ("pk", "user_id", "team_name", "is_active", "open_reviews")
+
+    def __init__(self, pk: int, user_id: str, team_name: str, is_active: bool, open_reviews: int = 0):
+        self.pk = pk
+        self.user_id = user_id
+        self.team_name = team_name
+        self.is_active = is_active
+        self.open_reviews = open_reviews
+
+    def __repr__(self):
+        return f"UserRecord({self.user_id!r}, team={self.team_name!r}, active={self.is_active}, open={self.open_reviews})"
+
+
+class AssignmentIndex:
+    """Team -> member records, plus user_id -> record for direct lookups.
+
+    A per-team generation counter (and a global epoch for full flushes) stops a
+    load that raced with an invalidation from installing stale records.
+    """
+
+    def __init__(self):
+        self._teams: dict[str, tuple[UserRecord, ...]] = {}
+        self._users: dict[str, UserRecord] = {}
+        # Adjacency list: team -> fallback teams, highest priority first
+        self._fallbacks: dict[str, tuple[str, ...]] = {}
+        self._generations: dict[str, int] = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._users)
+
+    @staticmethod
+    def _open_review_counts(db: Session, team_names: Iterable[str] = None, user_pks: Iterable[int] = None) -> dict[int, int]:
+        query = db.query(pr_reviewers.c.user_pk, func.count())
+        if team_names is not None:
+            # From the teams' members to their reviews
+            query = query.join(User, User.id == pr_reviewers.c.user_pk).join(
+                PullRequest, PullRequest.id == pr_reviewers.c.pull_request_pk
+            ).filter(User.team_name.in_(list(team_names)), PullRequest.status == "OPEN")
+        else:
+            # From the open PRs (status index); a join lets the planner scan all of pr_reviewers
+            open_prs = select(PullRequest.id).where(PullRequest.status == "OPEN")
+            query = query.filter(pr_reviewers.c.pull_request_pk.in_(open_prs))
+        if user_pks is not None:
+            query = query.filter(pr_reviewers.c.user_pk.in_(list(user_pks)))
+        return dict(query.group_by(pr_reviewers.c.user_pk).all())
+
+    @classmethod
+    def load_members(cls, db: Session, user_ids: Iterable[str]) -> List[tuple]:
+        """Current (pk, user_id, team_name, is_active, open_reviews) of some users, for apply_members"""
+        rows = db.query(User.id, User.user_id, User.team_name, User.is_active).filter(
+            User.user_id.in_(list(user_ids))
+        ).all()
+        counts = cls._open_review_counts(db, user_pks=[row.id for row in rows])
+        return [(pk, user_id, team_name, is_active, counts.get(pk, 0)) for pk, user_id, team_name, is_active in rows]
+
+    @staticmethod
+    def _fallback_rows(db: Session, team_names: Iterable[str] = None) -> dict[str, list[str]]:
+        query = db.query(TeamFallback.team_name, TeamFallback.fallback_team)
+        if team_names is not None:
+            query = query.filter(TeamFallback.team_name.in_(list(team_names)))
+        fallbacks = defaultdict(list)
+        for team_name, fallback_team in query.order_by(TeamFallback.team_name, TeamFallback.priority):
+            fallbacks[team_name].append(fallback_team)
+        return fallbacks
+
+    def _install(
+        self,
+        teams: dict[str, list[UserRecord]],
+        fallbacks: dict[str, list[str]],
+        epoch: int,
+        generations: dict[str, int]
+    ):
+        with self._lock:
+            if self._epoch != epoch:
+                return
+            for team_name, records in teams.items():
+                if self._generations.get(team_name, 0) != generations.get(team_name, 0):
+                    continue
+                for old in self._teams.get(team_name, ()):
+                    if self._users.get(old.user_id) is old:
+                        del self._users[old.user_id]
+                self._teams[team_name] = tuple(records)
+                self._fallbacks[team_name] = tuple(fallbacks.get(team_name, ()))
+                for record in records:
+                    self._users[record.user_id] = record
+
+    def rebuild(self, db: Session) -> int:
+        """Load every team with four queries; returns the number of teams"""
+        epoch, generations = self._epoch, dict(self._generations)
+        counts = self._open_review_counts(db)
+        teams: dict[str, list[UserRecord]] = {team_name: [] for (team_name,) in db.query(Team.team_name)}
+        rows = db.query(User.id, User.user_id, User.team_name, User.is_active).order_by(User.user_id)
+        for pk, user_id, team_name, is_active in rows:
+            if team_name is None:
+                continue
+            teams.setdefault(team_name, []).append(
+                UserRecord(pk, user_id, team_name, is_active, counts.get(pk, 0))
+            )
+        self._install(teams, self._fallback_rows(db), epoch, generations)
+        return len(teams)
+
+    def _load_teams(self, db: Session, team_names: List[str]) -> dict[str, tuple[UserRecord, ...]]:
+        """Load some teams with three queries, whatever their number"""
+        epoch, generations = self._epoch, dict(self._generations)
+        counts = self._open_review_counts(db, team_names)
+        rows = db.query(User.id, User.user_id, User.team_name, User.is_active).filter(
+            User.team_name.in_(team_names)
+        ).order_by(User.user_id)
+        teams: dict[str, list[UserRecord]] = {team_name: [] for team_name in team_names}
+        for pk, user_id, team_name, is_active in rows:
+            teams[team_name].append(UserRecord(pk, user_id, team_name, is_active, counts.get(pk, 0)))
+        self._install(teams, self._fallback_rows(db, team_names), epoch, generations)
+        return {team_name: tuple(records) for team_name, records in teams.items()}
+
+    def _load_team(self, db: Session, team_name: str) -> tuple[UserRecord, ...]:
+        return self._load_teams(db, [team_name])[team_name]
+
+    def team_members(self, db: Session, team_name: Optional[str]) -> tuple[UserRecord, ...]:
+        if team_name is None:
+            return ()
+        members = self._teams.get(team_name)
+        if members is None:
+            members = self._load_team(db, team_name)
+        return members
+
+    def get_user(self, db: Session, user_id: str) -> Optional[UserRecord]:
+        record = self._users.get(user_id)
+        if record is not None:
+            return record
+        row = db.query(User.id, User.team_name, User.is_active).filter(User.user_id == user_id).first()
+        if row is None:
+            return None
+        if row.team_name is None:
+            return UserRecord(row.id, user_id, None, row.is_active)
+        return next((r for r in self._load_team(db, row.team_name) if r.user_id == user_id), None)
+
+    def active_candidates(self, db: Session, team_name: str, exclude_user_ids: Iterable[str] = ()) -> List[str]:
+        """Active member ids of a team, minus the excluded ones"""
+        return [
+            record.user_id for record in self.team_members(db, team_name)
+            if record.is_active and record.user_id not in exclude_user_ids
+        ]
+
+    def fallback_teams(self, db: Session, team_name: str) -> tuple[str, ...]:
+        fallbacks = self._fallbacks.get(team_name)
+        if fallbacks is None:
+            self._load_team(db, team_name)
+            fallbacks = self._fallbacks.get(team_name, ())
+        return fallbacks
+
+    def candidate_pool(
+        self, db: Session, team_name: str, exclude_user_ids: Iterable[str] = ()
+    ) -> List[tuple[str, List[str]]]:
+        """(team_name, active candidates) of a team, then of its fallback teams by priority.
+
+        Teams of the chain that aren't loaded yet are loaded together, so the
+        search costs at most one round of queries.
+        """
+        if team_name is None:
+            return []
+        chain = list(dict.fromkeys([team_name, *self.fallback_teams(db, team_name)]))
+        missing = [t for t in chain if t not in self._teams]
+        loaded = self._load_teams(db, missing) if missing else {}
+        return [
+            (t, [
+                record.user_id for record in self._teams.get(t, loaded.get(t, ()))
+                if record.is_active and record.user_id not in exclude_user_ids
+            ])
+            for t in chain
+        ]
+
+    def least_loaded_first(self, user_ids: Iterable[str], pending: Mapping[str, int] = None) -> List[str]:
+        """Candidates by open-review count (plus pending, not yet committed ones), ties in random order"""
+        user_ids = list(user_ids)
+        random.shuffle(user_ids)
+        users, pending = self._users, pending or {}
+        return sorted(
+            user_ids,
+            key=lambda user_id: getattr(users.get(user_id), "open_reviews", 0) + pending.get(user_id, 0)
+        )
+
+    def add_open_reviews(self, user_ids: Iterable[str], delta: int):
+        """Apply a committed change in open-review counts to loaded records.
+
+        Not clamped at zero: deltas are applied after commit, so one transaction's
+        release can arrive before another's assignment of the same reviewer. They
+        add up to the right count in any order; a count briefly below zero only
+        sorts that reviewer first.
+        """
+        with self._lock:
+            for user_id in user_ids:
+                record = self._users.get(user_id)
+                if record is not None:
+                    record.open_reviews += delta
+
+    def apply_members(self, members: Iterable[tuple]):
+        """Apply committed (pk, user_id, team_name, is_active, open_reviews) states in place.
+
+        Loaded teams get their member tuples patched rather than reloaded, so a
+        membership change costs O(changed members); unloaded teams stay unloaded.
+        """
+        with self._lock:
+            leaving: dict[str, set[str]] = defaultdict(set)
+            joining: dict[str, list[UserRecord]] = defaultdict(list)
+            for pk, user_id, team_name, is_active, open_reviews in members:
+                old = self._users.pop(user_id, None)
+                if old is not None:
+                    leaving[old.team_name].add(user_id)
+                if team_name is not None:
+                    joining[team_name].append(UserRecord(pk, user_id, team_name, is_active, open_reviews))
+
+            for team_name in leaving.keys() | joining.keys():
+                # A load that started before this change must not install its result
+                self._generations[team_name] = self._generations.get(team_name, 0) + 1
+                current = self._teams.get(team_name)
+                if current is None:
+                    continue
+                replaced = leaving[team_name] | {record.user_id for record in joining[team_name]}
+                records = [record for record in current if record.user_id not in replaced]
+                records.extend(joining[team_name])
+                records.sort(key=lambda record: record.user_id)
+                self._teams[team_name] = tuple(records)
+                for record in joining[team_name]:
+                    self._users[record.user_id] = record
+
+    def invalidate(self, team_name: Optional[str]):
+        with self._lock:
+            if team_name is None:
+                self._teams.clear()
+                self._users.clear()
+                self._fallbacks.clear()
+                self._epoch += 1
+                return
+            for record in self._teams.pop(team_name, ()):
+                if self._users.get(record.user_id) is record:
+                    del self._users[record.user_id]
+            self._fallbacks.pop(team_name, None)
+            self._generations[team_name] = self._generations.get(team_name, 0) + 1
+
+    def clear(self):
+        self.invalidate(None)
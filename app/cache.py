@@ -0,0 +1,60 @@
+import json
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app import config
+from app.assignment_index import AssignmentIndex
+from app.invalidation import bus
+from app.response_cache import TeamResponseCache
+
+# Per-worker caches; "team" events drop a team's entries everywhere, "member"
+# events patch single users in
+assignment_index = AssignmentIndex()
+bus.subscribe("team", assignment_index.invalidate)
+team_responses = TeamResponseCache(config.TEAM_RESPONSE_CACHE_BYTES)
+bus.subscribe("team", team_responses.invalidate)
+
+
+def _apply_members(payload: Optional[str]):
+    if payload is None:
+        # Flush of member events only (one was too long); FLUSH_ALL gets here after "team" too
+        assignment_index.invalidate(None)
+        team_responses.invalidate(None)
+        return
+    members = json.loads(payload)
+    assignment_index.apply_members(members)
+    team_responses.apply_members(members)
+
+
+bus.subscribe("member", _apply_members)
+
+
+def invalidate_teams(*team_names: Optional[str]):
+    """Publish team changes to this and every other worker (call after commit)"""
+    for team_name in set(team_names) - {None}:
+        bus.publish("team", team_name)
+
+
+def publish_members(db: Session, user_ids: Iterable[str]):
+    """Publish the committed team and active flag of users to every worker (call after commit)"""
+    for payload in _member_payloads(assignment_index.load_members(db, user_ids)):
+        bus.publish("member", payload)
+
+
+def _member_payloads(members: list) -> Iterator[str]:
+    """JSON arrays of members, split so that each event fits the bus payload limit"""
+    budget = bus.key_budget("member")
+    chunk, size = [], 2
+    for member in members:
+        encoded = json.dumps(member, separators=(",", ":"))
+        # The array travels as a string inside the event JSON, so count its quotes escaped;
+        # +1 for the separating comma
+        cost = len(json.dumps(encoded)) - 2 + 1
+        if chunk and size + cost > budget:
+            yield f"[{','.join(chunk)}]"
+            chunk, size = [], 2
+        chunk.append(encoded)
+        size += cost
+    if chunk:
+        yield f"[{','.join(chunk)}]"
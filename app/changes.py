@@ -0,0 +1,139 @@
+"""
+Append-only change feed for downstream consumers.
+
+Service write paths add their entries to the session before committing, so an
+entry exists exactly when its mutation does. Consumers page through
+GET /changes?since=<cursor> and only ever fetch deltas.
+
+The cursor is not the insert id: ids are taken when a transaction writes, so a
+slow transaction (a bulk merge waiting on row locks) can commit an id below
+one a consumer has already passed. Entries are inserted without a cursor and
+the feed hands them out in the order it first sees them committed: sequence()
+numbers every committed, unnumbered entry above the current maximum under a
+lock, so a number, once visible, never has a smaller one appear after it.
+
+Retention is bounded by compaction: entries older than the retention window
+are dropped unless they are still the latest entry of their entity, so a
+consumer starting from cursor 0 still ends up with the current state of
+everything while the log grows with the number of entities, not writes.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, text, update
+from sqlalchemy.orm import Session
+
+from app import config
+from app.database import SessionLocal
+from app.models import ChangeLogEntry
+
+logger = logging.getLogger(__name__)
+
+MAX_LIMIT = 1000
+# pg_advisory_xact_lock key serializing sequence() across workers
+SEQUENCE_LOCK = 0x6368616E6765
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def record(db: Session, entity: str, entity_id: str, event: str, data: dict):
+    """Add a change entry to the current transaction (does not commit)"""
+    db.add(ChangeLogEntry(
+        entity=entity,
+        entity_id=entity_id,
+        event=event,
+        payload=json.dumps(data, default=_default),
+        created_at=datetime.now(timezone.utc)
+    ))
+
+
+def sequence(db: Session) -> int:
+    """Number committed entries that have no cursor yet, in id order; commits"""
+    if db.get_bind().dialect.name == "postgresql":
+        # SQLite serializes writers anyway
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SEQUENCE_LOCK})
+    pending = db.query(ChangeLogEntry.id).filter(
+        ChangeLogEntry.seq.is_(None)
+    ).order_by(ChangeLogEntry.id).all()
+    if pending:
+        last = db.query(func.max(ChangeLogEntry.seq)).scalar() or 0
+        db.execute(update(ChangeLogEntry), [
+            {"id": entry_id, "seq": last + n}
+            for n, (entry_id,) in enumerate(pending, 1)
+        ])
+    db.commit()
+    return len(pending)
+
+
+def get_changes(db: Session, since: int = 0, limit: int = 100) -> dict:
+    sequence(db)
+    entries = db.query(ChangeLogEntry).filter(
+        ChangeLogEntry.seq > since
+    ).order_by(ChangeLogEntry.seq).limit(limit + 1).all()
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    return {
+        "changes": [
+            {
+                "cursor": entry.seq,
+                "entity": entry.entity,
+                "entity_id": entry.entity_id,
+                "event": entry.event,
+                "data": json.loads(entry.payload),
+                "createdAt": entry.created_at
+            }
+            for entry in entries
+        ],
+        "next_cursor": entries[-1].seq if entries else since,
+        "has_more": has_more
+    }
+
+
+def compact(db: Session, retention: timedelta, now: Optional[datetime] = None) -> int:
+    """Drop superseded entries older than the retention; returns the number deleted"""
+    # Number what no consumer has read yet, or an unread log would never shrink
+    sequence(db)
+    horizon = (now or datetime.now(timezone.utc)) - retention
+    latest = db.query(func.max(ChangeLogEntry.seq)).filter(
+        ChangeLogEntry.seq.isnot(None)
+    ).group_by(ChangeLogEntry.entity, ChangeLogEntry.entity_id)
+    # Entries committed since sequence() are newer than any numbered one
+    deleted = db.query(ChangeLogEntry).filter(
+        ChangeLogEntry.created_at < horizon,
+        ChangeLogEntry.seq.isnot(None),
+        ChangeLogEntry.seq.notin_(latest.scalar_subquery())
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def _compact_once() -> int:
+    db = SessionLocal()
+    try:
+        return compact(db, timedelta(hours=config.CHANGE_LOG_RETENTION_HOURS))
+    finally:
+        db.close()
+
+
+async def run_compaction():
+    """Background loop started by the lifespan hook of every worker"""
+    if config.CHANGE_LOG_COMPACT_INTERVAL_S <= 0:
+        return
+    while True:
+        await asyncio.sleep(config.CHANGE_LOG_COMPACT_INTERVAL_S)
+        try:
+            deleted = await run_in_threadpool(_compact_once)
+        except Exception:
+            logger.exception("Change log compaction failed")
+            continue
+        if deleted:
+            logger.info("Change log compaction removed %d entries", deleted)
@@ -0,0 +1,84 @@
+"""
+Negotiated gzip for response bodies.
+
+A body of at least RESPONSE_COMPRESSION_MIN_BYTES is gzipped when the request's
+Accept-Encoding allows it; smaller ones are not worth the CPU and the header
+bytes. Only complete bodies are compressed: a streamed response (the SSE review
+stream) passes through as is, so events are never held in a compressor buffer.
+Responses that already carry Content-Encoding (pre-compressed /team/get cache
+entries) pass through too.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app import config
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether an Accept-Encoding value allows gzip (explicitly or via *), honouring q=0"""
+    wildcard = False
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        coding = coding.lower()
+        if coding in ("gzip", "x-gzip"):
+            return quality > 0
+        if coding == "*":
+            wildcard = quality > 0
+    return wildcard
+
+
+def should_compress(size: int) -> bool:
+    return config.RESPONSE_COMPRESSION_LEVEL > 0 and size >= config.RESPONSE_COMPRESSION_MIN_BYTES
+
+
+def gzip(body: bytes) -> bytes:
+    # wbits=31: gzip container, without gzip.GzipFile's extra copies
+    compressor = zlib.compressobj(config.RESPONSE_COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+class CompressionMiddleware:
+    """Pure ASGI middleware: holds the response start until the first body chunk is known"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or config.RESPONSE_COMPRESSION_LEVEL <= 0:
+            await self.app(scope, receive, send)
+            return
+        gzip_ok = accepts_gzip(Headers(scope=scope).get("accept-encoding"))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            held, start = start, None
+            headers = MutableHeaders(raw=held["headers"])
+            body = message.get("body", b"")
+            if not message.get("more_body", False) and "content-encoding" not in headers and should_compress(len(body)):
+                headers.add_vary_header("Accept-Encoding")
+                if gzip_ok:
+                    body = gzip(body)
+                    headers["Content-Encoding"] = "gzip"
+                    headers["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+            await send(held)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -5,6 +5,22 @@ class ServiceException(Exception):
         super().__init__(message)
 
 
+CONFLICT_CODES = {
+    "PR_EXISTS", "TEAM_EXISTS", "PR_MERGED", "NOT_ASSIGNED", "NO_CANDIDATE", "PROFILER_RUNNING",
+    "IDEMPOTENCY_IN_PROGRESS"
+}
+
+
+def http_status(exc: ServiceException) -> int:
+    if exc.code == "NOT_FOUND":
+        return 404
+    if exc.code == "FORBIDDEN":
+        return 403
+    if exc.code in CONFLICT_CODES:
+        return 409
+    return 400
+
+
 class TeamExistsError(ServiceException):
     def __init__(self, message: str):
         super().__init__("TEAM_EXISTS", message)
@@ -44,3 +60,27 @@ class NoCandidateError(ServiceException):
     def __init__(self, message: str):
         super().__init__("NO_CANDIDATE", message)
 
+
+class InvalidFallbackError(ServiceException):
+    def __init__(self, message: str):
+        super().__init__("INVALID_FALLBACK", message)
+
+
+class ForbiddenError(ServiceException):
+    def __init__(self, message: str):
+        super().__init__("FORBIDDEN", message)
+
+
+class ProfilerRunningError(ServiceException):
+    def __init__(self, message: str):
+        super().__init__("PROFILER_RUNNING", message)
+
+
+class IdempotencyKeyReusedError(ServiceException):
+    def __init__(self, message: str):
+        super().__init__("IDEMPOTENCY_KEY_REUSED", message)
+
+
+class IdempotencyInProgressError(ServiceException):
+    def __init__(self, message: str):
+        super().__init__("IDEMPOTENCY_IN_PROGRESS", message)
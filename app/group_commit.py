@@ -0,0 +1,87 @@
+"""
+Group commit for PR creation bursts.
+
+The first request to arrive opens a batch and starts its flush task: the task
+waits up to the configured window (or until the batch is full), creates every
+collected PR in one transaction on its own session and hands each waiting
+request its individual result or error. At peak this trades a few milliseconds
+of latency for one commit (and one fsync) per batch instead of one per PR.
+"""
+import asyncio
+from typing import Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app import config, services
+from app.database import SessionLocal
+
+
+class _Batch:
+    def __init__(self):
+        self.items: list[tuple[str, str, str]] = []
+        self.futures: list[asyncio.Future] = []
+        self.full = asyncio.Event()
+
+
+class GroupCommitter:
+    def __init__(self, window_ms: float, max_batch: int, session_factory: Callable[[], Session] = SessionLocal):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.session_factory = session_factory
+        self._batch: Optional[_Batch] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    async def create_pull_request(self, pull_request_id: str, pull_request_name: str, author_id: str) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        batch = self._batch
+        if batch is None:
+            batch = self._batch = _Batch()
+            # The flush runs in its own task so a disconnecting client can't strand the batch
+            task = asyncio.create_task(self._flush(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        batch.items.append((pull_request_id, pull_request_name, author_id))
+        batch.futures.append(future)
+        if len(batch.items) >= self.max_batch:
+            # Seal it: later arrivals start a new batch
+            self._batch = None
+            batch.full.set()
+
+        return await future
+
+    async def _flush(self, batch: _Batch):
+        try:
+            await asyncio.wait_for(batch.full.wait(), timeout=self.window)
+        except TimeoutError:
+            pass
+        if self._batch is batch:
+            self._batch = None
+
+        try:
+            results = await run_in_threadpool(self._create, batch.items)
+        except Exception as exc:
+            results = [exc] * len(batch.items)
+
+        for future, result in zip(batch.futures, results, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _create(self, items: list[tuple[str, str, str]]) -> list:
+        db = self.session_factory()
+        try:
+            return services.create_pull_requests(db, items)
+        finally:
+            db.close()
+
+
+create_committer = GroupCommitter(config.PR_CREATE_BATCH_WINDOW_MS, config.PR_CREATE_BATCH_MAX)
@@ -0,0 +1,187 @@
+"""
+Idempotency-Key support for write endpoints that clients retry.
+
+The first request with a key inserts a placeholder row (committed before any
+work starts), runs, and stores its status code and encoded body. A repeat
+with the same key and the same request is answered from that row: one primary
+key lookup, no service call. A repeat arriving while the first request still
+runs polls the row until the response is stored, and gives up with
+IDEMPOTENCY_IN_PROGRESS after IDEMPOTENCY_WAIT_S.
+
+Service errors are responses too and are replayed. Anything else (a crash, a
+database outage) drops the placeholder so the retry runs again. A placeholder
+whose request died without either is taken over once its lease runs out.
+Rows expire after IDEMPOTENCY_TTL_HOURS and are purged in the background.
+The table is shared, so repeats are caught whichever worker they reach.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import config
+from app.database import SessionLocal
+from app.exceptions import (
+    IdempotencyInProgressError,
+    IdempotencyKeyReusedError,
+    ServiceException,
+    http_status,
+)
+from app.models import IdempotencyKey
+from app.rollups import as_utc
+
+logger = logging.getLogger(__name__)
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def fingerprint(endpoint: str, payload: BaseModel) -> str:
+    return hashlib.sha256(f"{endpoint}\n{payload.model_dump_json()}".encode()).hexdigest()
+
+
+def claim(db: Session, key: str, request_fingerprint: str, now: Optional[datetime] = None) -> Optional[IdempotencyKey]:
+    """Take the key: None if this request now owns it, else the row of the request that does"""
+    now = now or datetime.now(timezone.utc)
+    lease = {
+        "fingerprint": request_fingerprint,
+        "status_code": None,
+        "body": None,
+        "locked_until": now + timedelta(seconds=config.IDEMPOTENCY_LEASE_S),
+        "expires_at": now + timedelta(hours=config.IDEMPOTENCY_TTL_HOURS)
+    }
+    while True:
+        row = db.query(IdempotencyKey).filter(IdempotencyKey.key == key).populate_existing().first()
+        if row is None:
+            db.add(IdempotencyKey(key=key, **lease))
+            try:
+                db.commit()
+                return None
+            except IntegrityError:
+                # A concurrent first request got there first
+                db.rollback()
+                continue
+
+        expired = as_utc(row.expires_at) <= now
+        if not expired and row.fingerprint != request_fingerprint:
+            raise IdempotencyKeyReusedError("Idempotency-Key was already used for a different request")
+        abandoned = row.status_code is None and as_utc(row.locked_until) <= now
+        if not (expired or abandoned):
+            return row
+
+        # Compare-and-set on the lease, so only one repeat takes it over
+        if row.locked_until is None:
+            same_lease = IdempotencyKey.locked_until.is_(None)
+        else:
+            same_lease = IdempotencyKey.locked_until == row.locked_until
+        taken = db.query(IdempotencyKey).filter(
+            IdempotencyKey.key == key, same_lease, IdempotencyKey.expires_at == row.expires_at
+        ).update(lease, synchronize_session=False)
+        db.commit()
+        if taken:
+            return None
+
+
+def complete(db: Session, key: str, status_code: int, body: bytes):
+    db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update(
+        {IdempotencyKey.status_code: status_code, IdempotencyKey.body: body.decode(), IdempotencyKey.locked_until: None},
+        synchronize_session=False
+    )
+    db.commit()
+
+
+def release(db: Session, key: str):
+    """Give the key back after a failure that must not be replayed"""
+    try:
+        db.rollback()
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)
+        ).delete(synchronize_session=False)
+        db.commit()
+    except Exception:
+        # The lease runs out instead
+        logger.exception("Could not release idempotency key %r", key)
+
+
+def _replay(row: IdempotencyKey) -> Response:
+    return Response(
+        row.body, status_code=row.status_code, media_type="application/json", headers={REPLAYED_HEADER: "true"}
+    )
+
+
+async def run(
+    db: Session,
+    key: Optional[str],
+    endpoint: str,
+    payload: BaseModel,
+    call: Callable[[], Awaitable],
+    status_code: int = 200
+):
+    """Run an endpoint body once per Idempotency-Key; without a key just run it"""
+    if key is None:
+        return await call()
+
+    request_fingerprint = fingerprint(endpoint, payload)
+    deadline = time.monotonic() + config.IDEMPOTENCY_WAIT_S
+    delay = 0.01
+    while (row := claim(db, key, request_fingerprint)) is not None:
+        if row.status_code is not None:
+            return _replay(row)
+        if time.monotonic() >= deadline:
+            raise IdempotencyInProgressError("A request with this Idempotency-Key is still running")
+        # Don't sit in a transaction while waiting
+        db.rollback()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.2)
+
+    try:
+        content = jsonable_encoder(await call())
+    except ServiceException as exc:
+        db.rollback()
+        status_code = http_status(exc)
+        content = {"error": {"code": exc.code, "message": exc.message}}
+    except BaseException:
+        release(db, key)
+        raise
+    body = JSONResponse(content).body
+    complete(db, key, status_code, body)
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+def purge_expired(db: Session, now: Optional[datetime] = None) -> int:
+    deleted = db.query(IdempotencyKey).filter(
+        IdempotencyKey.expires_at <= (now or datetime.now(timezone.utc))
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def _purge_once() -> int:
+    db = SessionLocal()
+    try:
+        return purge_expired(db)
+    finally:
+        db.close()
+
+
+async def run_purge():
+    """Background loop started by the lifespan hook of every worker"""
+    if config.IDEMPOTENCY_PURGE_INTERVAL_S <= 0:
+        return
+    while True:
+        await asyncio.sleep(config.IDEMPOTENCY_PURGE_INTERVAL_S)
+        try:
+            deleted = await run_in_threadpool(_purge_once)
+        except Exception:
+            logger.exception("Idempotency key purge failed")
+            continue
+        if deleted:
+            logger.info("Idempotency key purge removed %d keys", deleted)
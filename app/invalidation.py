@@ -0,0 +1,285 @@
+"""
+Cross-process cache invalidation bus.
+
+Every worker keeps its own in-process caches. Write paths publish an event
+after commit; the event is applied to the local caches immediately and fanned
+out to every other worker through a transport:
+
+- PostgresTransport: LISTEN/NOTIFY on a dedicated connection (multi-host)
+- LocalSocketTransport: one unix datagram socket per worker in a shared
+  directory (single host, tests)
+
+An event too long for the transport goes out as a flush of its kind (key None)
+instead. If sending fails, peers are sent FLUSH_ALL as soon as the transport
+works again, retried in the background, so no worker keeps stale caches
+because one event was lost.
+"""
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import uuid
+from collections import defaultdict
+from typing import Callable, Optional
+
+from sqlalchemy.engine import make_url
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# Delivered when a transport may have missed events (e.g. after reconnect)
+FLUSH_ALL = "*"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_EVENT_BYTES = 7999
+# Delay between attempts to deliver FLUSH_ALL after a failed publish
+FLUSH_RETRY_S = 1.0
+
+
+class PostgresTransport:
+    def __init__(self, database_url: str, channel: str):
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self._send_conn = None
+        self._send_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self):
+        import psycopg2
+
+        conn = psycopg2.connect(self.dsn)
+        conn.autocommit = True
+        return conn
+
+    def start(self, deliver: Callable[[str], None]):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, args=(deliver,), daemon=True)
+        self._thread.start()
+
+    def _listen(self, deliver: Callable[[str], None]):
+        while not self._stopped.is_set():
+            try:
+                conn = self._connect()
+                conn.cursor().execute(f'LISTEN "{self.channel}"')
+                while not self._stopped.is_set():
+                    if select.select([conn], [], [], 0.5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        deliver(conn.notifies.pop(0).payload)
+                conn.close()
+            except Exception:
+                logger.exception("Invalidation listener lost its connection, reconnecting")
+                # Anything published while we were away is lost
+                deliver(json.dumps({"origin": None, "kind": FLUSH_ALL, "key": None}))
+                self._stopped.wait(1.0)
+
+    def send(self, payload: str):
+        with self._send_lock:
+            # A connection dropped since the last event is replaced once; then the error is raised
+            for attempt in range(2):
+                try:
+                    if self._send_conn is None or self._send_conn.closed:
+                        self._send_conn = self._connect()
+                    self._send_conn.cursor().execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+                    return
+                except Exception:
+                    if self._send_conn is not None:
+                        self._send_conn.close()
+                    self._send_conn = None
+                    if attempt:
+                        raise
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._send_conn is not None:
+            self._send_conn.close()
+            self._send_conn = None
+
+
+class LocalSocketTransport:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._send_sock: Optional[socket.socket] = None
+        self._send_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, deliver: Callable[[str], None]):
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.sock")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.settimeout(0.5)
+        self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, args=(deliver,), daemon=True)
+        self._thread.start()
+
+    def _listen(self, deliver: Callable[[str], None]):
+        while not self._stopped.is_set():
+            try:
+                data = self._sock.recv(65536)
+            except OSError:  # includes the recv timeout (TimeoutError)
+                continue
+            if data:
+                deliver(data.decode())
+
+    def send(self, payload: str):
+        data = payload.encode()
+        failed = []
+        with self._send_lock:
+            for name in os.listdir(self.directory):
+                peer = os.path.join(self.directory, name)
+                if not name.endswith(".sock") or peer == self.path:
+                    continue
+                try:
+                    self._send_sock.sendto(data, peer)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker exited without cleaning up
+                    try:
+                        os.unlink(peer)
+                    except FileNotFoundError:
+                        pass
+                except OSError:
+                    logger.exception("Failed to publish invalidation event to %s", peer)
+                    failed.append(peer)
+        if failed:
+            raise OSError(f"Invalidation event not delivered to {len(failed)} workers")
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            # Wake the listener up instead of waiting for its recv timeout
+            try:
+                self._send_sock.sendto(b"", self.path)
+            except OSError:
+                pass
+            self._thread.join(timeout=2)
+        for sock in (self._sock, self._send_sock):
+            if sock is not None:
+                sock.close()
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = self._send_sock = None
+
+
+class InvalidationBus:
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._handlers: dict[str, list[Callable[[Optional[str]], None]]] = defaultdict(list)
+        self._transport = None
+        self._send_lock = threading.Lock()
+        self._flush_pending = False
+        self._retry: Optional[threading.Timer] = None
+
+    def subscribe(self, kind: str, handler: Callable[[Optional[str]], None]):
+        """Register a local handler; FLUSH_ALL events call it with key None"""
+        self._handlers[kind].append(handler)
+
+    def _encode(self, kind: str, key: Optional[str]) -> str:
+        # ASCII only (ensure_ascii), so characters are bytes
+        return json.dumps({"origin": self.origin, "kind": kind, "key": key})
+
+    def key_budget(self, kind: str) -> int:
+        """Longest key, counted as escaped inside the event, that fits in MAX_EVENT_BYTES"""
+        return MAX_EVENT_BYTES - len(self._encode(kind, ""))
+
+    def publish(self, kind: str, key: str):
+        self._dispatch(kind, key)
+        if self._transport is None:
+            return
+        payload = self._encode(kind, key)
+        if len(payload) > MAX_EVENT_BYTES:
+            logger.warning("Invalidation event of %d bytes is too long, flushing %r on peers", len(payload), kind)
+            payload = self._encode(kind, None)
+        self._send(payload)
+
+    def _send(self, payload: str):
+        with self._send_lock:
+            transport = self._transport
+            if transport is None:
+                return
+            try:
+                if self._flush_pending:
+                    transport.send(self._encode(FLUSH_ALL, None))
+                    self._flush_pending = False
+                transport.send(payload)
+            except Exception:
+                logger.exception("Failed to publish invalidation event, peers will be flushed")
+                self._flush_pending = True
+                self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._retry is None:
+            self._retry = threading.Timer(FLUSH_RETRY_S, self._retry_flush)
+            self._retry.daemon = True
+            self._retry.start()
+
+    def _retry_flush(self):
+        with self._send_lock:
+            self._retry = None
+            if not self._flush_pending or self._transport is None:
+                return
+            try:
+                self._transport.send(self._encode(FLUSH_ALL, None))
+                self._flush_pending = False
+            except Exception:
+                logger.warning("Invalidation bus still failing, retrying flush in %.1fs", FLUSH_RETRY_S)
+                self._schedule_flush()
+
+    def _dispatch(self, kind: str, key: Optional[str]):
+        if kind == FLUSH_ALL:
+            for handlers in self._handlers.values():
+                for handler in handlers:
+                    handler(None)
+            return
+        for handler in self._handlers.get(kind, []):
+            handler(key)
+
+    def _receive(self, payload: str):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed invalidation event: %r", payload)
+            return
+        if event.get("origin") == self.origin:
+            return
+        self._dispatch(event["kind"], event.get("key"))
+
+    def start(self, transport=None):
+        if transport is None:
+            transport = create_transport()
+        if transport is None:
+            return
+        self._transport = transport
+        transport.start(self._receive)
+
+    def stop(self):
+        with self._send_lock:
+            transport, self._transport = self._transport, None
+            if self._retry is not None:
+                self._retry.cancel()
+                self._retry = None
+            self._flush_pending = False
+        if transport is not None:
+            transport.stop()
+
+
+def create_transport():
+    if config.INVALIDATION_BUS == "postgres":
+        return PostgresTransport(config.DATABASE_URL, config.INVALIDATION_CHANNEL)
+    if config.INVALIDATION_BUS == "local":
+        return LocalSocketTransport(config.INVALIDATION_SOCKET_DIR)
+    return None
+
+
+bus = InvalidationBus()
@@ -0,0 +1,75 @@
+"""
+Request-scoped batching loader for users and PRs (DataLoader-style).
+
+get_db opens one session per request; the loader lives in that session's info
+dict. Lookups by public id are memoized for the rest of the request's
+transaction, and every miss in a call is fetched with a single IN query.
+Objects loaded elsewhere (locked rows, eager-loaded reviewers) are primed in so
+later lookups reuse them. Commit and rollback drop the memo: other writers may
+change rows once the transaction ends, and objects created in a rolled back one
+are gone. Misses are not memoized, so rows created later in the request are
+found.
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+
+from app.models import PullRequest, User
+
+
+class Loader:
+    def __init__(self, db: Session):
+        self.db = db
+        self._users: dict[str, User] = {}
+        self._prs: dict[str, PullRequest] = {}
+
+    def prime(self, *objects):
+        for obj in objects:
+            if isinstance(obj, User):
+                self._users[obj.user_id] = obj
+            elif isinstance(obj, PullRequest):
+                self._prs[obj.pull_request_id] = obj
+
+    def users(self, user_ids: Iterable[str]) -> dict[str, User]:
+        """Found users by user_id, in the order asked"""
+        user_ids = list(dict.fromkeys(user_ids))
+        missing = [user_id for user_id in user_ids if user_id not in self._users]
+        if missing:
+            self.prime(*self.db.query(User).filter(User.user_id.in_(missing)))
+        return {user_id: self._users[user_id] for user_id in user_ids if user_id in self._users}
+
+    def user(self, user_id: str) -> Optional[User]:
+        return self.users([user_id]).get(user_id)
+
+    def prs(self, pull_request_ids: Iterable[str], refresh: bool = False) -> dict[str, PullRequest]:
+        """Found PRs by id with author and reviewers loaded; refresh reloads memoized ones too"""
+        pull_request_ids = list(dict.fromkeys(pull_request_ids))
+        missing = pull_request_ids if refresh else [i for i in pull_request_ids if i not in self._prs]
+        if missing:
+            query = self.db.query(PullRequest).options(
+                joinedload(PullRequest.author),
+                joinedload(PullRequest.assigned_reviewers)
+            ).filter(PullRequest.pull_request_id.in_(missing))
+            if refresh:
+                query = query.populate_existing()
+            for pr in query:
+                self.prime(pr, pr.author, *pr.assigned_reviewers)
+        return {i: self._prs[i] for i in pull_request_ids if i in self._prs}
+
+
+def get_loader(db: Session) -> Loader:
+    loader = db.info.get("loader")
+    if loader is None:
+        loader = db.info["loader"] = Loader(db)
+    return loader
+
+
+@event.listens_for(Session, "after_commit")
+def _forget(session: Session):
+    session.info.pop("loader", None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_rolled_back(session: Session, previous_transaction):
+    session.info.pop("loader", None)
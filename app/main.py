@@ -1,26 +1,51 @@
-from fastapi import FastAPI, Depends, Query
-from fastapi.responses import JSONResponse
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Literal, Optional, get_args
+from fastapi import FastAPI, Depends, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from app.cache import team_responses
 from app.database import get_db
-from app import schemas, services, exceptions
+from app.group_commit import create_committer
+from app.invalidation import bus
+from app.profiler import ProfilingMiddleware, sampler
+from app.compression import CompressionMiddleware
+from app import archive, changes, compression, config, idempotency, review_stream, schemas, services, exceptions, rollups, warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Each uvicorn worker runs its own lifespan and joins the invalidation bus
+    bus.start()
+    # Warm up in the background so /health answers while /ready still fails
+    warmup.state.reset()
+    warmup_task = asyncio.create_task(warmup.run_until_ready())
+    compaction_task = asyncio.create_task(changes.run_compaction())
+    purge_task = asyncio.create_task(idempotency.run_purge())
+    yield
+    purge_task.cancel()
+    compaction_task.cancel()
+    warmup_task.cancel()
+    bus.stop()
+
 
 app = FastAPI(
     title="PR Reviewer Assignment Service",
     version="1.0.0",
-    description="Service for assigning reviewers to Pull Requests"
+    description="Service for assigning reviewers to Pull Requests",
+    lifespan=lifespan
 )
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(CompressionMiddleware)
 
 
 @app.exception_handler(exceptions.ServiceException)
 async def service_exception_handler(request, exc: exceptions.ServiceException):
-    status_code = 400
-    if exc.code == "NOT_FOUND":
-        status_code = 404
-    elif exc.code in ["PR_EXISTS", "TEAM_EXISTS", "PR_MERGED", "NOT_ASSIGNED", "NO_CANDIDATE"]:
-        status_code = 409 if exc.code in ["PR_EXISTS", "TEAM_EXISTS", "PR_MERGED", "NOT_ASSIGNED", "NO_CANDIDATE"] else 400
-
     return JSONResponse(
-        status_code=status_code,
+        status_code=exceptions.http_status(exc),
         content={
             "error": {
                 "code": exc.code,
@@ -32,9 +57,23 @@ async def service_exception_handler(request, exc: exceptions.ServiceException):
 
 @app.get("/health")
 async def health():
+    """Liveness: the process is up"""
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness: warm-up finished and the database answers"""
+    if not warmup.state.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "warming_up", "error": warmup.state.error}
+        )
+    if not await run_in_threadpool(warmup.check_database):
+        return JSONResponse(status_code=503, content={"status": "database_unavailable"})
+    return {"status": "ready", "warmup_seconds": warmup.state.warmup_seconds}
+
+
 @app.post("/team/add", response_model=schemas.TeamResponse, status_code=201)
 async def create_team(team: schemas.TeamCreate, db: Session = Depends(get_db)):
     """Create team with members (creates/updates users)"""
@@ -57,22 +96,96 @@ async def create_team(team: schemas.TeamCreate, db: Session = Depends(get_db)):
     )
 
 
+def _selected_fields(fields: Optional[list], field_type) -> tuple[str, ...]:
+    """Requested ?fields= in declaration order; all of them when none are given"""
+    return tuple(field for field in get_args(field_type) if fields is None or field in fields)
+
+
+def _gzipped(body: bytes) -> Response:
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+    )
+
+
 @app.get("/team/get", response_model=schemas.TeamResponse)
-async def get_team(team_name: str = Query(..., description="Уникальное имя команды"), db: Session = Depends(get_db)):
+async def get_team(
+    request: Request,
+    team_name: str = Query(..., description="Уникальное имя команды"),
+    fields: Optional[list[schemas.TeamMemberField]] = Query(None, description="Поля участников (по умолчанию все)"),
+    db: Session = Depends(get_db)
+):
     """Get team with members"""
-    team = services.get_team_by_name(db, team_name)
+    selected = _selected_fields(fields, schemas.TeamMemberField)
+    variant = ",".join(selected)
+    # Large bodies are cached compressed, so hits skip gzip as well
+    gzip_ok = compression.accepts_gzip(request.headers.get("accept-encoding"))
+    if gzip_ok:
+        body = team_responses.get(team_name, variant + ";gzip")
+        if body is not None:
+            return _gzipped(body)
+    body = team_responses.get(team_name, variant)
+    if body is None:
+        version = team_responses.version(team_name)
+        # Column rows go straight to JSON: no ORM objects, no response model validation
+        rows = services.get_team_member_rows(db, team_name)
+        members = [{field: row._mapping[field] for field in selected} for row in rows]
+        body = JSONResponse({"team_name": team_name, "members": members}).body
+        user_ids = [row.user_id for row in rows]
+        if gzip_ok and compression.should_compress(len(body)):
+            body = compression.gzip(body)
+            team_responses.put(team_name, version, body, user_ids, variant + ";gzip")
+            return _gzipped(body)
+        team_responses.put(team_name, version, body, user_ids, variant)
+    return Response(body, media_type="application/json")
+
+
+def _membership_response(result: dict) -> schemas.TeamMembersResponse:
+    return schemas.TeamMembersResponse(
+        team_name=result["team_name"],
+        members=[schemas.UserResponse(**member) for member in result["members"]],
+        reassigned=[_reassign_result(r) for r in result["reassigned"]]
+    )
 
-    return schemas.TeamResponse(
-        team_name=team.team_name,
-        members=[
-            schemas.TeamMember(
-                user_id=user.user_id,
-                username=user.username,
-                is_active=user.is_active
-            )
-            for user in team.members
-        ]
+
+@app.post("/team/members/add", response_model=schemas.TeamMembersResponse)
+async def add_team_members(request: schemas.TeamMembersAddRequest, db: Session = Depends(get_db)):
+    """Add new users to a team or move existing ones into it"""
+    result = services.add_team_members(
+        db,
+        request.team_name,
+        [{"user_id": m.user_id, "username": m.username, "is_active": m.is_active} for m in request.members],
+        request.reassign_reviews
     )
+    return _membership_response(result)
+
+
+@app.post("/team/members/remove", response_model=schemas.TeamMembersResponse)
+async def remove_team_members(request: schemas.TeamMembersRemoveRequest, db: Session = Depends(get_db)):
+    """Remove users from a team (they keep their history)"""
+    result = services.remove_team_members(db, request.team_name, request.user_ids, request.reassign_reviews)
+    return _membership_response(result)
+
+
+@app.post("/team/members/move", response_model=schemas.TeamMembersResponse)
+async def move_team_members(request: schemas.TeamMembersMoveRequest, db: Session = Depends(get_db)):
+    """Move users to another team"""
+    result = services.move_team_members(db, request.team_name, request.user_ids, request.reassign_reviews)
+    return _membership_response(result)
+
+
+@app.get("/team/fallbacks", response_model=schemas.TeamFallbacks)
+async def get_team_fallbacks(team_name: str = Query(...), db: Session = Depends(get_db)):
+    """Teams whose members replace this team's reviewers when it has no candidate left"""
+    return schemas.TeamFallbacks(team_name=team_name, fallback_teams=services.get_team_fallbacks(db, team_name))
+
+
+@app.post("/team/setFallbacks", response_model=schemas.TeamFallbacks)
+async def set_team_fallbacks(request: schemas.TeamFallbacks, db: Session = Depends(get_db)):
+    """Replace a team's fallback teams; list order is the search priority"""
+    fallback_teams = services.set_team_fallbacks(db, request.team_name, request.fallback_teams)
+    return schemas.TeamFallbacks(team_name=request.team_name, fallback_teams=fallback_teams)
 
 
 @app.post("/users/setIsActive", response_model=schemas.UserResponse)
@@ -88,27 +201,62 @@ async def set_user_active(request: schemas.UserSetActive, db: Session = Depends(
     )
 
 
-@app.post("/pullRequest/create", response_model=schemas.PullRequestResponse, status_code=201)
-async def create_pull_request(pr: schemas.PullRequestCreate, db: Session = Depends(get_db)):
-    """Create PR and automatically assign up to 2 reviewers from author's team"""
-    pr_obj = services.create_pull_request(
+@app.post("/users/bulkSetIsActive", response_model=schemas.BulkSetActiveResponse)
+async def bulk_set_user_active(request: schemas.BulkSetActiveRequest, db: Session = Depends(get_db)):
+    """Set active flag of many users at once (errors and reassignments per user)"""
+    results = services.bulk_set_user_active(
         db,
-        pr.pull_request_id,
-        pr.pull_request_name,
-        pr.author_id
+        [(item.user_id, item.is_active) for item in request.users],
+        request.reassign_reviews
     )
 
-    return schemas.PullRequestResponse(
-        pull_request_id=pr_obj.pull_request_id,
-        pull_request_name=pr_obj.pull_request_name,
-        author_id=pr_obj.author_id,
-        status=pr_obj.status,
-        assigned_reviewers=[r.user_id for r in pr_obj.assigned_reviewers],
-        createdAt=pr_obj.created_at,
-        mergedAt=pr_obj.merged_at
+    return schemas.BulkSetActiveResponse(
+        results=[
+            schemas.BulkSetActiveResult(
+                user_id=result["user_id"],
+                user=result.get("user"),
+                changed=result.get("changed", False),
+                reassigned=[_reassign_result(r) for r in result.get("reassigned", [])],
+                error=_item_error(result["error"]) if "error" in result else None
+            )
+            for result in results
+        ]
     )
 
 
+@app.post("/pullRequest/create", response_model=schemas.PullRequestResponse, status_code=201)
+async def create_pull_request(
+    pr: schemas.PullRequestCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
+    """Create PR and automatically assign up to 2 reviewers from author's team"""
+    async def create():
+        if create_committer.enabled:
+            # Group commit: joins the current batch and waits for its own result
+            pr_data = await create_committer.create_pull_request(pr.pull_request_id, pr.pull_request_name, pr.author_id)
+            return schemas.PullRequestResponse(**pr_data)
+
+        pr_obj = services.create_pull_request(
+            db,
+            pr.pull_request_id,
+            pr.pull_request_name,
+            pr.author_id
+        )
+
+        return schemas.PullRequestResponse(
+            pull_request_id=pr_obj.pull_request_id,
+            pull_request_name=pr_obj.pull_request_name,
+            author_id=pr_obj.author_id,
+            status=pr_obj.status,
+            assigned_reviewers=[r.user_id for r in pr_obj.assigned_reviewers],
+            createdAt=pr_obj.created_at,
+            mergedAt=pr_obj.merged_at
+        )
+
+    return await idempotency.run(db, idempotency_key, "/pullRequest/create", pr, create, status_code=201)
+
+
 @app.post("/pullRequest/merge", response_model=schemas.PullRequestResponse)
 async def merge_pull_request(request: schemas.PullRequestMerge, db: Session = Depends(get_db)):
     """Mark PR as MERGED (idempotent operation)"""
@@ -126,63 +274,249 @@ async def merge_pull_request(request: schemas.PullRequestMerge, db: Session = De
 
 
 @app.post("/pullRequest/reassign", response_model=schemas.ReassignResponse)
-async def reassign_reviewer(request: schemas.PullRequestReassign, db: Session = Depends(get_db)):
+async def reassign_reviewer(
+    request: schemas.PullRequestReassign,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
     """Reassign specific reviewer to another from their team"""
-    pr, new_reviewer_id = services.reassign_reviewer(
-        db,
-        request.pull_request_id,
-        request.old_user_id
+    async def reassign():
+        pr, new_reviewer_id = services.reassign_reviewer(
+            db,
+            request.pull_request_id,
+            request.old_user_id
+        )
+
+        return schemas.ReassignResponse(
+            pr=schemas.PullRequestResponse(
+                pull_request_id=pr.pull_request_id,
+                pull_request_name=pr.pull_request_name,
+                author_id=pr.author_id,
+                status=pr.status,
+                assigned_reviewers=[r.user_id for r in pr.assigned_reviewers],
+                createdAt=pr.created_at,
+                mergedAt=pr.merged_at
+            ),
+            replaced_by=new_reviewer_id
+        )
+
+    return await idempotency.run(db, idempotency_key, "/pullRequest/reassign", request, reassign)
+
+
+def _item_error(exc: exceptions.ServiceException) -> schemas.ErrorDetail:
+    return schemas.ErrorDetail(code=exc.code, message=exc.message)
+
+
+def _reassign_result(result: dict) -> schemas.BulkReassignResult:
+    return schemas.BulkReassignResult(
+        pull_request_id=result["pull_request_id"],
+        old_user_id=result["old_user_id"],
+        pr=result.get("pr"),
+        replaced_by=result.get("replaced_by"),
+        error=_item_error(result["error"]) if "error" in result else None
     )
 
-    return schemas.ReassignResponse(
-        pr=schemas.PullRequestResponse(
-            pull_request_id=pr.pull_request_id,
-            pull_request_name=pr.pull_request_name,
-            author_id=pr.author_id,
-            status=pr.status,
-            assigned_reviewers=[r.user_id for r in pr.assigned_reviewers],
-            createdAt=pr.created_at,
-            mergedAt=pr.merged_at
-        ),
-        replaced_by=new_reviewer_id
+
+@app.post("/pullRequest/bulkMerge", response_model=schemas.BulkMergeResponse)
+async def bulk_merge_pull_requests(request: schemas.BulkMergeRequest, db: Session = Depends(get_db)):
+    """Merge many PRs in one transaction (idempotent per item, errors per item)"""
+    results = services.bulk_merge_pull_requests(db, request.pull_request_ids)
+
+    return schemas.BulkMergeResponse(
+        results=[
+            schemas.BulkMergeResult(
+                pull_request_id=result["pull_request_id"],
+                pr=result.get("pr"),
+                error=_item_error(result["error"]) if "error" in result else None
+            )
+            for result in results
+        ]
     )
 
 
+@app.post("/pullRequest/bulkReassign", response_model=schemas.BulkReassignResponse)
+async def bulk_reassign_reviewers(request: schemas.BulkReassignRequest, db: Session = Depends(get_db)):
+    """Reassign many reviewers in one transaction (errors per item)"""
+    results = services.bulk_reassign_reviewers(
+        db,
+        [(item.pull_request_id, item.old_user_id) for item in request.items]
+    )
+
+    return schemas.BulkReassignResponse(results=[_reassign_result(result) for result in results])
+
+
 @app.get("/users/getReview", response_model=schemas.UserReviewResponse)
-async def get_user_reviews(user_id: str = Query(..., description="Идентификатор пользователя"), db: Session = Depends(get_db)):
+async def get_user_reviews(
+    user_id: str = Query(..., description="Идентификатор пользователя"),
+    include_archived: bool = Query(False, description="Добавить PR, перенесенные в архив"),
+    fields: Optional[list[schemas.PullRequestShortField]] = Query(None, description="Поля PR (по умолчанию все)"),
+    db: Session = Depends(get_db)
+):
     """Get PRs where user is assigned as reviewer"""
-    prs = services.get_user_reviews(db, user_id)
-
-    return schemas.UserReviewResponse(
+    pull_requests = [row._asdict() for row in services.get_user_review_rows(db, user_id)]
+    if include_archived:
+        # Archived PRs first; each part is in creation order
+        pull_requests = archive.reader.reviews_of(user_id) + pull_requests
+    if fields is not None:
+        selected = _selected_fields(fields, schemas.PullRequestShortField)
+        pull_requests = [{field: pr[field] for field in selected} for pr in pull_requests]
+    return JSONResponse({"user_id": user_id, "pull_requests": pull_requests})
+
+
+def _review_queue(db: Session, user_id: str) -> schemas.ReviewQueueResponse:
+    pull_requests = [row._asdict() for row in services.get_user_review_rows(db, user_id)]
+    # Don't hold a pooled connection while the client waits for events
+    db.rollback()
+    return schemas.ReviewQueueResponse(
         user_id=user_id,
-        pull_requests=[
-            schemas.PullRequestShort(
-                pull_request_id=pr.pull_request_id,
-                pull_request_name=pr.pull_request_name,
-                author_id=pr.author_id,
-                status=pr.status
-            )
-            for pr in prs
-        ]
+        version=review_stream.queue_version(pull_requests),
+        pull_requests=pull_requests
+    )
+
+
+@app.get("/users/reviewStream")
+async def stream_user_reviews(user_id: str = Query(..., description="Идентификатор пользователя"), db: Session = Depends(get_db)):
+    """Server-Sent Events: queue snapshot, then assigned/unassigned/merged events"""
+    # Subscribe before reading so nothing committed in between is missed
+    queue = review_stream.hub.subscribe(user_id)
+    try:
+        snapshot = _review_queue(db, user_id)
+    except Exception:
+        review_stream.hub.unsubscribe(user_id, queue)
+        raise
+
+    return StreamingResponse(
+        review_stream.sse_events(user_id, queue, snapshot.model_dump(mode="json"), config.REVIEW_STREAM_KEEPALIVE_S),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
+@app.get("/users/reviewPoll", response_model=schemas.ReviewQueueResponse)
+async def poll_user_reviews(
+    user_id: str = Query(..., description="Идентификатор пользователя"),
+    version: Optional[str] = Query(None, description="Версия очереди из предыдущего ответа"),
+    timeout: float = Query(25, ge=0, le=60, description="Сколько секунд ждать изменений"),
+    db: Session = Depends(get_db)
+):
+    """Long-poll: answer once the queue differs from the given version or after the timeout"""
+    queue = review_stream.hub.subscribe(user_id)
+    try:
+        snapshot = _review_queue(db, user_id)
+        if snapshot.version == version and await review_stream.wait(queue, timeout) is not None:
+            snapshot = _review_queue(db, user_id)
+    finally:
+        review_stream.hub.unsubscribe(user_id, queue)
+    return snapshot
+
+
 # Additional endpoints
 
 @app.get("/stats", response_model=schemas.StatsResponse)
-async def get_statistics(db: Session = Depends(get_db)):
+async def get_statistics(
+    fields: Optional[list[schemas.StatsField]] = Query(None, description="Поля ответа (по умолчанию все)"),
+    db: Session = Depends(get_db)
+):
     """Get service statistics"""
-    stats = services.get_statistics(db)
-    return schemas.StatsResponse(**stats)
+    selected = _selected_fields(fields, schemas.StatsField)
+    stats = services.get_statistics(db, include_assignments="reviewer_assignments" in selected)
+    return JSONResponse({field: stats[field] for field in selected})
+
+
+@app.get("/stats/reviewers", response_model=schemas.ReviewerWorkloadResponse)
+async def get_reviewer_workload(
+    team_name: Optional[str] = Query(None, description="Фильтр по команде ревьювера"),
+    status: Literal["OPEN", "MERGED", "ALL"] = Query("OPEN", description="Статус PR"),
+    limit: int = Query(20, ge=1, le=1000, description="Количество ревьюверов"),
+    order: Literal["desc", "asc"] = Query("desc", description="Сортировка по числу назначений"),
+    db: Session = Depends(get_db)
+):
+    """Get the most (or least) loaded reviewers, aggregated in SQL"""
+    reviewers = services.get_reviewer_workload(db, team_name, status, limit, order)
+    return schemas.ReviewerWorkloadResponse(
+        team_name=team_name,
+        status=status,
+        reviewers=[schemas.ReviewerWorkload(**r) for r in reviewers]
+    )
+
+
+@app.get("/stats/teams", response_model=schemas.TeamStatsResponse)
+async def get_team_statistics(
+    team_name: Optional[str] = Query(None, description="Фильтр по команде"),
+    db: Session = Depends(get_db)
+):
+    """Get per-team PR, member and review-load aggregates"""
+    teams = services.get_team_statistics(db, team_name)
+    return schemas.TeamStatsResponse(teams=[schemas.TeamStatsItem(**t) for t in teams])
+
+
+@app.get("/stats/timeseries", response_model=schemas.TimeseriesResponse)
+async def get_timeseries(
+    bucket: Literal["hour", "day"] = Query("hour", description="Размер интервала"),
+    start: Optional[datetime] = Query(None, description="Начало периода (по умолчанию 24 часа / 30 дней назад)"),
+    end: Optional[datetime] = Query(None, description="Конец периода (по умолчанию сейчас)"),
+    team_name: Optional[str] = Query(None, description="Фильтр по команде"),
+    db: Session = Depends(get_db)
+):
+    """Get PR activity and time-to-merge percentiles from pre-aggregated buckets"""
+    return schemas.TimeseriesResponse(**rollups.get_timeseries(db, bucket, start, end, team_name))
+
+
+@app.get("/changes", response_model=schemas.ChangesResponse)
+async def get_changes(
+    since: int = Query(0, ge=0, description="Курсор: next_cursor предыдущего ответа"),
+    limit: int = Query(100, ge=1, le=changes.MAX_LIMIT, description="Максимум изменений в ответе"),
+    db: Session = Depends(get_db)
+):
+    """Get committed changes after a cursor for incremental sync"""
+    return schemas.ChangesResponse(**changes.get_changes(db, since, limit))
 
 
 @app.post("/users/bulkDeactivate", status_code=200)
-async def bulk_deactivate_team(request: schemas.BulkDeactivateRequest, db: Session = Depends(get_db)):
+async def bulk_deactivate_team(
+    request: schemas.BulkDeactivateRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=255)
+):
     """Bulk deactivate team members and safely reassign open PRs"""
-    reassigned_count = services.bulk_deactivate_team(db, request.team_name)
-    return {
-        "team_name": request.team_name,
-        "reassigned_prs": reassigned_count,
-        "message": f"Team members deactivated. {reassigned_count} PRs reassigned."
-    }
+    async def deactivate():
+        reassigned_count = services.bulk_deactivate_team(db, request.team_name)
+        return {
+            "team_name": request.team_name,
+            "reassigned_prs": reassigned_count,
+            "message": f"Team members deactivated. {reassigned_count} PRs reassigned."
+        }
 
+    return await idempotency.run(db, idempotency_key, "/users/bulkDeactivate", request, deactivate)
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not config.ADMIN_TOKEN or not secrets.compare_digest(x_admin_token or "", config.ADMIN_TOKEN):
+        raise exceptions.ForbiddenError("Admin token required")
+
+
+@app.post("/admin/profile/start", response_model=schemas.ProfileStatus, dependencies=[Depends(require_admin)])
+async def start_profile(
+    duration_s: float = Query(30, gt=0, le=600, description="Длительность записи, секунды"),
+    interval_ms: float = Query(10, ge=1, le=1000, description="Интервал между сэмплами"),
+    request_rate: Optional[float] = Query(
+        None, gt=0, le=1, description="Доля профилируемых запросов; без параметра - все время окна"
+    )
+):
+    """Start recording a sampling profile in this worker"""
+    return sampler.start(duration_s, interval_ms, request_rate)
+
+
+@app.post("/admin/profile/stop", response_model=schemas.ProfileStatus, dependencies=[Depends(require_admin)])
+async def stop_profile():
+    """Stop recording; the collected stacks stay available"""
+    return await run_in_threadpool(sampler.stop)
+
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def download_profile():
+    """Collapsed stacks of the current or last profile, for flamegraph tools"""
+    return PlainTextResponse(
+        sampler.collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'}
+    )
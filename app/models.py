@@ -1,14 +1,18 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, Index, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
-# Association table for many-to-many relationship between PRs and reviewers
+# Association table for many-to-many relationship between PRs and reviewers.
+# Keyed on the integer surrogate ids so the hottest table and its indexes store
+# fixed-width keys instead of the public string ids.
 pr_reviewers = Table(
     'pr_reviewers',
     Base.metadata,
-    Column('pull_request_id', String, ForeignKey('pull_requests.pull_request_id'), primary_key=True),
-    Column('user_id', String, ForeignKey('users.user_id'), primary_key=True)
+    Column('pull_request_pk', Integer, ForeignKey('pull_requests.id'), primary_key=True),
+    Column('user_pk', Integer, ForeignKey('users.id'), primary_key=True),
+    # Reverse of the primary key: covers "PRs of a reviewer" without touching the table
+    Index('ix_pr_reviewers_user_pk_pull_request_pk', 'user_pk', 'pull_request_pk')
 )
 
 
@@ -19,12 +23,25 @@ class Team(Base):
     members = relationship("User", back_populates="team", cascade="all, delete-orphan")
 
 
+class TeamFallback(Base):
+    """Team whose active members replace a team's reviewers when it has none left"""
+    __tablename__ = "team_fallbacks"
+
+    # Key order is the search order: a team's fallbacks by ascending priority
+    team_name = Column(String, ForeignKey("teams.team_name"), primary_key=True)
+    priority = Column(Integer, primary_key=True)
+    fallback_team = Column(String, ForeignKey("teams.team_name"), nullable=False)
+
+
 class User(Base):
     __tablename__ = "users"
 
-    user_id = Column(String, primary_key=True)
+    # Internal surrogate key, never exposed through the API
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, unique=True, nullable=False)
     username = Column(String, nullable=False)
-    team_name = Column(String, ForeignKey("teams.team_name"), nullable=False)
+    # NULL once removed from their team; history (authored PRs, reviews) stays
+    team_name = Column(String, ForeignKey("teams.team_name"), nullable=True, index=True)
     is_active = Column(Boolean, default=True, nullable=False)
 
     team = relationship("Team", back_populates="members")
@@ -38,13 +55,20 @@ class User(Base):
 class PullRequest(Base):
     __tablename__ = "pull_requests"
 
-    pull_request_id = Column(String, primary_key=True)
+    # Internal surrogate key, never exposed through the API
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    pull_request_id = Column(String, unique=True, nullable=False)
     pull_request_name = Column(String, nullable=False)
-    author_id = Column(String, ForeignKey("users.user_id"), nullable=False)
+    author_id = Column(String, ForeignKey("users.user_id"), nullable=False, index=True)
     status = Column(String, nullable=False, default="OPEN")  # OPEN or MERGED
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     merged_at = Column(DateTime(timezone=True), nullable=True)
 
+    __table_args__ = (
+        # Open-PR scans read only the index, not the table
+        Index('ix_pull_requests_status_id', 'status', 'id'),
+    )
+
     author = relationship("User", foreign_keys=[author_id])
     assigned_reviewers = relationship(
         "User",
@@ -52,3 +76,73 @@ class PullRequest(Base):
         back_populates="assigned_prs"
     )
 
+
+class StatsRollup(Base):
+    """Pre-aggregated PR activity per time bucket and team.
+
+    Maintained incrementally by the create and merge paths: one row per team,
+    plus one of rollups.ORG_SHARDS organisation-wide rows ("*0".."*7") that
+    unfiltered series sum per bucket.
+    """
+    __tablename__ = "stats_rollups"
+
+    # Key order matches the range scan: (period, team_name) equality, then bucket range
+    period = Column(String, primary_key=True)  # hour or day
+    team_name = Column(String, primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    opened = Column(Integer, nullable=False, default=0)
+    merged = Column(Integer, nullable=False, default=0)
+    assignments = Column(Integer, nullable=False, default=0)
+    ttm_sketch = Column(Text, nullable=False, default="{}")  # LogHistogram of time-to-merge seconds
+
+
+class TeamStats(Base):
+    """Running PR counters per team (PRs authored by its current members).
+
+    Maintained incrementally next to the rollups, and carried over when an
+    author changes teams, so /stats/teams never scans pull_requests.
+    """
+    __tablename__ = "team_stats"
+
+    team_name = Column(String, primary_key=True)
+    open_prs = Column(Integer, nullable=False, default=0)
+    merged_prs = Column(Integer, nullable=False, default=0)
+
+
+class ChangeLogEntry(Base):
+    """Append-only feed of committed mutations; seq (commit order) is the consumer cursor"""
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    seq = Column(Integer, nullable=True)  # assigned after commit, see changes.sequence
+    entity = Column(String, nullable=False)  # team, user or pull_request
+    entity_id = Column(String, nullable=False)
+    event = Column(String, nullable=False)  # e.g. pull_request.merged
+    payload = Column(Text, nullable=False)  # JSON snapshot of the entity after the change
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index('ix_change_log_seq', 'seq', unique=True),
+        # Compaction: latest entry per entity, and the age cut-off
+        Index('ix_change_log_entity_entity_id_seq', 'entity', 'entity_id', 'seq'),
+        Index('ix_change_log_created_at', 'created_at'),
+    )
+
+
+class ArchivedPullRequest(Base):
+    """Id of a PR moved to the archive: it stays taken, so getReview never lists it twice"""
+    __tablename__ = "archived_pull_requests"
+
+    pull_request_id = Column(String, primary_key=True)
+
+
+class IdempotencyKey(Base):
+    """First response to a write sent with an Idempotency-Key header; replayed to repeats"""
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # endpoint and request body hash
+    status_code = Column(Integer, nullable=True)  # NULL while the first request runs
+    body = Column(Text, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # lease of the running request
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
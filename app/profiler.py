@@ -0,0 +1,160 @@
+"""
+Opt-in sampling profiler for production hot-path analysis.
+
+A daemon thread wakes every interval and records the Python stack of every
+other thread (sys._current_frames), skipping threads parked in a known wait.
+Stacks are aggregated in memory and exported in the collapsed format
+("outer;inner;leaf count" per line) that flamegraph.pl, speedscope and
+similar tools read.
+
+Two modes:
+- window: sample for the whole duration
+- requests: each request is picked with probability request_rate, and samples
+  are only taken while a picked request is in flight. Attribution is per
+  process, so requests interleaving on the event loop are counted as well.
+
+Disabled, the cost is one attribute check per request in the middleware.
+Each worker profiles itself; with WEB_CONCURRENCY > 1 a call reaches one of them.
+"""
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.exceptions import ProfilerRunningError
+
+# Leaf frames of threads that are blocked, not burning CPU
+IDLE_LEAVES = {
+    "selectors:EpollSelector.select",
+    "selectors:PollSelector.select",
+    "selectors:SelectSelector.select",
+    "selectors:KqueueSelector.select",
+    "threading:Condition.wait",
+    "threading:Thread._wait_for_tstate_lock",
+    "concurrent.futures.thread:_worker",
+    "app.invalidation:LocalSocketTransport._listen",
+    "app.invalidation:PostgresTransport._listen",
+}
+
+
+class Sampler:
+    def __init__(self):
+        self.running = False
+        self.request_rate: Optional[float] = None
+        self.interval = 0.01
+        self.started_at: Optional[datetime] = None
+        self.samples = 0
+        self._deadline = 0.0
+        self._stacks: Counter[str] = Counter()
+        self._labels: dict = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, duration_s: float, interval_ms: float, request_rate: Optional[float] = None) -> dict:
+        with self._lock:
+            if self.running:
+                raise ProfilerRunningError("A profile is already being recorded")
+            self._stacks = Counter()
+            self.samples = 0
+            self._in_flight = 0
+            self.interval = interval_ms / 1000
+            self.request_rate = request_rate
+            self.started_at = datetime.now(timezone.utc)
+            self._deadline = time.monotonic() + duration_s
+            self._stopped.clear()
+            self.running = True
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+        return self.status()
+
+    def stop(self) -> dict:
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2)
+        return self.status()
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "mode": "window" if self.request_rate is None else "requests",
+            "request_rate": self.request_rate,
+            "interval_ms": self.interval * 1000,
+            "started_at": self.started_at,
+            "remaining_s": max(0.0, self._deadline - time.monotonic()) if self.running else 0.0,
+            "samples": self.samples,
+            "stacks": len(self._stacks),
+        }
+
+    def collapsed(self) -> str:
+        with self._lock:
+            stacks = sorted(self._stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    # Called by the middleware, only while running
+
+    def pick_request(self) -> bool:
+        return self.request_rate is None or random.random() < self.request_rate
+
+    def request_started(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self):
+        with self._lock:
+            # May outlive the profile it started in
+            self._in_flight = max(0, self._in_flight - 1)
+
+    def _label(self, frame) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}"
+        return label
+
+    def _sample(self, own: int):
+        for ident, frame in sys._current_frames().items():
+            if ident == own or self._label(frame) in IDLE_LEAVES:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame))
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _run(self):
+        own = threading.get_ident()
+        try:
+            while not self._stopped.wait(self.interval) and time.monotonic() < self._deadline:
+                if self.request_rate is not None and self._in_flight == 0:
+                    continue
+                with self._lock:
+                    self._sample(own)
+        finally:
+            self.running = False
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware: a plain pass-through while no profile is recorded"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not sampler.running or scope["type"] != "http" or not sampler.pick_request():
+            await self.app(scope, receive, send)
+            return
+        sampler.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            sampler.request_finished()
+
+
+sampler = Sampler()
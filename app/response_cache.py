@@ -0,0 +1,110 @@
+"""
+Memory-bounded LRU of encoded /team/get bodies.
+
+Entries are keyed by team name and the team's version. Versions are per worker
+and bumped by the "team" and "member" invalidation events, so a body built from
+a read that raced with a write is stored under an outdated version and never
+served. A "member" event only names the member's new team, so any of them also
+voids bodies still being built. A hit is a dict lookup: no database, no
+Pydantic, no JSON encoding. A team holds one body per variant (field
+selection, content encoding); they share the version and are dropped together.
+"""
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+
+class TeamResponseCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # team_name -> (version, variant -> body, member user_ids), least recently used first
+        self._entries: OrderedDict[str, tuple[tuple[int, int, int], dict[str, bytes], tuple[str, ...]]] = OrderedDict()
+        # user_id -> team whose cached body lists them; a "member" event only names the new team
+        self._member_teams: dict[str, str] = {}
+        self._versions: dict[str, int] = {}
+        self._epoch = 0
+        self._member_events = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def version(self, team_name: str) -> tuple[int, int, int]:
+        """Read before querying the database; pass to put()"""
+        return self._epoch, self._member_events, self._versions.get(team_name, 0)
+
+    def get(self, team_name: str, variant: str = "") -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(team_name)
+            if entry is None or variant not in entry[1]:
+                return None
+            self._entries.move_to_end(team_name)
+            return entry[1][variant]
+
+    def put(
+        self,
+        team_name: str,
+        version: tuple[int, int, int],
+        body: bytes,
+        user_ids: Iterable[str],
+        variant: str = ""
+    ):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if version != self.version(team_name):
+                return
+            entry = self._entries.get(team_name)
+            if entry is None or entry[0] != version:
+                self._drop(team_name)
+                user_ids = tuple(user_ids)
+                entry = self._entries[team_name] = (version, {}, user_ids)
+                for user_id in user_ids:
+                    self._member_teams[user_id] = team_name
+            self._size += len(body) - len(entry[1].get(variant, b""))
+            entry[1][variant] = body
+            self._entries.move_to_end(team_name)
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, team_name: str):
+        entry = self._entries.pop(team_name, None)
+        if entry is None:
+            return
+        self._size -= sum(len(body) for body in entry[1].values())
+        for user_id in entry[2]:
+            if self._member_teams.get(user_id) == team_name:
+                del self._member_teams[user_id]
+
+    def _bump(self, team_name: str):
+        self._versions[team_name] = self._versions.get(team_name, 0) + 1
+        self._drop(team_name)
+
+    def invalidate(self, team_name: Optional[str]):
+        with self._lock:
+            if team_name is None:
+                self._entries.clear()
+                self._member_teams.clear()
+                self._size = 0
+                self._epoch += 1
+                return
+            self._bump(team_name)
+
+    def apply_members(self, members: Iterable[tuple]):
+        """Bump the old and new team of each changed (pk, user_id, team_name, ...) member"""
+        with self._lock:
+            self._member_events += 1
+            for _, user_id, team_name, *_ in members:
+                old_team = self._member_teams.get(user_id)
+                if old_team is not None:
+                    self._bump(old_team)
+                if team_name is not None:
+                    self._bump(team_name)
+
+    def clear(self):
+        self.invalidate(None)
@@ -0,0 +1,52 @@
+"""
+Retry with jitter for write transactions that lost a race.
+
+The write paths lock the rows they read-then-write (SELECT ... FOR UPDATE), so
+on PostgreSQL conflicts mostly show up as waits. What is left - serialization
+failures, deadlocks between multi-row operations, and on SQLite a row changed
+or inserted by a concurrent transaction - rolls the session back and reruns the
+whole service call after a randomized backoff, so competing retries spread out
+instead of colliding again.
+"""
+import functools
+import logging
+import random
+import time
+
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# serialization_failure, deadlock_detected, lock_not_available
+RETRYABLE_SQLSTATES = {"40001", "40P01", "55P03"}
+
+
+def is_conflict(exc: Exception) -> bool:
+    if isinstance(exc, (StaleDataError, IntegrityError)):
+        return True
+    if isinstance(exc, DBAPIError):
+        if getattr(exc.orig, "pgcode", None) in RETRYABLE_SQLSTATES:
+            return True
+        return "database is locked" in str(exc.orig)
+    return False
+
+
+def retry_on_conflict(fn):
+    """Rerun fn(db, ...) on conflicts; fn must start with no pending changes in db"""
+    @functools.wraps(fn)
+    def wrapper(db, *args, **kwargs):
+        for attempt in range(1, config.DB_RETRY_ATTEMPTS + 1):
+            try:
+                return fn(db, *args, **kwargs)
+            except (DBAPIError, StaleDataError) as exc:
+                db.rollback()
+                if attempt == config.DB_RETRY_ATTEMPTS or not is_conflict(exc):
+                    raise
+                delay = random.uniform(0, config.DB_RETRY_BASE_MS / 1000 * 2 ** (attempt - 1))
+                logger.info("%s lost a race (attempt %d), retrying in %.1f ms: %s",
+                            fn.__name__, attempt, delay * 1000, exc.__class__.__name__)
+                time.sleep(delay)
+    return wrapper
@@ -0,0 +1,129 @@
+"""
+Push notifications for reviewers' queues (SSE and long-poll).
+
+Write paths call notify_reviewers() after commit. The event travels over the
+invalidation bus, so every worker wakes its own subscribers, not only the one
+that handled the write. A subscriber is an asyncio.Queue on the event loop: an
+idle connection costs a queue and a suspended coroutine, not a thread.
+"""
+import asyncio
+import hashlib
+import json
+from collections import defaultdict
+from typing import AsyncIterator, Iterable, List, Optional
+
+from app.invalidation import bus
+
+# Sent when events may have been lost; the client should re-read its queue
+RESYNC = {"event": "resync"}
+
+SHORT_FIELDS = ("pull_request_id", "pull_request_name", "author_id", "status")
+
+
+class ReviewHub:
+    """user_id -> subscriber queues; only touched from the event loop thread"""
+
+    def __init__(self, max_queued: int = 64):
+        self.max_queued = max_queued
+        self._subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self):
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.max_queued)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[user_id]
+
+    def receive(self, payload: Optional[str]):
+        """Bus handler, called on whatever thread published or received the event"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        event = json.loads(payload) if payload is not None else None
+        try:
+            loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            # Loop closed in the meantime
+            pass
+
+    def _deliver(self, event: Optional[dict]):
+        if event is None:
+            for queues in self._subscribers.values():
+                for queue in queues:
+                    self._put(queue, RESYNC)
+            return
+        message = {"event": event["event"], "pull_request": event["pull_request"]}
+        for user_id in event["user_ids"]:
+            for queue in self._subscribers.get(user_id, ()):
+                self._put(queue, message)
+
+    @staticmethod
+    def _put(queue: asyncio.Queue, message: dict):
+        if queue.full():
+            # Slow consumer: drop what it has not read and make it re-read instead
+            while not queue.empty():
+                queue.get_nowait()
+            message = RESYNC
+        queue.put_nowait(message)
+
+
+hub = ReviewHub()
+bus.subscribe("review", hub.receive)
+
+
+def notify_reviewers(event: str, user_ids: Iterable[str], pr: dict):
+    """Publish an assigned/unassigned/merged event for reviewers (call after commit)"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    bus.publish("review", json.dumps({
+        "event": event,
+        "user_ids": user_ids,
+        "pull_request": {field: pr[field] for field in SHORT_FIELDS}
+    }))
+
+
+def queue_version(pull_requests: List[dict]) -> str:
+    """Opaque version of a review queue; changes whenever a PR joins, leaves or merges"""
+    digest = hashlib.sha1()
+    for pr in sorted(pull_requests, key=lambda pr: pr["pull_request_id"]):
+        digest.update(f"{pr['pull_request_id']}:{pr['status']}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+async def wait(queue: asyncio.Queue, timeout: float) -> Optional[dict]:
+    """Next event for a subscriber, or None after the timeout"""
+    try:
+        return await asyncio.wait_for(queue.get(), timeout)
+    except TimeoutError:
+        return None
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def sse_events(user_id: str, queue: asyncio.Queue, snapshot: dict, keepalive: float) -> AsyncIterator[str]:
+    """Initial snapshot, then one SSE message per event; unsubscribes when the client goes away"""
+    try:
+        yield _sse("snapshot", snapshot)
+        while True:
+            message = await wait(queue, keepalive)
+            if message is None:
+                # Keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+                continue
+            yield _sse(message["event"], message)
+    finally:
+        hub.unsubscribe(user_id, queue)
@@ -0,0 +1,236 @@
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import archive
+from app.models import PullRequest, StatsRollup, TeamStats
+from app.sketch import LogHistogram
+
+# Organisation-wide totals live in ORG_SHARDS rows per bucket ("*0".."*7"), each
+# team writing to one of them: a merge locks its team's row and a shard shared
+# with a fraction of the teams, never a row every writer waits on. An
+# unfiltered series reads ORG_SHARDS rows per bucket, however many teams exist.
+ALL_TEAMS = "*"
+ORG_SHARDS = 8
+ORG_SHARD_NAMES = tuple(f"{ALL_TEAMS}{shard}" for shard in range(ORG_SHARDS))
+PERIODS = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+PERCENTILES = (0.5, 0.9, 0.99)
+
+# Adds two JSON objects of counts key by key, e.g. LogHistogram bins
+_MERGE_COUNTS = {
+    "postgresql": (
+        "(SELECT coalesce(jsonb_object_agg(key, total), '{{}}'::jsonb)::text FROM ("
+        "SELECT key, sum(value::bigint) AS total FROM ("
+        "SELECT * FROM jsonb_each_text({current}::jsonb) "
+        "UNION ALL SELECT * FROM jsonb_each_text({added}::jsonb)) AS counts GROUP BY key) AS merged)"
+    ),
+    "sqlite": (
+        "(SELECT json_group_object(key, total) FROM ("
+        "SELECT key, sum(value) AS total FROM ("
+        "SELECT key, value FROM json_each({current}) "
+        "UNION ALL SELECT key, value FROM json_each({added})) GROUP BY key))"
+    ),
+}
+
+
+def as_utc(value: datetime) -> datetime:
+    """Treat naive timestamps (SQLite, datetime.utcnow) as UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def bucket_start(value: datetime, period: str) -> datetime:
+    value = as_utc(value)
+    if period == "day":
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def org_shard(team_name: Optional[str]) -> str:
+    """Organisation-wide row a team's PRs are counted in (crc32: stable across processes)"""
+    return ORG_SHARD_NAMES[zlib.crc32((team_name or "").encode()) % ORG_SHARDS]
+
+
+def _rollup_teams(team_name: Optional[str]) -> tuple[str, ...]:
+    # Authors without a team only count towards the organisation-wide rows
+    return (team_name, org_shard(team_name)) if team_name is not None else (org_shard(None),)
+
+
+def _increment(db: Session, table, keys: tuple[str, ...], rows: List[dict], json_counts: tuple[str, ...] = ()):
+    """Atomically add to the counters of many rows in one statement, creating them if needed.
+
+    Columns in json_counts hold JSON objects of counts that are added key by key.
+    """
+    if not rows:
+        return
+    name = db.get_bind().dialect.name
+    dialect = postgresql if name == "postgresql" else sqlite
+    # One lock order for every writer, so concurrent statements never deadlock
+    rows = sorted(rows, key=lambda row: tuple(row[key] for key in keys))
+    stmt = dialect.insert(table).values(rows)
+    set_ = {}
+    for column in rows[0]:
+        if column in json_counts:
+            set_[column] = literal_column(_MERGE_COUNTS.get(name, _MERGE_COUNTS["sqlite"]).format(
+                current=f"{table.name}.{column}", added=f"excluded.{column}"
+            ))
+        elif column not in keys:
+            set_[column] = table.c[column] + stmt.excluded[column]
+    db.execute(stmt.on_conflict_do_update(index_elements=[table.c[key] for key in keys], set_=set_))
+
+
+def _upsert_rollups(db: Session, pending: dict[tuple[str, datetime, str], dict]):
+    """Add {(period, bucket, team): counters} to stats_rollups in one statement"""
+    _increment(
+        db,
+        StatsRollup.__table__,
+        ("period", "bucket_start", "team_name"),
+        [
+            {"period": period, "bucket_start": bucket, "team_name": team, **counters}
+            for (period, bucket, team), counters in pending.items()
+        ],
+        json_counts=("ttm_sketch",)
+    )
+
+
+def _update_team_stats(db: Session, deltas: dict[Optional[str], tuple[int, int]]):
+    """Apply (open_prs, merged_prs) deltas to the per-team counters"""
+    _increment(db, TeamStats.__table__, ("team_name",), [
+        {"team_name": team_name, "open_prs": open_prs, "merged_prs": merged_prs}
+        for team_name, (open_prs, merged_prs) in deltas.items()
+        if team_name is not None and (open_prs != 0 or merged_prs != 0)
+    ])
+
+
+def record_pr_opened(db: Session, team_name: str, opened_at: datetime, reviewers: int):
+    record_prs_opened(db, [(team_name, opened_at, reviewers)])
+
+
+def record_prs_opened(db: Session, opens: List[tuple[str, datetime, int]]):
+    """Fold (team_name, opened_at, reviewers) tuples into one upsert of all touched rollup rows"""
+    pending: dict[tuple[str, datetime, str], dict] = {}
+    for team_name, opened_at, reviewers in opens:
+        for period in PERIODS:
+            bucket = bucket_start(opened_at, period)
+            for team in _rollup_teams(team_name):
+                counters = pending.setdefault((period, bucket, team), {"opened": 0, "assignments": 0})
+                counters["opened"] += 1
+                counters["assignments"] += reviewers
+    _upsert_rollups(db, pending)
+
+    teams: dict[str, int] = {}
+    for team_name, _, _ in opens:
+        teams[team_name] = teams.get(team_name, 0) + 1
+    _update_team_stats(db, {team_name: (count, 0) for team_name, count in teams.items()})
+
+
+def record_pr_merged(db: Session, team_name: str, created_at: datetime, merged_at: datetime):
+    record_prs_merged(db, [(team_name, created_at, merged_at)])
+
+
+def record_prs_merged(db: Session, merges: List[tuple[str, datetime, datetime]]):
+    """Fold (team_name, created_at, merged_at) tuples into one upsert of all touched rollup rows"""
+    teams: dict[str, int] = {}
+    for team_name, _, _ in merges:
+        teams[team_name] = teams.get(team_name, 0) + 1
+    _update_team_stats(db, {team_name: (-count, count) for team_name, count in teams.items()})
+
+    sketches: dict[tuple[str, datetime, str], LogHistogram] = {}
+    for team_name, created_at, merged_at in merges:
+        time_to_merge = (as_utc(merged_at) - as_utc(created_at)).total_seconds()
+        for period in PERIODS:
+            bucket = bucket_start(merged_at, period)
+            for team in _rollup_teams(team_name):
+                sketches.setdefault((period, bucket, team), LogHistogram()).add(time_to_merge)
+    # The stored sketch is merged inside the upsert: no read, no extra row lock
+    _upsert_rollups(db, {
+        key: {"merged": sketch.count, "ttm_sketch": sketch.to_json()}
+        for key, sketch in sketches.items()
+    })
+
+
+def record_authors_moved(db: Session, moves: dict[str, tuple[Optional[str], Optional[str]]]):
+    """Carry team_stats counters of authors moving {user_id: (old_team, new_team)}"""
+    rows = db.query(PullRequest.author_id, PullRequest.status, func.count()).filter(
+        PullRequest.author_id.in_(list(moves))
+    ).group_by(PullRequest.author_id, PullRequest.status)
+
+    # Archived PRs are merged ones that left the table
+    rows = [*rows, *((author_id, "MERGED", count) for author_id, count in archive.reader.merged_counts(moves).items())]
+
+    deltas: dict[Optional[str], list[int]] = {}
+    for author_id, status, count in rows:
+        column = 0 if status == "OPEN" else 1
+        old_team, new_team = moves[author_id]
+        deltas.setdefault(old_team, [0, 0])[column] -= count
+        deltas.setdefault(new_team, [0, 0])[column] += count
+    _update_team_stats(db, {team_name: tuple(counters) for team_name, counters in deltas.items()})
+
+
+def _percentiles(sketch: LogHistogram) -> Optional[dict]:
+    if sketch.count == 0:
+        return None
+    return {f"p{round(q * 100)}": sketch.quantile(q) for q in PERCENTILES}
+
+
+def get_timeseries(
+    db: Session,
+    period: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    team_name: Optional[str] = None
+) -> dict:
+    """Read rollup rows for a time range: one row per bucket (ORG_SHARDS without a team), never raw PRs"""
+    end = as_utc(end) if end else datetime.now(timezone.utc)
+    if start is None:
+        start = end - PERIODS[period] * (24 if period == "hour" else 30)
+    start = bucket_start(start, period)
+
+    query = db.query(StatsRollup).filter(
+        StatsRollup.period == period,
+        StatsRollup.bucket_start >= start,
+        StatsRollup.bucket_start <= end
+    )
+    if team_name:
+        query = query.filter(StatsRollup.team_name == team_name)
+    else:
+        query = query.filter(StatsRollup.team_name.in_(ORG_SHARD_NAMES))
+    rows: List[StatsRollup] = query.order_by(StatsRollup.bucket_start).all()
+
+    # Without a team filter the organisation shards of each bucket are summed
+    buckets: dict[datetime, list] = {}
+    for row in rows:
+        bucket = buckets.setdefault(as_utc(row.bucket_start), [0, 0, 0, LogHistogram()])
+        bucket[0] += row.opened
+        bucket[1] += row.merged
+        bucket[2] += row.assignments
+        bucket[3].merge(LogHistogram.from_json(row.ttm_sketch))
+
+    total_sketch = LogHistogram()
+    points = []
+    for bucket, (opened, merged, assignments, sketch) in buckets.items():
+        total_sketch.merge(sketch)
+        points.append({
+            "bucket_start": bucket,
+            "opened": opened,
+            "merged": merged,
+            "assignments": assignments,
+            "time_to_merge_seconds": _percentiles(sketch)
+        })
+
+    return {
+        "period": period,
+        "team_name": team_name,
+        "start": start,
+        "end": end,
+        "points": points,
+        "time_to_merge_seconds": _percentiles(total_sketch)
+    }
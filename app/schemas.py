@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -9,6 +9,10 @@ class TeamMember(BaseModel):
     is_active: bool
 
 
+# ?fields= selectors of the large read endpoints
+TeamMemberField = Literal["user_id", "username", "is_active"]
+
+
 class TeamCreate(BaseModel):
     team_name: str
     members: List[TeamMember]
@@ -22,7 +26,7 @@ class TeamResponse(BaseModel):
 class UserResponse(BaseModel):
     user_id: str
     username: str
-    team_name: str
+    team_name: Optional[str] = None  # None once removed from their team
     is_active: bool
 
 
@@ -54,6 +58,9 @@ class PullRequestShort(BaseModel):
     status: str
 
 
+PullRequestShortField = Literal["pull_request_id", "pull_request_name", "author_id", "status"]
+
+
 class PullRequestMerge(BaseModel):
     pull_request_id: str
 
@@ -73,6 +80,12 @@ class UserReviewResponse(BaseModel):
     pull_requests: List[PullRequestShort]
 
 
+class ReviewQueueResponse(BaseModel):
+    user_id: str
+    version: str  # pass back to /users/reviewPoll to wait for the next change
+    pull_requests: List[PullRequestShort]
+
+
 class ErrorDetail(BaseModel):
     code: str
     message: str
@@ -83,15 +96,174 @@ class ErrorResponse(BaseModel):
 
 
 class StatsResponse(BaseModel):
-    total_prs: int
-    open_prs: int
+    """Only the fields picked with ?fields= are present (all of them by default)"""
+    total_prs: Optional[int] = None
+    open_prs: Optional[int] = None
+    merged_prs: Optional[int] = None
+    total_users: Optional[int] = None
+    active_users: Optional[int] = None
+    total_teams: Optional[int] = None
+    reviewer_assignments: Optional[dict[str, int]] = None  # user_id -> count
+
+
+StatsField = Literal[
+    "total_prs", "open_prs", "merged_prs", "total_users", "active_users", "total_teams", "reviewer_assignments"
+]
+
+
+class ReviewerWorkload(BaseModel):
+    user_id: str
+    username: str
+    team_name: Optional[str] = None  # None once removed from their team
+    is_active: bool
+    assignments: int
+
+
+class ReviewerWorkloadResponse(BaseModel):
+    team_name: Optional[str] = None
+    status: str
+    reviewers: List[ReviewerWorkload]
+
+
+class TeamStatsItem(BaseModel):
+    team_name: str
+    members: int
+    active_members: int
+    open_prs: int  # PRs authored by the team
     merged_prs: int
-    total_users: int
-    active_users: int
-    total_teams: int
-    reviewer_assignments: dict[str, int]  # user_id -> count
+    open_assignments: int  # open reviews assigned to team members
+    max_open_assignments: int  # busiest member
+    idle_active_members: int  # active members without open reviews
+
+
+class TeamStatsResponse(BaseModel):
+    teams: List[TeamStatsItem]
+
+
+class TimeToMergePercentiles(BaseModel):
+    p50: float
+    p90: float
+    p99: float
+
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    opened: int
+    merged: int
+    assignments: int
+    time_to_merge_seconds: Optional[TimeToMergePercentiles] = None
+
+
+class TimeseriesResponse(BaseModel):
+    period: str
+    team_name: Optional[str] = None
+    start: datetime
+    end: datetime
+    points: List[TimeseriesPoint]
+    time_to_merge_seconds: Optional[TimeToMergePercentiles] = None  # over the whole range
+
+
+class BulkMergeRequest(BaseModel):
+    pull_request_ids: List[str]
+
+
+class BulkMergeResult(BaseModel):
+    pull_request_id: str
+    pr: Optional[PullRequestResponse] = None
+    error: Optional[ErrorDetail] = None
+
+
+class BulkMergeResponse(BaseModel):
+    results: List[BulkMergeResult]
+
+
+class BulkReassignRequest(BaseModel):
+    items: List[PullRequestReassign]
+
+
+class BulkReassignResult(BaseModel):
+    pull_request_id: str
+    old_user_id: str
+    pr: Optional[PullRequestResponse] = None
+    replaced_by: Optional[str] = None
+    error: Optional[ErrorDetail] = None
+
+
+class BulkReassignResponse(BaseModel):
+    results: List[BulkReassignResult]
+
+
+class ChangeEntry(BaseModel):
+    cursor: int
+    entity: str  # team, user or pull_request
+    entity_id: str
+    event: str
+    data: dict  # entity snapshot after the change
+    createdAt: datetime
+
+
+class ChangesResponse(BaseModel):
+    changes: List[ChangeEntry]
+    next_cursor: int  # pass as since to get the following page
+    has_more: bool
+
+
+class TeamMembersAddRequest(BaseModel):
+    team_name: str
+    members: List[TeamMember]
+    reassign_reviews: bool = False  # for members moved in from another team
+
+
+class TeamMembersRemoveRequest(BaseModel):
+    team_name: str
+    user_ids: List[str]
+    reassign_reviews: bool = False
+
+
+class TeamMembersMoveRequest(BaseModel):
+    team_name: str  # target team
+    user_ids: List[str]
+    reassign_reviews: bool = False
+
+
+class TeamFallbacks(BaseModel):
+    team_name: str
+    fallback_teams: List[str]  # highest priority first
+
+
+class TeamMembersResponse(BaseModel):
+    team_name: str
+    members: List[UserResponse]  # affected members only
+    reassigned: List[BulkReassignResult]
+
+
+class BulkSetActiveRequest(BaseModel):
+    users: List[UserSetActive]
+    reassign_reviews: bool = False  # reassign open reviews of deactivated users
+
+
+class BulkSetActiveResult(BaseModel):
+    user_id: str
+    user: Optional[UserResponse] = None
+    changed: bool = False
+    reassigned: List[BulkReassignResult] = []
+    error: Optional[ErrorDetail] = None
+
+
+class BulkSetActiveResponse(BaseModel):
+    results: List[BulkSetActiveResult]
 
 
 class BulkDeactivateRequest(BaseModel):
     team_name: str
 
+
+class ProfileStatus(BaseModel):
+    running: bool
+    mode: str  # window or requests
+    request_rate: Optional[float] = None
+    interval_ms: float
+    started_at: Optional[datetime] = None
+    remaining_s: float
+    samples: int
+    stacks: int
@@ -0,0 +1,338 @@
+"""
+Synthetic data generator for local seeding and capacity tests.
+
+Generates an organisation of a configurable shape - number of teams, team-size
+distribution, share of inactive users, PR history length and open/merged mix -
+and bulk-loads it in one transaction: COPY FROM STDIN on Postgres, executemany
+batches on SQLite. team_stats and stats_rollups are computed while generating,
+so /stats, /stats/teams and later incremental updates start from a consistent
+state. The change feed starts empty.
+
+Run with: python -m app.seed --teams 200 --team-size 3:40 --prs 1000000
+Uses DATABASE_URL; the schema must exist (alembic upgrade head) and the tables
+must be empty unless --truncate is given. Seed before starting the service:
+running workers keep their in-memory assignment index.
+"""
+import argparse
+import io
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from app import config
+from app.models import PullRequest, pr_reviewers
+from app.rollups import org_shard
+from app.sketch import LogHistogram
+
+TABLES = (
+    "idempotency_keys", "archived_pull_requests", "change_log", "stats_rollups", "team_stats", "pr_reviewers",
+    "pull_requests", "users", "team_fallbacks", "teams"
+)
+SIZE_DISTRIBUTIONS = ("uniform", "pareto")
+EPOCH = datetime(1970, 1, 1)
+HOUR, DAY = 3600, 86400
+# Median time to merge of generated PRs
+MEDIAN_TTM_S = 20 * HOUR
+
+
+class _Timestamps:
+    """Formats whole epoch seconds; the date part is cached per day"""
+
+    def __init__(self, suffix: str):
+        self.suffix = suffix
+        self._days: dict[int, str] = {}
+
+    def __call__(self, seconds: int) -> str:
+        day, rest = divmod(seconds, DAY)
+        prefix = self._days.get(day)
+        if prefix is None:
+            prefix = self._days[day] = f"{(EPOCH + timedelta(days=day)).date()} "
+        return f"{prefix}{rest // HOUR:02d}:{rest % HOUR // 60:02d}:{rest % 60:02d}{self.suffix}"
+
+
+class _SQLiteLoader:
+    true, false = 1, 0
+    # Same text SQLAlchemy stores, so range filters and upserts keep matching
+    timestamp = _Timestamps(".000000")
+
+    def __init__(self, conn: Connection):
+        self.cursor = conn.connection.cursor()
+        # Seeding is repeatable; skip the fsyncs
+        self.cursor.execute("PRAGMA synchronous = OFF")
+
+    def load(self, table: str, columns: tuple[str, ...], rows: list[tuple]):
+        placeholders = ", ".join("?" * len(columns))
+        self.cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows)
+
+    def truncate(self):
+        for table in TABLES:
+            self.cursor.execute(f"DELETE FROM {table}")
+
+    def finish(self):
+        self.cursor.execute("ANALYZE")
+
+
+class _PostgresLoader:
+    true, false = "t", "f"
+    timestamp = _Timestamps("+00")
+
+    def __init__(self, conn: Connection):
+        self.cursor = conn.connection.cursor()
+
+    def load(self, table: str, columns: tuple[str, ...], rows: list[tuple]):
+        # Generated values never contain tabs, newlines or backslashes
+        buffer = io.StringIO()
+        buffer.writelines(
+            "\t".join("\\N" if value is None else str(value) for value in row) + "\n" for row in rows
+        )
+        buffer.seek(0)
+        self.cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+    def truncate(self):
+        self.cursor.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY")
+
+    def finish(self):
+        # Explicit ids were loaded; move the sequences past them
+        for table in ("users", "pull_requests"):
+            self.cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT coalesce(max(id), 0) + 1 FROM {table}), false)"
+            )
+        self.cursor.execute("ANALYZE")
+
+
+def team_sizes(rng: random.Random, teams: int, min_size: int, max_size: int, distribution: str) -> list[int]:
+    if distribution == "pareto":
+        # Many small teams, a few large ones
+        return [min(max_size, int(min_size * rng.paretovariate(1.5))) for _ in range(teams)]
+    return [rng.randint(min_size, max_size) for _ in range(teams)]
+
+
+def pick_reviewers(rng: random.Random, pool: list[int], author_pk: int, count: int) -> list[int]:
+    """Up to count distinct pool members other than the author"""
+    picked: list[int] = []
+    size = len(pool)
+    for _ in range(4 * count):
+        if len(picked) == count:
+            return picked
+        pk = pool[int(rng.random() * size)] if size else author_pk
+        if pk != author_pk and pk not in picked:
+            picked.append(pk)
+    # Small or mostly excluded pool: fall back to an exact draw
+    return [pk for pk in rng.sample(pool, min(size, count + 1)) if pk != author_pk][:count]
+
+
+def _sketch_json(bins: dict[int, int]) -> str:
+    # LogHistogram.to_json, without json.dumps overhead for a million tiny dicts
+    return "{" + ", ".join(f'"{index}": {count}' for index, count in bins.items()) + "}"
+
+
+def _rollups(hourly: dict[tuple[int, str], list]) -> dict[tuple[str, int, str], list]:
+    """Per-team hour buckets -> every (period, bucket, team) stats_rollups row"""
+    rollups = {("hour", hour, team): row for (hour, team), row in hourly.items()}
+    for (hour, team), (opened, merged, assignments, bins) in hourly.items():
+        day, shard = hour - hour % DAY, org_shard(team)
+        for key in (("hour", hour, shard), ("day", day, team), ("day", day, shard)):
+            row = rollups.get(key)
+            if row is None:
+                row = rollups[key] = [0, 0, 0, {}]
+            row[0] += opened
+            row[1] += merged
+            row[2] += assignments
+            for index, count in bins.items():
+                row[3][index] = row[3].get(index, 0) + count
+    return rollups
+
+
+def seed(
+    engine: Engine,
+    *,
+    teams: int = 100,
+    min_team_size: int = 3,
+    max_team_size: int = 40,
+    size_distribution: str = "uniform",
+    inactive_ratio: float = 0.1,
+    prs: int = 100_000,
+    history_days: int = 365,
+    open_ratio: float = 0.1,
+    reviewers: int = 2,
+    batch_size: int = 50_000,
+    truncate: bool = False,
+    random_seed: int = 0,
+    now: datetime = None,
+) -> dict:
+    """Generate and load one organisation; returns row counts per table"""
+    rng = random.Random(random_seed)
+    now_s = int(((now or datetime.utcnow()) - EPOCH).total_seconds())
+    span_s = history_days * DAY
+    sketch = LogHistogram()
+
+    with engine.begin() as conn:
+        loader = _PostgresLoader(conn) if engine.dialect.name == "postgresql" else _SQLiteLoader(conn)
+        if truncate:
+            loader.truncate()
+        elif conn.execute(text("SELECT 1 FROM users UNION ALL SELECT 1 FROM teams LIMIT 1")).first():
+            raise SystemExit("Database is not empty; pass --truncate to replace its contents")
+
+        team_names = [f"team-{t}" for t in range(teams)]
+        loader.load("teams", ("team_name",), [(name,) for name in team_names])
+
+        # (pk, user_id, team_name); per team: every member pk and the active ones
+        users, user_rows = [], []
+        members: dict[str, list[int]] = {}
+        active: dict[str, list[int]] = {}
+        sizes = team_sizes(rng, teams, min_team_size, max_team_size, size_distribution)
+        for team_name, size in zip(team_names, sizes, strict=True):
+            members[team_name], active[team_name] = [], []
+            for i in range(size):
+                pk = len(users) + 1
+                user_id = f"u-{team_name[5:]}-{i}"
+                is_active = rng.random() >= inactive_ratio
+                users.append((pk, user_id, team_name))
+                user_rows.append((pk, user_id, f"User {team_name[5:]}-{i}", team_name,
+                                  loader.true if is_active else loader.false))
+                members[team_name].append(pk)
+                if is_active:
+                    active[team_name].append(pk)
+        loader.load("users", ("id", "user_id", "username", "team_name", "is_active"), user_rows)
+
+        # Building the secondary indexes once after the load beats updating them per row
+        indexes = [*PullRequest.__table__.indexes, *pr_reviewers.indexes]
+        for index in indexes:
+            index.drop(conn, checkfirst=True)
+
+        # (hour second, team) -> [opened, merged, assignments, ttm bins]; day and
+        # organisation shard rows are summed from these at the end
+        hourly: dict[tuple[int, str], list] = {}
+        team_stats = {team_name: [0, 0] for team_name in team_names}
+        reviewer_rows = 0
+        mu = math.log(MEDIAN_TTM_S)
+
+        for start in range(0, prs, batch_size):
+            pr_rows, pair_rows = [], []
+            for pk in range(start + 1, min(start + batch_size, prs) + 1):
+                author_pk, author_id, team_name = users[int(rng.random() * len(users))]
+                created_s = now_s - int(rng.random() * span_s)
+                is_open = rng.random() < open_ratio
+
+                # Open PRs only wait on active reviewers; history may include anyone
+                pool = active[team_name] if is_open else members[team_name]
+                picked = pick_reviewers(rng, pool, author_pk, reviewers)
+                for reviewer_pk in picked:
+                    pair_rows.append((pk, reviewer_pk))
+
+                key = (created_s - created_s % HOUR, team_name)
+                row = hourly.get(key)
+                if row is None:
+                    row = hourly[key] = [0, 0, 0, {}]
+                row[0] += 1
+                row[2] += len(picked)
+
+                if is_open:
+                    merged_s = None
+                    team_stats[team_name][0] += 1
+                else:
+                    merged_s = min(now_s, created_s + max(60, int(rng.lognormvariate(mu, 1.0))))
+                    team_stats[team_name][1] += 1
+                    key = (merged_s - merged_s % HOUR, team_name)
+                    row = hourly.get(key)
+                    if row is None:
+                        row = hourly[key] = [0, 0, 0, {}]
+                    row[1] += 1
+                    index = sketch.bin_index(merged_s - created_s)
+                    row[3][index] = row[3].get(index, 0) + 1
+
+                pr_rows.append((
+                    pk, f"pr-{pk}", f"Change {pk}", author_id, "OPEN" if is_open else "MERGED",
+                    loader.timestamp(created_s), None if merged_s is None else loader.timestamp(merged_s)
+                ))
+
+            loader.load(
+                "pull_requests",
+                ("id", "pull_request_id", "pull_request_name", "author_id", "status", "created_at", "merged_at"),
+                pr_rows
+            )
+            loader.load("pr_reviewers", ("pull_request_pk", "user_pk"), pair_rows)
+            reviewer_rows += len(pair_rows)
+
+        for index in indexes:
+            index.create(conn)
+
+        loader.load(
+            "team_stats",
+            ("team_name", "open_prs", "merged_prs"),
+            [(team_name, open_prs, merged_prs) for team_name, (open_prs, merged_prs) in team_stats.items()]
+        )
+        rollup_rows = [
+            (period, team, loader.timestamp(bucket), opened, merged, assignments, _sketch_json(bins))
+            for (period, bucket, team), (opened, merged, assignments, bins) in _rollups(hourly).items()
+        ]
+        for start in range(0, len(rollup_rows), batch_size):
+            loader.load(
+                "stats_rollups",
+                ("period", "team_name", "bucket_start", "opened", "merged", "assignments", "ttm_sketch"),
+                rollup_rows[start:start + batch_size]
+            )
+        loader.finish()
+
+    return {
+        "teams": teams,
+        "users": len(users),
+        "pull_requests": prs,
+        "pr_reviewers": reviewer_rows,
+        "stats_rollups": len(rollup_rows),
+    }
+
+
+def _team_size(value: str) -> tuple[int, int]:
+    low, _, high = value.partition(":")
+    low, high = int(low), int(high or low)
+    if not 1 <= low <= high:
+        raise argparse.ArgumentTypeError("expected MIN:MAX with 1 <= MIN <= MAX")
+    return low, high
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with a synthetic organisation")
+    parser.add_argument("--teams", type=int, default=100)
+    parser.add_argument("--team-size", type=_team_size, default=(3, 40), metavar="MIN:MAX")
+    parser.add_argument("--size-distribution", choices=SIZE_DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--inactive-ratio", type=float, default=0.1)
+    parser.add_argument("--prs", type=int, default=100_000)
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--open-ratio", type=float, default=0.1)
+    parser.add_argument("--reviewers", type=int, default=2, help="reviewers per PR, at most")
+    parser.add_argument("--batch-size", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--truncate", action="store_true", help="delete existing data first")
+    args = parser.parse_args()
+
+    connect_args = {"check_same_thread": False} if config.DATABASE_URL.startswith("sqlite") else {}
+    engine = create_engine(config.DATABASE_URL, connect_args=connect_args)
+    started = time.perf_counter()
+    counts = seed(
+        engine,
+        teams=args.teams,
+        min_team_size=args.team_size[0],
+        max_team_size=args.team_size[1],
+        size_distribution=args.size_distribution,
+        inactive_ratio=args.inactive_ratio,
+        prs=args.prs,
+        history_days=args.history_days,
+        open_ratio=args.open_ratio,
+        reviewers=args.reviewers,
+        batch_size=args.batch_size,
+        truncate=args.truncate,
+        random_seed=args.seed,
+    )
+    elapsed = time.perf_counter() - started
+    for table, count in counts.items():
+        print(f"{table:>15}: {count:>10,}")
+    print(f"Seeded in {elapsed:.1f}s ({counts['pull_requests'] / elapsed:,.0f} PRs/s)")
+
+
+if __name__ == "__main__":
+    main()
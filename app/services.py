@@ -1,7 +1,10 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.models import Team, User, PullRequest
+from sqlalchemy import case, func
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.orm import Session, joinedload
+from app.models import ArchivedPullRequest, Team, TeamFallback, User, PullRequest, TeamStats, pr_reviewers
 from app.exceptions import (
+    ServiceException,
     TeamExistsError,
     TeamNotFoundError,
     UserNotFoundError,
@@ -9,10 +12,17 @@ from app.exceptions import (
     PRNotFoundError,
     PRMergedError,
     ReviewerNotAssignedError,
-    NoCandidateError
+    NoCandidateError,
+    InvalidFallbackError
 )
-import random
-from typing import List
+from app import changes, rollups
+from app.loader import get_loader
+from app.retry import is_conflict, retry_on_conflict
+from app.cache import assignment_index, invalidate_teams, publish_members
+from app.review_stream import notify_reviewers
+from datetime import datetime, timezone
+from collections import defaultdict
+from typing import Iterable, List, Optional, Union
 
 
 def get_team_by_name(db: Session, team_name: str) -> Team:
@@ -22,7 +32,26 @@ def get_team_by_name(db: Session, team_name: str) -> Team:
     return team
 
 
+def get_team_member_rows(db: Session, team_name: str) -> List[tuple]:
+    """(user_id, username, is_active) rows of a team's members, without ORM objects"""
+    rows = db.query(User.user_id, User.username, User.is_active).filter(
+        User.team_name == team_name
+    ).order_by(User.id).all()
+    if not rows:
+        # Empty team or no team at all
+        get_team_by_name(db, team_name)
+    return rows
+
+
 def create_team(db: Session, team_name: str, members: List[dict]) -> Team:
+    team = _create_team(db, team_name, members)
+    # Outside the retry: a failed reload must not rerun the committed insert
+    db.refresh(team)
+    return team
+
+
+@retry_on_conflict
+def _create_team(db: Session, team_name: str, members: List[dict]) -> Team:
     existing_team = db.query(Team).filter(Team.team_name == team_name).first()
     if existing_team:
         raise TeamExistsError(f"Team '{team_name}' already exists")
@@ -31,10 +60,16 @@ def create_team(db: Session, team_name: str, members: List[dict]) -> Team:
     db.add(team)
     db.flush()
 
+    changed_teams = {team_name}
+    moved_authors = {}
+    loader = get_loader(db)
+    existing = loader.users(member_data["user_id"] for member_data in members)
     for member_data in members:
-        user = db.query(User).filter(User.user_id == member_data["user_id"]).first()
+        user = existing.get(member_data["user_id"])
         if user:
             # Update existing user
+            changed_teams.add(user.team_name)
+            moved_authors[user.user_id] = (user.team_name, team_name)
             user.username = member_data["username"]
             user.is_active = member_data["is_active"]
             user.team_name = team_name
@@ -47,50 +82,352 @@ def create_team(db: Session, team_name: str, members: List[dict]) -> Team:
                 is_active=member_data["is_active"]
             )
             db.add(user)
+            loader.prime(user)
 
+    if moved_authors:
+        rollups.record_authors_moved(db, moved_authors)
+    changes.record(db, "team", team_name, "team.created", {
+        "team_name": team_name,
+        "members": [
+            {"user_id": m["user_id"], "username": m["username"], "is_active": m["is_active"]}
+            for m in members
+        ]
+    })
     db.commit()
-    db.refresh(team)
+    invalidate_teams(*changed_teams)
     return team
 
 
 def get_user_by_id(db: Session, user_id: str) -> User:
-    user = db.query(User).filter(User.user_id == user_id).first()
+    user = get_loader(db).user(user_id)
     if not user:
         raise UserNotFoundError(f"User '{user_id}' not found")
     return user
 
 
 def set_user_active(db: Session, user_id: str, is_active: bool) -> User:
+    user = _set_user_active(db, user_id, is_active)
+    publish_members(db, [user_id])
+    db.refresh(user)
+    return user
+
+
+@retry_on_conflict
+def _set_user_active(db: Session, user_id: str, is_active: bool) -> User:
     user = get_user_by_id(db, user_id)
     user.is_active = is_active
+    _record_user(db, _user_dict(user))
     db.commit()
-    db.refresh(user)
     return user
 
 
-def get_active_reviewers_from_team(db: Session, team_name: str, exclude_user_id: str = None) -> List[User]:
-    """Get active users from team, excluding specified user"""
-    query = db.query(User).filter(
-        and_(
-            User.team_name == team_name,
-            User.is_active == True
+def bulk_set_user_active(
+    db: Session,
+    items: List[tuple[str, bool]],
+    reassign_reviews: bool = False
+) -> List[dict]:
+    """Set is_active of many users with one UPDATE; outcomes are reported per user.
+
+    With reassign_reviews the open reviews of deactivated users are reassigned
+    in the same transaction, using the reassign_reviewer candidate rules.
+    """
+    outcomes = _bulk_set_user_active(db, items, reassign_reviews)
+    changed = [outcome["user_id"] for outcome in outcomes if outcome.get("changed")]
+    if changed:
+        publish_members(db, changed)
+    return outcomes
+
+
+@retry_on_conflict
+def _bulk_set_user_active(
+    db: Session,
+    items: List[tuple[str, bool]],
+    reassign_reviews: bool = False
+) -> List[dict]:
+    wanted = dict(items)
+    rows = {
+        row.user_id: row for row in db.query(
+            User.id, User.user_id, User.username, User.team_name, User.is_active
+        ).filter(User.user_id.in_(wanted))
+    }
+    changed = {
+        user_id: is_active for user_id, is_active in wanted.items()
+        if user_id in rows and rows[user_id].is_active != is_active
+    }
+    deactivated = [user_id for user_id, is_active in changed.items() if not is_active]
+
+    if changed:
+        db.query(User).filter(User.user_id.in_(changed)).update(
+            {User.is_active: case(changed, value=User.user_id)},
+            synchronize_session=False
+        )
+        for user_id, is_active in changed.items():
+            _record_user(db, {**_user_dict(rows[user_id]), "is_active": is_active})
+
+    # After the UPDATE, so users activated here pass the claim's is_active check
+    results, replaced = [], []
+    if reassign_reviews and deactivated:
+        results, replaced = _reassign_reviewers(
+            db,
+            _open_review_items(db, [rows[user_id].id for user_id in deactivated]),
+            unavailable=frozenset(deactivated),
+            activated={user_id: rows[user_id].team_name for user_id, is_active in changed.items() if is_active}
+        )
+
+    reassigned = defaultdict(list)
+    for result in results:
+        reassigned[result["old_user_id"]].append(result)
+    outcomes = []
+    for user_id, is_active in wanted.items():
+        if user_id not in rows:
+            outcomes.append({"user_id": user_id, "error": UserNotFoundError(f"User '{user_id}' not found")})
+            continue
+        outcomes.append({
+            "user_id": user_id,
+            "user": {**_user_dict(rows[user_id]), "is_active": is_active},
+            "changed": user_id in changed,
+            "reassigned": reassigned[user_id]
+        })
+
+    if changed or replaced:
+        db.commit()
+        _publish_reassignments(results, replaced)
+    return outcomes
+
+
+def _get_users(db: Session, user_ids: List[str]) -> List[User]:
+    users = get_loader(db).users(user_ids)
+    for user_id in user_ids:
+        if user_id not in users:
+            raise UserNotFoundError(f"User '{user_id}' not found")
+    return list(users.values())
+
+
+def _open_review_items(db: Session, user_pks: List[int]) -> List[tuple[str, str]]:
+    """(pull_request_id, reviewer user_id) of every open review of some users"""
+    return db.query(PullRequest.pull_request_id, User.user_id).join(
+        pr_reviewers, pr_reviewers.c.pull_request_pk == PullRequest.id
+    ).join(
+        User, User.id == pr_reviewers.c.user_pk
+    ).filter(
+        PullRequest.status == "OPEN",
+        pr_reviewers.c.user_pk.in_(user_pks)
+    ).order_by(PullRequest.id).all()
+
+
+def _change_membership(
+    db: Session,
+    users: List[User],
+    team_name: Optional[str],
+    event: str,
+    reassign_reviews: bool
+) -> tuple[List[dict], List[tuple[str, str]]]:
+    """Move users to team_name (None removes them from their team) in the session.
+
+    With reassign_reviews their open reviews go to other members of the team
+    they are leaving, using the reassign_reviewer candidate rules. Returns the
+    reassignment results and (old, new) pairs.
+    """
+    movers = [user for user in users if user.team_name != team_name]
+    if not movers:
+        return [], []
+
+    reassigned = [], []
+    if reassign_reviews:
+        # Reviewer teams are read before the move, so candidates come from the old team
+        reassigned = _reassign_reviewers(
+            db,
+            _open_review_items(db, [user.id for user in movers]),
+            unavailable=frozenset(user.user_id for user in movers)
         )
+
+    rollups.record_authors_moved(db, {user.user_id: (user.team_name, team_name) for user in movers})
+    for user in movers:
+        user.team_name = team_name
+        _record_user(db, _user_dict(user), event)
+    return reassigned
+
+
+def _commit_membership(
+    db: Session,
+    team_name: str,
+    users: List[User],
+    reassigned: tuple[List[dict], List[tuple[str, str]]]
+) -> dict:
+    results, replaced = reassigned
+    snapshot = {
+        "team_name": team_name,
+        "members": [_user_dict(user) for user in users],
+        "reassigned": results
+    }
+    db.commit()
+    _publish_reassignments(results, replaced)
+    return snapshot
+
+
+def _publish_membership(db: Session, snapshot: dict) -> dict:
+    """Publish the members of a committed membership change, outside its retry"""
+    # After the reassignment counts, so the published records carry fresh open-review counts
+    publish_members(db, [member["user_id"] for member in snapshot["members"]])
+    return snapshot
+
+
+def add_team_members(db: Session, team_name: str, members: List[dict], reassign_reviews: bool = False) -> dict:
+    """Create users in a team or move existing ones into it, touching only their rows"""
+    return _publish_membership(db, _add_team_members(db, team_name, members, reassign_reviews))
+
+
+@retry_on_conflict
+def _add_team_members(db: Session, team_name: str, members: List[dict], reassign_reviews: bool = False) -> dict:
+    get_team_by_name(db, team_name)
+    existing = {u.user_id: u for u in db.query(User).filter(User.user_id.in_({m["user_id"] for m in members}))}
+    staying = [user for user in existing.values() if user.team_name == team_name]
+
+    users: dict[str, User] = {}
+    created = []
+    for member_data in members:
+        user = users.get(member_data["user_id"]) or existing.get(member_data["user_id"])
+        if user is None:
+            user = User(user_id=member_data["user_id"], team_name=team_name)
+            db.add(user)
+            created.append(user)
+        user.username = member_data["username"]
+        user.is_active = member_data["is_active"]
+        users[user.user_id] = user
+    # The reassignment reloads the movers' PRs with populate_existing, which would
+    # overwrite unflushed edits of a mover who reviews one of them
+    db.flush()
+
+    reassigned = _change_membership(db, list(existing.values()), team_name, "user.moved", reassign_reviews)
+    for user in staying:
+        _record_user(db, _user_dict(user), "user.updated")
+    for user in created:
+        _record_user(db, _user_dict(user), "user.created")
+    return _commit_membership(db, team_name, list(users.values()), reassigned)
+
+
+def remove_team_members(db: Session, team_name: str, user_ids: List[str], reassign_reviews: bool = False) -> dict:
+    """Take users out of a team; they keep their history but are no longer candidates"""
+    return _publish_membership(db, _remove_team_members(db, team_name, user_ids, reassign_reviews))
+
+
+@retry_on_conflict
+def _remove_team_members(db: Session, team_name: str, user_ids: List[str], reassign_reviews: bool = False) -> dict:
+    get_team_by_name(db, team_name)
+    users = _get_users(db, user_ids)
+    for user in users:
+        if user.team_name != team_name:
+            raise UserNotFoundError(f"User '{user.user_id}' is not a member of team '{team_name}'")
+    reassigned = _change_membership(db, users, None, "user.removed", reassign_reviews)
+    return _commit_membership(db, team_name, users, reassigned)
+
+
+def move_team_members(db: Session, team_name: str, user_ids: List[str], reassign_reviews: bool = False) -> dict:
+    """Move users from whatever team they are in to team_name"""
+    return _publish_membership(db, _move_team_members(db, team_name, user_ids, reassign_reviews))
+
+
+@retry_on_conflict
+def _move_team_members(db: Session, team_name: str, user_ids: List[str], reassign_reviews: bool = False) -> dict:
+    get_team_by_name(db, team_name)
+    users = _get_users(db, user_ids)
+    reassigned = _change_membership(db, users, team_name, "user.moved", reassign_reviews)
+    return _commit_membership(db, team_name, users, reassigned)
+
+
+def get_team_fallbacks(db: Session, team_name: str) -> List[str]:
+    """Fallback teams of a team, highest priority first"""
+    get_team_by_name(db, team_name)
+    return [
+        fallback_team for (fallback_team,) in db.query(TeamFallback.fallback_team).filter(
+            TeamFallback.team_name == team_name
+        ).order_by(TeamFallback.priority)
+    ]
+
+
+@retry_on_conflict
+def set_team_fallbacks(db: Session, team_name: str, fallback_teams: List[str]) -> List[str]:
+    """Replace the teams a team borrows replacement reviewers from; list order is the priority"""
+    get_team_by_name(db, team_name)
+    fallback_teams = list(dict.fromkeys(fallback_teams))
+    if team_name in fallback_teams:
+        raise InvalidFallbackError(f"Team '{team_name}' cannot fall back to itself")
+    existing = {t for (t,) in db.query(Team.team_name).filter(Team.team_name.in_(fallback_teams))}
+    for fallback_team in fallback_teams:
+        if fallback_team not in existing:
+            raise TeamNotFoundError(f"Team '{fallback_team}' not found")
+
+    db.query(TeamFallback).filter(TeamFallback.team_name == team_name).delete(synchronize_session=False)
+    db.add_all(
+        TeamFallback(team_name=team_name, priority=priority, fallback_team=fallback_team)
+        for priority, fallback_team in enumerate(fallback_teams)
     )
-    if exclude_user_id:
-        query = query.filter(User.user_id != exclude_user_id)
-    return query.all()
+    db.commit()
+    # Fallbacks are indexed with the team's roster
+    invalidate_teams(team_name)
+    return fallback_teams
 
 
-def assign_reviewers(db: Session, author_id: str) -> List[str]:
-    """Assign up to 2 active reviewers from author's team, excluding author"""
-    author = get_user_by_id(db, author_id)
-    candidates = get_active_reviewers_from_team(db, author.team_name, exclude_user_id=author_id)
+def _user_dict(user) -> dict:
+    """User (or a users row) in UserResponse shape"""
+    return {"user_id": user.user_id, "username": user.username, "team_name": user.team_name, "is_active": user.is_active}
+
+
+def _record_user(db: Session, state: dict, event: str = None):
+    if event is None:
+        event = "user.activated" if state["is_active"] else "user.deactivated"
+    changes.record(db, "user", state["user_id"], event, state)
+
+
+def _record_pr(db: Session, event: str, snapshot: dict, **extra):
+    changes.record(db, "pull_request", snapshot["pull_request_id"], event, {**snapshot, **extra})
+
+
+def _claim_reviewers(db: Session, candidates: List[str], count: int) -> List[User]:
+    """Load and lock the first count candidates that are still active.
+
+    The picks are loaded anyway to be attached to the PR; that one query also locks
+    them. FOR SHARE SKIP LOCKED: a candidate whose row another transaction is
+    changing (e.g. deactivating it) is passed over for the next ones instead of
+    waited on, and only then are further candidates read.
+    """
+    claimed = []
+    start, window = 0, count
+    while len(claimed) < count and start < len(candidates):
+        chunk = candidates[start:start + window]
+        rows = db.query(User).filter(
+            User.user_id.in_(chunk),
+            User.is_active == True
+        ).with_for_update(read=True, skip_locked=True).all()
+        rows.sort(key=lambda user: chunk.index(user.user_id))
+        get_loader(db).prime(*rows)
+        claimed.extend(rows[:count - len(claimed)])
+        start, window = start + window, max(2 * count, 4)
+    return claimed
+
+
+def _claim_from_pool(
+    db: Session,
+    pool: List[tuple[str, List[str]]],
+    count: int,
+    pending: dict[str, int] = None
+) -> List[User]:
+    """Claim from a candidate_pool: the team's least loaded members, then each fallback team's in turn"""
+    candidates = [
+        user_id for _, team_candidates in pool
+        for user_id in assignment_index.least_loaded_first(team_candidates, pending)
+    ]
+    return _claim_reviewers(db, candidates, count)
 
-    # Select up to 2 random reviewers
-    num_reviewers = min(2, len(candidates))
-    selected = random.sample(candidates, num_reviewers) if candidates else []
 
-    return [user.user_id for user in selected]
+def assign_reviewers(db: Session, author_id: str) -> List[User]:
+    """Assign up to 2 active reviewers from author's team, excluding author"""
+    # Candidates come from the in-memory assignment index; only the picks are read
+    author = assignment_index.get_user(db, author_id)
+    if author is None:
+        raise UserNotFoundError(f"User '{author_id}' not found")
+    candidates = assignment_index.active_candidates(db, author.team_name, exclude_user_ids={author_id})
+    return _claim_reviewers(db, assignment_index.least_loaded_first(candidates), 2)
 
 
 def create_pull_request(
@@ -99,39 +436,203 @@ def create_pull_request(
     pull_request_name: str,
     author_id: str
 ) -> PullRequest:
-    # Check if PR already exists
-    existing_pr = db.query(PullRequest).filter(
-        PullRequest.pull_request_id == pull_request_id
-    ).first()
-    if existing_pr:
+    return _reload_pr(db, _create_pull_request(db, pull_request_id, pull_request_name, author_id))
+
+
+def _taken_pull_request_ids(db: Session, pull_request_ids: Iterable[str]) -> set[str]:
+    """Ids of existing PRs, live or moved to the archive; neither can be created again"""
+    pull_request_ids = list(pull_request_ids)
+    live = db.query(PullRequest.pull_request_id).filter(PullRequest.pull_request_id.in_(pull_request_ids))
+    archived = db.query(ArchivedPullRequest.pull_request_id).filter(
+        ArchivedPullRequest.pull_request_id.in_(pull_request_ids)
+    )
+    return {pull_request_id for (pull_request_id,) in live.union(archived)}
+
+
+@retry_on_conflict
+def _create_pull_request(
+    db: Session,
+    pull_request_id: str,
+    pull_request_name: str,
+    author_id: str
+) -> PullRequest:
+    if _taken_pull_request_ids(db, [pull_request_id]):
         raise PRExistsError(f"PR '{pull_request_id}' already exists")
 
-    # Verify author exists
-    author = get_user_by_id(db, author_id)
+    # Verify author exists; assign_reviewers finds the same index record again
+    author = assignment_index.get_user(db, author_id)
+    if author is None:
+        raise UserNotFoundError(f"User '{author_id}' not found")
 
     # Create PR
+    created_at = datetime.now(timezone.utc)
     pr = PullRequest(
         pull_request_id=pull_request_id,
         pull_request_name=pull_request_name,
         author_id=author_id,
-        status="OPEN"
+        status="OPEN",
+        created_at=created_at
     )
 
-    # Assign reviewers
-    reviewer_ids = assign_reviewers(db, author_id)
-    reviewers = db.query(User).filter(User.user_id.in_(reviewer_ids)).all()
+    # Assign reviewers; a concurrent create of the same id fails the commit and
+    # the retry reports PR_EXISTS
+    reviewers = assign_reviewers(db, author_id)
+    reviewer_ids = [r.user_id for r in reviewers]
     pr.assigned_reviewers = reviewers
 
     db.add(pr)
+    rollups.record_pr_opened(db, author.team_name, created_at, len(reviewers))
+    snapshot = pr_to_dict(pr)
+    _record_pr(db, "pull_request.created", snapshot)
     db.commit()
-    db.refresh(pr)
+    assignment_index.add_open_reviews(reviewer_ids, 1)
+    notify_reviewers("assigned", reviewer_ids, snapshot)
     return pr
 
 
-def merge_pull_request(db: Session, pull_request_id: str) -> PullRequest:
-    pr = db.query(PullRequest).filter(
+def _assign_batch_reviewers(db: Session, authors: list) -> List[List[User]]:
+    """Up to 2 reviewers for each of several new PRs, claimed together in one query.
+
+    Each PR takes its least loaded candidates from the index, counting the picks
+    of earlier PRs in the batch. A pick that was skipped or is no longer active
+    is replaced through _claim_reviewers for that PR alone.
+    """
+    picked = defaultdict(int)
+    orders = []
+    for author in authors:
+        candidates = assignment_index.least_loaded_first(
+            assignment_index.active_candidates(db, author.team_name, exclude_user_ids={author.user_id}),
+            picked
+        )
+        orders.append(candidates)
+        for user_id in candidates[:2]:
+            picked[user_id] += 1
+
+    claimed = {}
+    if picked:
+        rows = db.query(User).filter(
+            User.user_id.in_(list(picked)),
+            User.is_active == True
+        ).with_for_update(read=True, skip_locked=True).all()
+        get_loader(db).prime(*rows)
+        claimed = {user.user_id: user for user in rows}
+
+    reviewers = []
+    for candidates in orders:
+        chosen = [claimed[user_id] for user_id in candidates[:2] if user_id in claimed]
+        if len(chosen) < 2 and len(candidates) > 2:
+            chosen.extend(_claim_reviewers(db, candidates[2:], 2 - len(chosen)))
+        reviewers.append(chosen)
+    return reviewers
+
+
+def create_pull_requests(
+    db: Session,
+    items: List[tuple[str, str, str]]
+) -> List[Union[dict, ServiceException]]:
+    """Create many (pull_request_id, pull_request_name, author_id) PRs with one commit.
+
+    Used by group commit. Returns a PR snapshot or the error for every item. A
+    conflicting commit reruns the whole batch (a PR created concurrently is then
+    reported as PR_EXISTS); if it still conflicts after the retries, the items
+    are created one by one so only the offending one fails.
+    """
+    try:
+        return _create_pull_requests(db, items)
+    except (DBAPIError, StaleDataError) as exc:
+        if not is_conflict(exc):
+            raise
+    results: List[Union[dict, ServiceException]] = []
+    for pull_request_id, pull_request_name, author_id in items:
+        try:
+            results.append(pr_to_dict(create_pull_request(db, pull_request_id, pull_request_name, author_id)))
+        except ServiceException as exc:
+            db.rollback()
+            results.append(exc)
+    return results
+
+
+@retry_on_conflict
+def _create_pull_requests(
+    db: Session,
+    items: List[tuple[str, str, str]]
+) -> List[Union[dict, ServiceException]]:
+    existing = _taken_pull_request_ids(db, {item[0] for item in items})
+    created_at = datetime.now(timezone.utc)
+
+    results: List[Union[dict, ServiceException, None]] = []
+    planned = []
+    for pull_request_id, pull_request_name, author_id in items:
+        if pull_request_id in existing:
+            results.append(PRExistsError(f"PR '{pull_request_id}' already exists"))
+            continue
+        author = assignment_index.get_user(db, author_id)
+        if author is None:
+            results.append(UserNotFoundError(f"User '{author_id}' not found"))
+            continue
+        existing.add(pull_request_id)
+        planned.append((len(results), pull_request_id, pull_request_name, author))
+        results.append(None)
+
+    if not planned:
+        return results
+
+    prs = []
+    reviewers = _assign_batch_reviewers(db, [author for *_, author in planned])
+    for (position, pull_request_id, pull_request_name, author), chosen in zip(planned, reviewers, strict=True):
+        pr = PullRequest(
+            pull_request_id=pull_request_id,
+            pull_request_name=pull_request_name,
+            author_id=author.user_id,
+            status="OPEN",
+            created_at=created_at
+        )
+        pr.assigned_reviewers = chosen
+        prs.append((position, pr))
+    db.add_all(pr for _, pr in prs)
+    rollups.record_prs_opened(db, [
+        (author.team_name, created_at, len(chosen)) for (*_, author), chosen in zip(planned, reviewers, strict=True)
+    ])
+    snapshots = [(position, pr_to_dict(pr)) for position, pr in prs]
+    for _, snapshot in snapshots:
+        _record_pr(db, "pull_request.created", snapshot)
+    db.commit()
+
+    assignment_index.add_open_reviews([r.user_id for chosen in reviewers for r in chosen], 1)
+    for position, snapshot in snapshots:
+        results[position] = snapshot
+        notify_reviewers("assigned", snapshot["assigned_reviewers"], snapshot)
+    return results
+
+
+def _lock_pull_request(db: Session, pull_request_id: str) -> Optional[PullRequest]:
+    """Load a PR with author and reviewers, its row locked until commit; serializes writers of one PR"""
+    pr = db.query(PullRequest).options(
+        joinedload(PullRequest.author),
+        joinedload(PullRequest.assigned_reviewers)
+    ).filter(
         PullRequest.pull_request_id == pull_request_id
-    ).first()
+    ).with_for_update(of=PullRequest).populate_existing().first()
+    if pr is not None:
+        get_loader(db).prime(pr, pr.author, *pr.assigned_reviewers)
+    return pr
+
+
+def _reload_pr(db: Session, pr: PullRequest) -> PullRequest:
+    """Reload a committed PR with its reviewers in one query (instead of refresh + lazy load).
+
+    Kept outside retry_on_conflict: a failed read after commit must not rerun the write
+    """
+    return get_loader(db).prs([pr.pull_request_id], refresh=True)[pr.pull_request_id]
+
+
+def merge_pull_request(db: Session, pull_request_id: str) -> PullRequest:
+    return _reload_pr(db, _merge_pull_request(db, pull_request_id))
+
+
+@retry_on_conflict
+def _merge_pull_request(db: Session, pull_request_id: str) -> PullRequest:
+    pr = _lock_pull_request(db, pull_request_id)
     if not pr:
         raise PRNotFoundError(f"PR '{pull_request_id}' not found")
 
@@ -139,11 +640,14 @@ def merge_pull_request(db: Session, pull_request_id: str) -> PullRequest:
     if pr.status == "MERGED":
         return pr
 
-    from datetime import datetime
     pr.status = "MERGED"
     pr.merged_at = datetime.utcnow()
+    rollups.record_pr_merged(db, pr.author.team_name, pr.created_at, pr.merged_at)
+    snapshot = pr_to_dict(pr)
+    _record_pr(db, "pull_request.merged", snapshot)
     db.commit()
-    db.refresh(pr)
+    assignment_index.add_open_reviews(snapshot["assigned_reviewers"], -1)
+    notify_reviewers("merged", snapshot["assigned_reviewers"], snapshot)
     return pr
 
 
@@ -152,9 +656,17 @@ def reassign_reviewer(
     pull_request_id: str,
     old_user_id: str
 ) -> tuple[PullRequest, str]:
-    pr = db.query(PullRequest).filter(
-        PullRequest.pull_request_id == pull_request_id
-    ).first()
+    pr, new_user_id = _reassign_reviewer(db, pull_request_id, old_user_id)
+    return _reload_pr(db, pr), new_user_id
+
+
+@retry_on_conflict
+def _reassign_reviewer(
+    db: Session,
+    pull_request_id: str,
+    old_user_id: str
+) -> tuple[PullRequest, str]:
+    pr = _lock_pull_request(db, pull_request_id)
     if not pr:
         raise PRNotFoundError(f"PR '{pull_request_id}' not found")
 
@@ -167,84 +679,260 @@ def reassign_reviewer(
     if not old_reviewer:
         raise ReviewerNotAssignedError(f"Reviewer '{old_user_id}' is not assigned to this PR")
 
-    # Get candidates from old reviewer's team (excluding old reviewer and author)
-    candidates = get_active_reviewers_from_team(
+    # Get candidates from old reviewer's team, then its fallback teams, excluding
+    # author and already assigned reviewers (the old reviewer is one of them)
+    assigned_ids = {r.user_id for r in pr.assigned_reviewers}
+    pool = assignment_index.candidate_pool(
         db,
         old_reviewer.team_name,
-        exclude_user_id=old_user_id
+        exclude_user_ids=assigned_ids | {pr.author_id}
     )
-    # Also exclude author
-    candidates = [c for c in candidates if c.user_id != pr.author_id]
-    # Exclude already assigned reviewers
-    assigned_ids = [r.user_id for r in pr.assigned_reviewers]
-    candidates = [c for c in candidates if c.user_id not in assigned_ids]
 
-    if not candidates:
-        raise NoCandidateError("No active replacement candidate in team")
-
-    # Select random candidate
-    new_reviewer = random.choice(candidates)
+    # Least loaded candidate
+    claimed = _claim_from_pool(db, pool, 1)
+    if not claimed:
+        raise NoCandidateError("No active replacement candidate in team or its fallback teams")
+    new_reviewer = claimed[0]
 
     # Replace reviewer
     pr.assigned_reviewers.remove(old_reviewer)
     pr.assigned_reviewers.append(new_reviewer)
+    snapshot = pr_to_dict(pr)
+    _record_pr(
+        db, "pull_request.reassigned", snapshot,
+        old_user_id=old_user_id, replaced_by=new_reviewer.user_id
+    )
 
     db.commit()
-    db.refresh(pr)
+    assignment_index.add_open_reviews([old_user_id], -1)
+    assignment_index.add_open_reviews([new_reviewer.user_id], 1)
+    notify_reviewers("unassigned", [old_user_id], snapshot)
+    notify_reviewers("assigned", [new_reviewer.user_id], snapshot)
     return pr, new_reviewer.user_id
 
 
-def get_user_reviews(db: Session, user_id: str) -> List[PullRequest]:
-    user = get_user_by_id(db, user_id)
-    return user.assigned_prs
+def pr_to_dict(pr: PullRequest) -> dict:
+    """Snapshot of a PR in response shape, taken before commit expires it"""
+    return {
+        "pull_request_id": pr.pull_request_id,
+        "pull_request_name": pr.pull_request_name,
+        "author_id": pr.author_id,
+        "status": pr.status,
+        "assigned_reviewers": [r.user_id for r in pr.assigned_reviewers],
+        "createdAt": pr.created_at,
+        "mergedAt": pr.merged_at
+    }
 
 
+def _load_prs_with_reviewers(db: Session, pull_request_ids: List[str]) -> dict[str, PullRequest]:
+    """Load PRs with author and reviewers in a single query, PR rows locked until commit"""
+    # Locked in id order so overlapping batches don't deadlock
+    prs = db.query(PullRequest).options(
+        joinedload(PullRequest.author),
+        joinedload(PullRequest.assigned_reviewers)
+    ).filter(
+        PullRequest.pull_request_id.in_(set(pull_request_ids))
+    ).order_by(PullRequest.id).with_for_update(of=PullRequest).populate_existing().all()
+    return {pr.pull_request_id: pr for pr in prs}
+
+
+@retry_on_conflict
+def bulk_merge_pull_requests(db: Session, pull_request_ids: List[str]) -> List[dict]:
+    """Merge many PRs in one transaction; errors are reported per item"""
+    prs = _load_prs_with_reviewers(db, pull_request_ids)
+    merged_at = datetime.utcnow()
+
+    results = []
+    merges = []
+    released_reviewers = []
+    merged_snapshots = []
+    for pull_request_id in pull_request_ids:
+        pr = prs.get(pull_request_id)
+        if not pr:
+            results.append({
+                "pull_request_id": pull_request_id,
+                "error": PRNotFoundError(f"PR '{pull_request_id}' not found")
+            })
+            continue
+
+        # Idempotent per item: already merged PRs are returned as they are
+        if pr.status != "MERGED":
+            pr.status = "MERGED"
+            pr.merged_at = merged_at
+            merges.append((pr.author.team_name, pr.created_at, merged_at))
+            released_reviewers.extend(r.user_id for r in pr.assigned_reviewers)
+            merged_snapshots.append(pr_to_dict(pr))
+            _record_pr(db, "pull_request.merged", merged_snapshots[-1])
+        results.append({"pull_request_id": pull_request_id, "pr": pr_to_dict(pr)})
+
+    if merges:
+        rollups.record_prs_merged(db, merges)
+        db.commit()
+        assignment_index.add_open_reviews(released_reviewers, -1)
+        for snapshot in merged_snapshots:
+            notify_reviewers("merged", snapshot["assigned_reviewers"], snapshot)
+    return results
+
+
+def _reassign_reviewers(
+    db: Session,
+    items: List[tuple[str, str]],
+    unavailable: frozenset = frozenset(),
+    activated: dict[str, str] = None
+) -> tuple[List[dict], List[tuple[str, str]]]:
+    """Apply (pull_request_id, old_user_id) reassignments to the session, without committing.
+
+    Items are applied in order, so a later item sees the reviewers chosen by an
+    earlier one, and counts them as load when picking. Replacements are claimed
+    like in reassign_reviewer. Users in unavailable are never picked; activated
+    ({user_id: team_name}) are candidates the index doesn't know to be active
+    yet. Errors are reported per item; "pr" is the state after the batch.
+    Returns results and (old, new) pairs.
+    """
+    prs = _load_prs_with_reviewers(db, [pull_request_id for pull_request_id, _ in items])
+    assigned = {pr_id: [r.user_id for r in pr.assigned_reviewers] for pr_id, pr in prs.items()}
+    users = {r.user_id: r for pr in prs.values() for r in pr.assigned_reviewers}
+    reviewer_teams = {user_id: user.team_name for user_id, user in users.items()}
+
+    results = []
+    replaced = []
+    picked = defaultdict(int)
+    for pull_request_id, old_user_id in items:
+        result = {"pull_request_id": pull_request_id, "old_user_id": old_user_id}
+        results.append(result)
+        pr = prs.get(pull_request_id)
+        try:
+            if not pr:
+                raise PRNotFoundError(f"PR '{pull_request_id}' not found")
+            if pr.status == "MERGED":
+                raise PRMergedError("Cannot reassign on merged PR")
+            if old_user_id not in assigned[pull_request_id]:
+                raise ReviewerNotAssignedError(f"Reviewer '{old_user_id}' is not assigned to this PR")
+            excluded = set(assigned[pull_request_id]) | {pr.author_id} | unavailable
+            pool = assignment_index.candidate_pool(db, reviewer_teams[old_user_id], excluded)
+            if activated:
+                pool = [
+                    (team_name, candidates + [
+                        user_id for user_id, activated_team in activated.items()
+                        if activated_team == team_name and user_id not in excluded
+                    ])
+                    for team_name, candidates in pool
+                ]
+            # The old reviewer's own team first, then its fallback teams by priority
+            claimed = _claim_from_pool(db, pool, 1, picked)
+            if not claimed:
+                raise NoCandidateError("No active replacement candidate in team or its fallback teams")
+        except ServiceException as exc:
+            result["error"] = exc
+            continue
+
+        new_reviewer = claimed[0]
+        new_user_id = new_reviewer.user_id
+        users[new_user_id] = new_reviewer
+        picked[new_user_id] += 1
+        reviewers = assigned[pull_request_id]
+        reviewers[reviewers.index(old_user_id)] = new_user_id
+        reviewer_teams[new_user_id] = new_reviewer.team_name
+        result["replaced_by"] = new_user_id
+        replaced.append((old_user_id, new_user_id))
+
+    if replaced:
+        touched = {result["pull_request_id"] for result in results if "replaced_by" in result}
+        for pull_request_id in touched:
+            prs[pull_request_id].assigned_reviewers = [users[user_id] for user_id in assigned[pull_request_id]]
+
+    snapshots = {pr_id: pr_to_dict(pr) for pr_id, pr in prs.items()}
+    for result in results:
+        if "replaced_by" in result:
+            result["pr"] = snapshots[result["pull_request_id"]]
+            _record_pr(
+                db, "pull_request.reassigned", result["pr"],
+                old_user_id=result["old_user_id"], replaced_by=result["replaced_by"]
+            )
+    return results, replaced
+
+
+def _publish_reassignments(results: List[dict], replaced: List[tuple[str, str]]):
+    """Derived state after _reassign_reviewers has been committed"""
+    assignment_index.add_open_reviews([old for old, _ in replaced], -1)
+    assignment_index.add_open_reviews([new for _, new in replaced], 1)
+    for result in results:
+        if "replaced_by" in result:
+            notify_reviewers("unassigned", [result["old_user_id"]], result["pr"])
+            notify_reviewers("assigned", [result["replaced_by"]], result["pr"])
+
+
+@retry_on_conflict
+def bulk_reassign_reviewers(db: Session, items: List[tuple[str, str]]) -> List[dict]:
+    """Reassign many (pull_request_id, old_user_id) pairs in one transaction"""
+    results, replaced = _reassign_reviewers(db, items)
+    if replaced:
+        db.commit()
+        _publish_reassignments(results, replaced)
+    return results
+
+
+def get_user_review_rows(db: Session, user_id: str) -> List[tuple]:
+    """(pull_request_id, pull_request_name, author_id, status) rows of a reviewer's PRs, without ORM objects"""
+    user = assignment_index.get_user(db, user_id)
+    if user is None:
+        raise UserNotFoundError(f"User '{user_id}' not found")
+    return db.query(
+        PullRequest.pull_request_id,
+        PullRequest.pull_request_name,
+        PullRequest.author_id,
+        PullRequest.status
+    ).join(
+        pr_reviewers, pr_reviewers.c.pull_request_pk == PullRequest.id
+    ).filter(pr_reviewers.c.user_pk == user.pk).order_by(PullRequest.id).all()
+
+
+@retry_on_conflict
 def bulk_deactivate_team(db: Session, team_name: str) -> int:
     """Deactivate all users in a team and safely reassign open PRs"""
     team = get_team_by_name(db, team_name)
+    team_user_ids = frozenset(user.user_id for user in team.members)
 
-    # Get all open PRs
-    open_prs = db.query(PullRequest).filter(PullRequest.status == "OPEN").all()
-
-    team_user_ids = {user.user_id for user in team.members}
-
-    # Reassign reviewers for open PRs
-    reassigned_count = 0
-    for pr in open_prs:
-        for reviewer in list(pr.assigned_reviewers):
-            if reviewer.user_id in team_user_ids:
-                try:
-                    reassign_reviewer(db, pr.pull_request_id, reviewer.user_id)
-                    reassigned_count += 1
-                except NoCandidateError:
-                    # If no candidate available, leave as is (will be inactive)
-                    pass
+    # Reviews of the team go to its fallback teams (the team itself has no one left);
+    # without a candidate the reviewer is left as is (will be inactive)
+    results, replaced = _reassign_reviewers(
+        db,
+        _open_review_items(db, [user.id for user in team.members]),
+        unavailable=team_user_ids
+    )
 
     # Deactivate all team members
     for user in team.members:
         user.is_active = False
+        _record_user(db, _user_dict(user))
 
     db.commit()
-    return reassigned_count
+    _publish_reassignments(results, replaced)
+    invalidate_teams(team_name)
+    return len(replaced)
 
 
-def get_statistics(db: Session) -> dict:
-    """Get service statistics"""
-    total_prs = db.query(PullRequest).count()
+def get_statistics(db: Session, include_assignments: bool = True) -> dict:
+    """Get service statistics; the per-reviewer counts are skipped when not needed"""
+    # Both counts are range searches on ix_pull_requests_status_id; every PR is
+    # OPEN or MERGED, so their sum is the total without scanning the table
     open_prs = db.query(PullRequest).filter(PullRequest.status == "OPEN").count()
     merged_prs = db.query(PullRequest).filter(PullRequest.status == "MERGED").count()
+    total_prs = open_prs + merged_prs
 
     total_users = db.query(User).count()
     active_users = db.query(User).filter(User.is_active == True).count()
 
     total_teams = db.query(Team).count()
 
-    # Count reviewer assignments
-    reviewer_assignments = {}
-    all_prs = db.query(PullRequest).all()
-    for pr in all_prs:
-        for reviewer in pr.assigned_reviewers:
-            reviewer_assignments[reviewer.user_id] = reviewer_assignments.get(reviewer.user_id, 0) + 1
+    # Count reviewer assignments in one aggregate instead of loading every PR
+    reviewer_assignments = None
+    if include_assignments:
+        reviewer_assignments = dict(
+            db.query(User.user_id, func.count()).join(
+                pr_reviewers, pr_reviewers.c.user_pk == User.id
+            ).group_by(User.user_id).all()
+        )
 
     return {
         "total_prs": total_prs,
@@ -256,3 +944,99 @@ def get_statistics(db: Session) -> dict:
         "reviewer_assignments": reviewer_assignments
     }
 
+
+def get_reviewer_workload(
+    db: Session,
+    team_name: str = None,
+    status: str = "OPEN",
+    limit: int = 20,
+    order: str = "desc"
+) -> List[dict]:
+    """Top-N reviewers by assignment count, aggregated in SQL.
+
+    Walks users(team_name) -> pr_reviewers(user_pk, pull_request_pk) ->
+    pull_requests(pk), so a team's busiest reviewers never need a full scan.
+    Only reviewers with at least one matching assignment are returned.
+    """
+    assignments = func.count().label("assignments")
+    query = db.query(
+        User.user_id,
+        User.username,
+        User.team_name,
+        User.is_active,
+        assignments
+    ).join(
+        pr_reviewers, pr_reviewers.c.user_pk == User.id
+    ).join(
+        PullRequest, PullRequest.id == pr_reviewers.c.pull_request_pk
+    )
+    if team_name:
+        query = query.filter(User.team_name == team_name)
+    if status != "ALL":
+        query = query.filter(PullRequest.status == status)
+
+    ordering = assignments.desc() if order == "desc" else assignments.asc()
+    rows = query.group_by(User.id).order_by(ordering, User.user_id).limit(limit).all()
+    return [row._asdict() for row in rows]
+
+
+def get_team_statistics(db: Session, team_name: str = None) -> List[dict]:
+    """Per-team aggregates with a fixed number of grouped queries.
+
+    PR counts come from the incrementally maintained team_stats counters and the
+    assignment distribution only reads open PRs, so the cost depends on the
+    number of teams and open reviews, not on PR history.
+    """
+    if team_name:
+        get_team_by_name(db, team_name)
+
+    active = func.coalesce(func.sum(case((User.is_active == True, 1), else_=0)), 0)
+    members_query = db.query(
+        Team.team_name,
+        func.count(User.id),
+        active
+    ).outerjoin(User, User.team_name == Team.team_name)
+
+    counters_query = db.query(TeamStats.team_name, TeamStats.open_prs, TeamStats.merged_prs)
+
+    per_user = db.query(
+        User.team_name.label("team_name"),
+        User.is_active.label("is_active"),
+        func.count().label("open_reviews")
+    ).join(
+        pr_reviewers, pr_reviewers.c.user_pk == User.id
+    ).join(
+        PullRequest, PullRequest.id == pr_reviewers.c.pull_request_pk
+    ).filter(PullRequest.status == "OPEN")
+
+    if team_name:
+        members_query = members_query.filter(Team.team_name == team_name)
+        counters_query = counters_query.filter(TeamStats.team_name == team_name)
+        per_user = per_user.filter(User.team_name == team_name)
+
+    per_user = per_user.group_by(User.team_name, User.id, User.is_active).subquery()
+    distribution_query = db.query(
+        per_user.c.team_name,
+        func.sum(per_user.c.open_reviews),
+        func.max(per_user.c.open_reviews),
+        func.coalesce(func.sum(case((per_user.c.is_active == True, 1), else_=0)), 0)
+    ).group_by(per_user.c.team_name)
+
+    counters = {name: (open_prs, merged_prs) for name, open_prs, merged_prs in counters_query}
+    distribution = {name: (total, peak, busy_active) for name, total, peak, busy_active in distribution_query}
+
+    teams = []
+    for name, members, active_members in members_query.group_by(Team.team_name).order_by(Team.team_name):
+        open_prs, merged_prs = counters.get(name, (0, 0))
+        open_assignments, max_open_assignments, busy_active = distribution.get(name, (0, 0, 0))
+        teams.append({
+            "team_name": name,
+            "members": members,
+            "active_members": active_members,
+            "open_prs": open_prs,
+            "merged_prs": merged_prs,
+            "open_assignments": open_assignments,
+            "max_open_assignments": max_open_assignments,
+            "idle_active_members": active_members - busy_active
+        })
+    return teams
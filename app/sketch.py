@@ -0,0 +1,55 @@
+import json
+import math
+
+
+class LogHistogram:
+    """Mergeable quantile sketch with bounded relative error.
+
+    Values are counted in logarithmic bins of width ``gamma`` so any quantile is
+    answered within ``relative_accuracy`` of the true value. Bins are stored
+    sparsely, which keeps a sketch of merge times (seconds to months) to a few
+    hundred entries at most.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, bins: dict[int, int] | None = None):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = bins or {}
+
+    @property
+    def count(self) -> int:
+        return sum(self.bins.values())
+
+    def bin_index(self, value: float) -> int:
+        # Anything below one unit lands in the first bin
+        return math.ceil(math.log(max(value, 1.0)) / self._log_gamma)
+
+    def add(self, value: float, count: int = 1):
+        index = self.bin_index(value)
+        self.bins[index] = self.bins.get(index, 0) + count
+
+    def merge(self, other: "LogHistogram"):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+
+    def quantile(self, q: float) -> float | None:
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Midpoint of (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_json(self) -> str:
+        return json.dumps({str(index): count for index, count in self.bins.items()})
+
+    @classmethod
+    def from_json(cls, data: str | None, relative_accuracy: float = 0.01) -> "LogHistogram":
+        bins = {int(index): count for index, count in json.loads(data or "{}").items()}
+        return cls(relative_accuracy, bins)
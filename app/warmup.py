@@ -0,0 +1,97 @@
+"""
+Startup warm-up and readiness state.
+
+A fresh worker pays for connection setup, mapper configuration and cold caches
+on its first requests. The lifespan hook runs warm_up() in the background and
+/ready reports 503 until it has finished.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from app import config
+from app.cache import assignment_index
+from app.database import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        self.started_at = time.monotonic()
+        self.warmup_seconds: Optional[float] = None
+
+    def reset(self):
+        self.__init__()
+
+
+state = Readiness()
+
+
+def warm_up() -> dict:
+    """Blocking warm-up; raises if the database is not reachable yet"""
+    started = time.perf_counter()
+    configure_mappers()
+
+    # Check out the connections together so the pool really opens them all
+    connections = [engine.connect() for _ in range(config.WARMUP_CONNECTIONS)]
+    try:
+        for conn in connections:
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            conn.close()
+
+    db = SessionLocal()
+    try:
+        teams = assignment_index.rebuild(db)
+    finally:
+        db.close()
+
+    return {
+        "connections": len(connections),
+        "teams": teams,
+        "seconds": time.perf_counter() - started
+    }
+
+
+async def run_until_ready(max_backoff: float = 10.0):
+    if not config.WARMUP_ENABLED:
+        state.ready = True
+        return
+
+    backoff = 0.5
+    while True:
+        try:
+            result = await run_in_threadpool(warm_up)
+        except Exception as exc:
+            state.error = str(exc)
+            logger.warning("Warm-up failed, retrying in %.1fs: %s", backoff, exc)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, max_backoff)
+            continue
+
+        state.error = None
+        state.warmup_seconds = result["seconds"]
+        state.ready = True
+        logger.info(
+            "Warm-up done in %.3fs: %d connections, %d teams indexed",
+            result["seconds"], result["connections"], result["teams"]
+        )
+        return
+
+
+def check_database() -> bool:
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
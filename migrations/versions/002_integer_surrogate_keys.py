@@ -0,0 +1,108 @@
+"""Integer surrogate keys for users, pull_requests and pr_reviewers
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '002'
+down_revision: Union[str, None] = '001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Drop foreign keys that point at the string primary keys
+    op.drop_constraint('pr_reviewers_pull_request_id_fkey', 'pr_reviewers', type_='foreignkey')
+    op.drop_constraint('pr_reviewers_user_id_fkey', 'pr_reviewers', type_='foreignkey')
+    op.drop_constraint('pull_requests_author_id_fkey', 'pull_requests', type_='foreignkey')
+
+    # users: serial id becomes the primary key, user_id stays unique
+    op.execute("ALTER TABLE users ADD COLUMN id SERIAL NOT NULL")
+    op.drop_constraint('users_pkey', 'users', type_='primary')
+    op.create_primary_key('users_pkey', 'users', ['id'])
+    op.create_unique_constraint('users_user_id_key', 'users', ['user_id'])
+
+    # pull_requests: same treatment
+    op.execute("ALTER TABLE pull_requests ADD COLUMN id SERIAL NOT NULL")
+    op.drop_constraint('pull_requests_pkey', 'pull_requests', type_='primary')
+    op.create_primary_key('pull_requests_pkey', 'pull_requests', ['id'])
+    op.create_unique_constraint('pull_requests_pull_request_id_key', 'pull_requests', ['pull_request_id'])
+
+    op.create_foreign_key(
+        'pull_requests_author_id_fkey', 'pull_requests', 'users', ['author_id'], ['user_id']
+    )
+
+    # Rewrite pr_reviewers on top of the integer keys
+    op.create_table(
+        'pr_reviewers_new',
+        sa.Column('pull_request_pk', sa.Integer(), nullable=False),
+        sa.Column('user_pk', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['pull_request_pk'], ['pull_requests.id'], name='pr_reviewers_pull_request_pk_fkey'),
+        sa.ForeignKeyConstraint(['user_pk'], ['users.id'], name='pr_reviewers_user_pk_fkey'),
+        sa.PrimaryKeyConstraint('pull_request_pk', 'user_pk', name='pr_reviewers_new_pkey')
+    )
+    op.execute(
+        """
+        INSERT INTO pr_reviewers_new (pull_request_pk, user_pk)
+        SELECT p.id, u.id
+        FROM pr_reviewers r
+        JOIN pull_requests p ON p.pull_request_id = r.pull_request_id
+        JOIN users u ON u.user_id = r.user_id
+        """
+    )
+    op.drop_table('pr_reviewers')
+    op.rename_table('pr_reviewers_new', 'pr_reviewers')
+    op.execute("ALTER INDEX pr_reviewers_new_pkey RENAME TO pr_reviewers_pkey")
+    op.create_index('ix_pr_reviewers_user_pk', 'pr_reviewers', ['user_pk'])
+
+
+def downgrade() -> None:
+    op.create_table(
+        'pr_reviewers_old',
+        sa.Column('pull_request_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('pull_request_id', 'user_id', name='pr_reviewers_old_pkey')
+    )
+    op.execute(
+        """
+        INSERT INTO pr_reviewers_old (pull_request_id, user_id)
+        SELECT p.pull_request_id, u.user_id
+        FROM pr_reviewers r
+        JOIN pull_requests p ON p.id = r.pull_request_pk
+        JOIN users u ON u.id = r.user_pk
+        """
+    )
+    op.drop_table('pr_reviewers')
+    op.rename_table('pr_reviewers_old', 'pr_reviewers')
+    op.execute("ALTER INDEX pr_reviewers_old_pkey RENAME TO pr_reviewers_pkey")
+
+    op.drop_constraint('pull_requests_author_id_fkey', 'pull_requests', type_='foreignkey')
+
+    op.drop_constraint('pull_requests_pull_request_id_key', 'pull_requests', type_='unique')
+    op.drop_constraint('pull_requests_pkey', 'pull_requests', type_='primary')
+    op.create_primary_key('pull_requests_pkey', 'pull_requests', ['pull_request_id'])
+    op.drop_column('pull_requests', 'id')
+
+    op.drop_constraint('users_user_id_key', 'users', type_='unique')
+    op.drop_constraint('users_pkey', 'users', type_='primary')
+    op.create_primary_key('users_pkey', 'users', ['user_id'])
+    op.drop_column('users', 'id')
+
+    op.create_foreign_key(
+        'pull_requests_author_id_fkey', 'pull_requests', 'users', ['author_id'], ['user_id']
+    )
+    op.create_foreign_key(
+        'pr_reviewers_pull_request_id_fkey', 'pr_reviewers', 'pull_requests',
+        ['pull_request_id'], ['pull_request_id']
+    )
+    op.create_foreign_key(
+        'pr_reviewers_user_id_fkey', 'pr_reviewers', 'users', ['user_id'], ['user_id']
+    )
@@ -0,0 +1,93 @@
+"""Pre-aggregated stats rollups for time-series analytics
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19
+
+"""
+from datetime import timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.sketch import LogHistogram
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Organisation-wide rows, next to each team's
+ALL_TEAMS = '*'
+BATCH = 5000
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stats_rollups',
+        sa.Column('period', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('team_name', sa.String(), nullable=False),
+        sa.Column('opened', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('merged', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('assignments', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ttm_sketch', sa.Text(), nullable=False, server_default='{}'),
+        sa.PrimaryKeyConstraint('period', 'team_name', 'bucket_start')
+    )
+    _backfill()
+
+
+def _utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _bucket(value, period: str):
+    value = _utc(value).replace(minute=0, second=0, microsecond=0)
+    return value.replace(hour=0) if period == 'day' else value
+
+
+def _backfill():
+    """Rollups of the existing PRs; from now on the create and merge paths keep them current"""
+    conn = op.get_bind()
+    prs = conn.execution_options(stream_results=True).execute(sa.text(
+        """
+        SELECT u.team_name, p.created_at, p.merged_at, p.status,
+               (SELECT COUNT(*) FROM pr_reviewers r WHERE r.pull_request_pk = p.id) AS reviewers
+        FROM pull_requests p
+        JOIN users u ON u.user_id = p.author_id
+        WHERE p.created_at IS NOT NULL
+        """
+    ).columns(created_at=sa.DateTime(timezone=True), merged_at=sa.DateTime(timezone=True)))
+    rows = {}
+    for team_name, created_at, merged_at, status, reviewers in prs:
+        for period in ('hour', 'day'):
+            for team in (team_name, ALL_TEAMS):
+                row = rows.setdefault((period, _bucket(created_at, period), team), [0, 0, 0, LogHistogram()])
+                row[0] += 1
+                row[2] += reviewers
+                if status == 'MERGED' and merged_at is not None:
+                    row = rows.setdefault((period, _bucket(merged_at, period), team), [0, 0, 0, LogHistogram()])
+                    row[1] += 1
+                    row[3].add((_utc(merged_at) - _utc(created_at)).total_seconds())
+
+    rollups = sa.table(
+        'stats_rollups',
+        sa.column('period'), sa.column('bucket_start'), sa.column('team_name'),
+        sa.column('opened'), sa.column('merged'), sa.column('assignments'), sa.column('ttm_sketch'),
+    )
+    values = [
+        {
+            'period': period, 'bucket_start': bucket, 'team_name': team,
+            'opened': opened, 'merged': merged, 'assignments': assignments, 'ttm_sketch': sketch.to_json(),
+        }
+        for (period, bucket, team), (opened, merged, assignments, sketch) in rows.items()
+    ]
+    for start in range(0, len(values), BATCH):
+        op.bulk_insert(rollups, values[start:start + BATCH])
+
+
+def downgrade() -> None:
+    op.drop_table('stats_rollups')
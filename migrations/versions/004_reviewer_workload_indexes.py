@@ -0,0 +1,31 @@
+"""Covering indexes for reviewer workload queries
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_pr_reviewers_user_pk', table_name='pr_reviewers')
+    op.create_index('ix_pr_reviewers_user_pk_pull_request_pk', 'pr_reviewers', ['user_pk', 'pull_request_pk'])
+    op.create_index('ix_users_team_name', 'users', ['team_name'])
+    op.create_index('ix_pull_requests_status_id', 'pull_requests', ['status', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_pull_requests_status_id', table_name='pull_requests')
+    op.drop_index('ix_users_team_name', table_name='users')
+    op.drop_index('ix_pr_reviewers_user_pk_pull_request_pk', table_name='pr_reviewers')
+    op.create_index('ix_pr_reviewers_user_pk', 'pr_reviewers', ['user_pk'])
@@ -0,0 +1,44 @@
+"""Per-team PR counters
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'team_stats',
+        sa.Column('team_name', sa.String(), nullable=False),
+        sa.Column('open_prs', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('merged_prs', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('team_name')
+    )
+    # Backfill from existing PRs; from now on the service keeps them current
+    op.execute(
+        """
+        INSERT INTO team_stats (team_name, open_prs, merged_prs)
+        SELECT u.team_name,
+               SUM(CASE WHEN p.status = 'OPEN' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN p.status = 'MERGED' THEN 1 ELSE 0 END)
+        FROM pull_requests p
+        JOIN users u ON u.user_id = p.author_id
+        GROUP BY u.team_name
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('team_stats')
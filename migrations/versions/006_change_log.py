@@ -0,0 +1,39 @@
+"""Change log for the /changes feed
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'change_log',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('entity_id', sa.String(), nullable=False),
+        sa.Column('event', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_change_log_entity_entity_id_id', 'change_log', ['entity', 'entity_id', 'id'])
+    op.create_index('ix_change_log_created_at', 'change_log', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_change_log_created_at', table_name='change_log')
+    op.drop_index('ix_change_log_entity_entity_id_id', table_name='change_log')
+    op.drop_table('change_log')
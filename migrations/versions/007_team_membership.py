@@ -0,0 +1,31 @@
+"""Incremental team membership
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Members removed from their team keep their user row and history
+    op.alter_column('users', 'team_name', existing_type=sa.String(), nullable=True)
+    # Moving an author carries their PR counters over to the new team
+    op.create_index('ix_pull_requests_author_id', 'pull_requests', ['author_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_pull_requests_author_id', table_name='pull_requests')
+    # Fails while removed members exist; move them into a team first
+    op.alter_column('users', 'team_name', existing_type=sa.String(), nullable=False)
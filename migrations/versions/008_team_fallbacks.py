@@ -0,0 +1,32 @@
+"""Cross-team fallback candidate pools
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'team_fallbacks',
+        sa.Column('team_name', sa.String(), sa.ForeignKey('teams.team_name'), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column('fallback_team', sa.String(), sa.ForeignKey('teams.team_name'), nullable=False),
+        sa.PrimaryKeyConstraint('team_name', 'priority')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('team_fallbacks')
@@ -0,0 +1,34 @@
+"""Commit-ordered cursor for the change log
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('change_log', sa.Column('seq', sa.Integer(), nullable=True))
+    # Existing entries keep their cursors: consumers resume where they stopped
+    op.execute("UPDATE change_log SET seq = id")
+    op.create_index('ix_change_log_seq', 'change_log', ['seq'], unique=True)
+    op.drop_index('ix_change_log_entity_entity_id_id', table_name='change_log')
+    op.create_index('ix_change_log_entity_entity_id_seq', 'change_log', ['entity', 'entity_id', 'seq'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_change_log_entity_entity_id_seq', table_name='change_log')
+    op.create_index('ix_change_log_entity_entity_id_id', 'change_log', ['entity', 'entity_id', 'id'])
+    op.drop_index('ix_change_log_seq', table_name='change_log')
+    op.drop_column('change_log', 'seq')
@@ -0,0 +1,88 @@
+"""Drop the organisation-wide "*" rollup rows
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ALL_TEAMS = '*'
+NO_TEAM = ''
+
+rollups = sa.table(
+    'stats_rollups',
+    sa.column('period', sa.String()),
+    sa.column('bucket_start', sa.DateTime(timezone=True)),
+    sa.column('team_name', sa.String()),
+    sa.column('opened', sa.Integer()),
+    sa.column('merged', sa.Integer()),
+    sa.column('assignments', sa.Integer()),
+    sa.column('ttm_sketch', sa.Text()),
+)
+
+
+def _counts(sketch):
+    return {index: count for index, count in json.loads(sketch or '{}').items()}
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    # "*" minus the teams of its bucket is what authors without a team contributed;
+    # it moves to their own row, the rest is summed over teams at read time now
+    totals = {}
+    for row in conn.execute(sa.select(rollups)):
+        total = totals.setdefault((row.period, row.bucket_start), [0, 0, 0, {}])
+        sign = 1 if row.team_name == ALL_TEAMS else -1
+        total[0] += sign * row.opened
+        total[1] += sign * row.merged
+        total[2] += sign * row.assignments
+        for index, count in _counts(row.ttm_sketch).items():
+            total[3][index] = total[3].get(index, 0) + sign * count
+    conn.execute(rollups.delete().where(rollups.c.team_name == ALL_TEAMS))
+    no_team = [
+        {
+            'period': period, 'bucket_start': bucket, 'team_name': NO_TEAM,
+            'opened': opened, 'merged': merged, 'assignments': assignments,
+            'ttm_sketch': json.dumps({index: count for index, count in bins.items() if count > 0}),
+        }
+        for (period, bucket), (opened, merged, assignments, bins) in totals.items()
+        if opened > 0 or merged > 0 or assignments > 0
+    ]
+    if no_team:
+        op.bulk_insert(rollups, no_team)
+    op.create_index('ix_stats_rollups_period_bucket_start', 'stats_rollups', ['period', 'bucket_start'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_stats_rollups_period_bucket_start', table_name='stats_rollups')
+    conn = op.get_bind()
+    totals = {}
+    for row in conn.execute(sa.select(rollups)):
+        total = totals.setdefault((row.period, row.bucket_start), [0, 0, 0, {}])
+        total[0] += row.opened
+        total[1] += row.merged
+        total[2] += row.assignments
+        for index, count in _counts(row.ttm_sketch).items():
+            total[3][index] = total[3].get(index, 0) + count
+    conn.execute(rollups.delete().where(rollups.c.team_name == NO_TEAM))
+    if totals:
+        op.bulk_insert(rollups, [
+            {
+                'period': period, 'bucket_start': bucket, 'team_name': ALL_TEAMS,
+                'opened': opened, 'merged': merged, 'assignments': assignments,
+                'ttm_sketch': json.dumps(bins),
+            }
+            for (period, bucket), (opened, merged, assignments, bins) in totals.items()
+        ])
@@ -0,0 +1,36 @@
+"""Ids of PRs moved to the archive
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import archive
+
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    table = op.create_table(
+        'archived_pull_requests',
+        sa.Column('pull_request_id', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('pull_request_id')
+    )
+    # PRs archived before this revision, read from the published segments
+    pull_request_ids = sorted({record['pull_request_id'] for record in archive.reader.iter_records()})
+    if pull_request_ids:
+        op.bulk_insert(table, [{'pull_request_id': pull_request_id} for pull_request_id in pull_request_ids])
+
+
+def downgrade() -> None:
+    op.drop_table('archived_pull_requests')
@@ -0,0 +1,85 @@
+"""Sharded organisation-wide rollup rows
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19
+
+"""
+import json
+from datetime import timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.rollups import ORG_SHARD_NAMES, org_shard
+
+
+# revision identifiers, used by Alembic.
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NO_TEAM = ''
+
+rollups = sa.table(
+    'stats_rollups',
+    sa.column('period', sa.String()),
+    sa.column('bucket_start', sa.DateTime(timezone=True)),
+    sa.column('team_name', sa.String()),
+    sa.column('opened', sa.Integer()),
+    sa.column('merged', sa.Integer()),
+    sa.column('assignments', sa.Integer()),
+    sa.column('ttm_sketch', sa.Text()),
+)
+
+
+def _add(totals: dict, team: str, row, sign: int = 1):
+    bucket = row.bucket_start
+    bucket = bucket.replace(tzinfo=timezone.utc) if bucket.tzinfo is None else bucket.astimezone(timezone.utc)
+    total = totals.setdefault((row.period, bucket, team), [0, 0, 0, {}])
+    total[0] += sign * row.opened
+    total[1] += sign * row.merged
+    total[2] += sign * row.assignments
+    for index, count in json.loads(row.ttm_sketch or '{}').items():
+        total[3][index] = total[3].get(index, 0) + sign * count
+
+
+def _rows(totals: dict) -> list:
+    return [
+        {
+            'period': period, 'bucket_start': bucket, 'team_name': team,
+            'opened': opened, 'merged': merged, 'assignments': assignments,
+            'ttm_sketch': json.dumps({index: count for index, count in bins.items() if count > 0}),
+        }
+        for (period, bucket, team), (opened, merged, assignments, bins) in totals.items()
+        if opened > 0 or merged > 0 or assignments > 0
+    ]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    # Every team row (and the no-team rows of 011) is counted in its team's shard
+    shards = {}
+    for row in conn.execute(sa.select(rollups)):
+        _add(shards, org_shard(row.team_name or None), row)
+    conn.execute(rollups.delete().where(rollups.c.team_name == NO_TEAM))
+    rows = _rows(shards)
+    if rows:
+        op.bulk_insert(rollups, rows)
+    op.drop_index('ix_stats_rollups_period_bucket_start', table_name='stats_rollups')
+
+
+def downgrade() -> None:
+    op.create_index('ix_stats_rollups_period_bucket_start', 'stats_rollups', ['period', 'bucket_start'])
+    conn = op.get_bind()
+    # What the shards hold beyond the teams' rows came from authors without a team
+    no_team = {}
+    for row in conn.execute(sa.select(rollups)):
+        sign = 1 if row.team_name in ORG_SHARD_NAMES else -1
+        _add(no_team, NO_TEAM, row, sign)
+    conn.execute(rollups.delete().where(rollups.c.team_name.in_(ORG_SHARD_NAMES)))
+    rows = _rows(no_team)
+    if rows:
+        op.bulk_insert(rollups, rows)
@@ -0,0 +1,140 @@
+"""
+Benchmark: in-memory assignment index vs ORM query for reviewer selection.
+
+Seeds N users (default 100k) into a database, builds the AssignmentIndex and
+reports its memory footprint and build time, then compares the latency of
+picking two reviewers with the previous per-call ORM query: the in-memory pick
+alone, and the pick plus the query that loads and locks the chosen users, which
+is what a write path pays.
+
+Run with: python -m tests.benchmarks.bench_assignment_index [--users 100000 --team-size 50]
+Uses BENCH_DATABASE_URL (default: sqlite:///./bench.db).
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import services
+from app.assignment_index import AssignmentIndex
+from app.database import Base
+from app.models import Team, User
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///./bench.db")
+BATCH_SIZE = 10_000
+
+
+def seed(engine, users: int, team_size: int) -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    teams = max(1, users // team_size)
+    rng = random.Random(1)
+    with engine.begin() as conn:
+        conn.execute(Team.__table__.insert(), [{"team_name": f"team-{t}"} for t in range(teams)])
+        rows = [
+            {
+                "user_id": f"user-{i}",
+                "username": f"User {i}",
+                "team_name": f"team-{i % teams}",
+                "is_active": rng.random() > 0.1,
+            }
+            for i in range(users)
+        ]
+        for start in range(0, len(rows), BATCH_SIZE):
+            conn.execute(User.__table__.insert(), rows[start:start + BATCH_SIZE])
+    return teams
+
+
+def pick_with_orm(db, author_id: str) -> list[str]:
+    """Selection as it was before the index: two ORM queries per call"""
+    author = db.query(User).filter(User.user_id == author_id).first()
+    candidates = db.query(User).filter(
+        User.team_name == author.team_name,
+        User.is_active == True,
+        User.user_id != author_id
+    ).all()
+    # One transaction per selection, like the write paths
+    db.rollback()
+    return [u.user_id for u in random.sample(candidates, min(2, len(candidates)))]
+
+
+def pick_with_index(index: AssignmentIndex, db, author_id: str) -> list[str]:
+    author = index.get_user(db, author_id)
+    candidates = index.active_candidates(db, author.team_name, exclude_user_ids={author_id})
+    return index.least_loaded_first(candidates)[:2]
+
+
+def claim_with_index(index: AssignmentIndex, db, author_id: str) -> list[str]:
+    """Selection as assign_reviewers does it: pick from memory, then load and lock the picks"""
+    author = index.get_user(db, author_id)
+    candidates = index.active_candidates(db, author.team_name, exclude_user_ids={author_id})
+    reviewers = services._claim_reviewers(db, index.least_loaded_first(candidates), 2)
+    # Release the locks, as the write path's commit would
+    db.rollback()
+    return [user.user_id for user in reviewers]
+
+
+def percentiles_us(samples: list[float]) -> str:
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1e6
+    p99 = samples[int(len(samples) * 0.99) - 1] * 1e6
+    return f"p50 {p50:8.1f} us   p99 {p99:8.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--team-size", type=int, default=50)
+    parser.add_argument("--picks", type=int, default=2_000)
+    args = parser.parse_args()
+
+    engine = create_engine(BENCH_DATABASE_URL)
+    teams = seed(engine, args.users, args.team_size)
+    db = sessionmaker(bind=engine)()
+    print(f"Seeded {args.users:,} users in {teams:,} teams ({engine.dialect.name})")
+
+    index = AssignmentIndex()
+    tracemalloc.start()
+    started = time.perf_counter()
+    index.rebuild(db)
+    build_seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Retained size: measure a second build while the first one is still alive
+    tracemalloc.start()
+    retained = AssignmentIndex()
+    retained.rebuild(db)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+
+    print(f"Index build: {build_seconds:.2f}s, retained {current / 2**20:.1f} MiB "
+          f"({current / args.users:.0f} B/user), peak during build {peak / 2**20:.1f} MiB")
+
+    rng = random.Random(2)
+    authors = [f"user-{rng.randrange(args.users)}" for _ in range(args.picks)]
+
+    for name, pick in (
+        ("orm", lambda author: pick_with_orm(db, author)),
+        ("index", lambda author: pick_with_index(index, db, author)),
+        ("index+claim", lambda author: claim_with_index(index, db, author)),
+    ):
+        samples = []
+        for author in authors:
+            started = time.perf_counter()
+            pick(author)
+            samples.append(time.perf_counter() - started)
+        print(f"pick via {name:<12} {percentiles_us(samples)}")
+
+    db.close()
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: PR creation throughput and latency at different group-commit windows.
+
+Starts the service with uvicorn once per PR_CREATE_BATCH_WINDOW_MS value and
+drives /pullRequest/create with N concurrent clients for a fixed duration.
+
+Keep --concurrency below DB_POOL_SIZE + DB_MAX_OVERFLOW: the unbatched path runs
+blocking database calls on the event loop and stalls once the pool is exhausted.
+
+Run with: python -m tests.benchmarks.bench_group_commit [--windows 0 2 5 --concurrency 12]
+Uses BENCH_DATABASE_URL (default: sqlite:///./bench.db).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from tests.benchmarks.bench_warm_startup import BENCH_DATABASE_URL, PORT, seed, wait_for
+
+
+async def drive(concurrency: int, duration: float, teams: int, run_id: str) -> list[float]:
+    latencies: list[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(worker: int):
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=30) as client:
+            i = 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post("/pullRequest/create", json={
+                    "pull_request_id": f"pr-{run_id}-{worker}-{i}",
+                    "pull_request_name": "Benchmark",
+                    "author_id": f"u-{(worker + i) % teams}-0",
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+                i += 1
+
+    await asyncio.gather(*(client_loop(w) for w in range(concurrency)))
+    return latencies
+
+
+def run(window_ms: float, args) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=BENCH_DATABASE_URL,
+        INVALIDATION_BUS="none",
+        PR_CREATE_BATCH_WINDOW_MS=str(window_ms),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{PORT}") as client:
+            wait_for(client, "/ready")
+        latencies = asyncio.run(drive(args.concurrency, args.duration, args.teams, f"w{window_ms}"))
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / args.duration,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5])
+    parser.add_argument("--concurrency", type=int, default=12)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--teams", type=int, default=50)
+    args = parser.parse_args()
+
+    seed(args.teams, team_size=10)
+
+    print(f"{'window ms':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for window_ms in args.windows:
+        result = run(window_ms, args)
+        print(f"{window_ms:>10g}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}{result['p99_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
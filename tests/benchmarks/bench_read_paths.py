@@ -0,0 +1,150 @@
+"""
+Benchmark: ORM-hydrated vs column-only read paths.
+
+Seeds a 500-member team and a reviewer with 5,000 PRs, then builds the
+/team/get and /users/getReview response bodies both ways - mapped objects and
+relationship collections validated into Pydantic models (as before), and
+column rows serialized directly (as now) - on a fresh session per request.
+Reports CPU time and peak allocated memory per request.
+
+Run with: python -m tests.benchmarks.bench_read_paths [--members 500 --reviews 5000]
+Uses BENCH_DATABASE_URL (default: sqlite:///./bench.db).
+"""
+import argparse
+import os
+import statistics
+import time
+import tracemalloc
+
+from fastapi.responses import JSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import schemas, services
+from app.cache import assignment_index
+from app.database import Base
+from app.models import PullRequest, Team, User, pr_reviewers
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///./bench.db")
+TEAM = "big-team"
+REVIEWER = "member-1"
+
+
+def seed(engine, members: int, reviews: int):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Team.__table__.insert(), [{"team_name": TEAM}])
+        conn.execute(User.__table__.insert(), [
+            {"id": i + 1, "user_id": f"member-{i}", "username": f"Member {i}", "team_name": TEAM, "is_active": True}
+            for i in range(members)
+        ])
+        conn.execute(PullRequest.__table__.insert(), [
+            {
+                "id": i + 1,
+                "pull_request_id": f"pr-{i}",
+                "pull_request_name": f"Change {i}",
+                "author_id": "member-0",
+                "status": "OPEN" if i % 3 else "MERGED",
+            }
+            for i in range(reviews)
+        ])
+        # Reviewer member-1 (pk 2) is on every PR
+        conn.execute(pr_reviewers.insert(), [{"pull_request_pk": i + 1, "user_pk": 2} for i in range(reviews)])
+
+
+def team_get_orm(db) -> bytes:
+    """Previous /team/get: Team + members collection -> Pydantic -> JSON"""
+    team = services.get_team_by_name(db, TEAM)
+    response = schemas.TeamResponse(
+        team_name=team.team_name,
+        members=[
+            schemas.TeamMember(user_id=user.user_id, username=user.username, is_active=user.is_active)
+            for user in team.members
+        ]
+    )
+    return JSONResponse(response.model_dump(mode="json")).body
+
+
+def team_get_rows(db) -> bytes:
+    rows = services.get_team_member_rows(db, TEAM)
+    return JSONResponse({"team_name": TEAM, "members": [row._asdict() for row in rows]}).body
+
+
+def reviews_orm(db) -> bytes:
+    """Previous /users/getReview: User + assigned_prs collection -> Pydantic -> JSON"""
+    user = services.get_user_by_id(db, REVIEWER)
+    response = schemas.UserReviewResponse(
+        user_id=REVIEWER,
+        pull_requests=[
+            schemas.PullRequestShort(
+                pull_request_id=pr.pull_request_id,
+                pull_request_name=pr.pull_request_name,
+                author_id=pr.author_id,
+                status=pr.status
+            )
+            for pr in user.assigned_prs
+        ]
+    )
+    return JSONResponse(response.model_dump(mode="json")).body
+
+
+def reviews_rows(db) -> bytes:
+    rows = services.get_user_review_rows(db, REVIEWER)
+    return JSONResponse({"user_id": REVIEWER, "pull_requests": [row._asdict() for row in rows]}).body
+
+
+def measure(Session, build, requests: int) -> tuple[list[float], list[int]]:
+    cpu, peaks = [], []
+    for _ in range(requests):
+        db = Session()
+        started = time.process_time()
+        build(db)
+        cpu.append(time.process_time() - started)
+        db.close()
+
+    # Separate pass: tracemalloc slows everything down and would skew CPU time
+    for _ in range(max(1, requests // 10)):
+        db = Session()
+        tracemalloc.start()
+        build(db)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        db.close()
+    return cpu, peaks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=500)
+    parser.add_argument("--reviews", type=int, default=5_000)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine(BENCH_DATABASE_URL)
+    seed(engine, args.members, args.reviews)
+    Session = sessionmaker(bind=engine)
+    print(f"Seeded a {args.members}-member team and a reviewer with {args.reviews:,} PRs ({engine.dialect.name})")
+
+    # The column-only review path resolves the reviewer's pk from the warm index
+    db = Session()
+    assignment_index.rebuild(db)
+    db.close()
+
+    for name, build in (
+        ("team/get orm", team_get_orm),
+        ("team/get rows", team_get_rows),
+        ("users/getReview orm", reviews_orm),
+        ("users/getReview rows", reviews_rows),
+    ):
+        build(Session())  # warm-up: compiled statement cache, mapper configuration
+        cpu, peaks = measure(Session, build, args.requests)
+        print(f"{name:<22} cpu p50 {statistics.median(cpu) * 1e3:7.2f} ms   "
+              f"mean {statistics.mean(cpu) * 1e3:7.2f} ms   "
+              f"peak alloc {statistics.median(peaks) / 2**10:8.0f} KiB")
+
+    Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark: bytes on the wire and end-to-end latency of the large read endpoints.
+
+Seeds a 5,000-member team whose members review 20,000 PRs (one of them is on
+every PR), then calls /team/get, /users/getReview and /stats through the full
+ASGI stack - plain and gzipped, all fields and ids only. Reports the body size
+sent, the in-process round trip (server work, compression, client decoding)
+and that round trip plus the transfer time of the body at --mbps.
+/team/get is measured both with its response cache cleared before every
+request and warm, where the compressed body comes straight from the cache.
+
+Run with: python -m tests.benchmarks.bench_response_size [--members 5000 --reviews 20000 --mbps 50]
+Uses BENCH_DATABASE_URL (default: sqlite:///./bench.db).
+"""
+import argparse
+import os
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import config
+from app.cache import assignment_index, team_responses
+from app.database import Base, get_db
+from app.main import app
+from app.models import PullRequest, Team, User, pr_reviewers
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///./bench.db")
+TEAM = "big-team"
+REVIEWER = "member-1"
+PLAIN = {"Accept-Encoding": "identity"}
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def seed(engine, members: int, reviews: int):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(Team.__table__.insert(), [{"team_name": TEAM}])
+        conn.execute(User.__table__.insert(), [
+            {"id": i + 1, "user_id": f"member-{i}", "username": f"Member {i}", "team_name": TEAM, "is_active": True}
+            for i in range(members)
+        ])
+        conn.execute(PullRequest.__table__.insert(), [
+            {
+                "id": i + 1,
+                "pull_request_id": f"pr-{i}",
+                "pull_request_name": f"Change {i}",
+                "author_id": "member-0",
+                "status": "OPEN" if i % 3 else "MERGED",
+            }
+            for i in range(reviews)
+        ])
+        # member-1 (pk 2) is on every PR, the second reviewer rotates through the team
+        conn.execute(pr_reviewers.insert(), [
+            {"pull_request_pk": i + 1, "user_pk": pk}
+            for i in range(reviews)
+            for pk in (2, 3 + i % (members - 2))
+        ])
+
+
+def scenarios():
+    team = {"team_name": TEAM}
+    review = {"user_id": REVIEWER}
+    counters = ["total_prs", "open_prs", "merged_prs", "total_users", "active_users", "total_teams"]
+    for label, path, params, cached in (
+        ("team/get", "/team/get", team, False),
+        ("team/get ids", "/team/get", {**team, "fields": "user_id"}, False),
+        ("team/get cached", "/team/get", team, True),
+        ("getReview", "/users/getReview", review, False),
+        ("getReview ids", "/users/getReview", {**review, "fields": "pull_request_id"}, False),
+        ("stats", "/stats", {}, False),
+        ("stats counters", "/stats", {"fields": counters}, False),
+    ):
+        for encoding, headers in (("plain", PLAIN), ("gzip", GZIP)):
+            yield f"{label} {encoding}", path, params, headers, cached
+
+
+def measure(client: TestClient, path: str, params: dict, headers: dict, cached: bool, requests: int):
+    latencies, sizes = [], set()
+    client.get(path, params=params, headers=headers)  # warm-up (and cache fill)
+    for _ in range(requests):
+        if not cached:
+            team_responses.clear()
+        started = time.perf_counter()
+        response = client.get(path, params=params, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.text
+        sizes.add(int(response.headers["content-length"]))
+    return latencies, max(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--members", type=int, default=5_000)
+    parser.add_argument("--reviews", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--mbps", type=float, default=50, help="client bandwidth for the transfer estimate")
+    args = parser.parse_args()
+
+    engine = create_engine(BENCH_DATABASE_URL, connect_args={"check_same_thread": False})
+    seed(engine, args.members, args.reviews)
+    Session = sessionmaker(bind=engine)
+    print(f"Seeded a {args.members:,}-member team and {args.reviews:,} PRs ({engine.dialect.name}); "
+          f"gzip level {config.RESPONSE_COMPRESSION_LEVEL}, threshold {config.RESPONSE_COMPRESSION_MIN_BYTES} B, "
+          f"{args.mbps:g} Mbit/s")
+
+    db = Session()
+    assignment_index.rebuild(db)
+    db.close()
+
+    def bench_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = bench_db
+    # Not used as a context manager: the lifespan hooks (warm-up, bus) are not needed here
+    client = TestClient(app)
+    try:
+        for name, path, params, headers, cached in scenarios():
+            latencies, size = measure(client, path, params, headers, cached, args.requests)
+            p50 = statistics.median(latencies)
+            transfer = size * 8 / (args.mbps * 1e6)
+            print(f"{name:<22} {size / 2**10:9.1f} KiB   round trip p50 {p50 * 1e3:7.2f} ms   "
+                  f"+ transfer {(p50 + transfer) * 1e3:8.2f} ms")
+    finally:
+        app.dependency_overrides.clear()
+        team_responses.clear()
+        assignment_index.clear()
+        Base.metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Benchmark: string vs integer keys on the reviewer join table.
+
+Builds two copies of the users / pull_requests / pr_reviewers shape side by side,
+one keyed on the public string ids and one on integer surrogate ids, fills both
+with the same assignments and reports index size and join latency.
+
+Run with: python -m tests.benchmarks.bench_surrogate_keys [--assignments 1000000]
+Uses BENCH_DATABASE_URL (default: sqlite:///./bench.db).
+"""
+import argparse
+import os
+import random
+import time
+
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    text,
+)
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///./bench.db")
+BATCH_SIZE = 10_000
+
+metadata = MetaData()
+
+str_users = Table(
+    "bench_str_users", metadata,
+    Column("user_id", String, primary_key=True),
+    Column("team_name", String, nullable=False),
+)
+str_prs = Table(
+    "bench_str_prs", metadata,
+    Column("pull_request_id", String, primary_key=True),
+    Column("status", String, nullable=False),
+)
+str_reviewers = Table(
+    "bench_str_pr_reviewers", metadata,
+    Column("pull_request_id", String, ForeignKey("bench_str_prs.pull_request_id"), primary_key=True),
+    Column("user_id", String, ForeignKey("bench_str_users.user_id"), primary_key=True),
+    Index("ix_bench_str_pr_reviewers_user_id", "user_id"),
+)
+
+int_users = Table(
+    "bench_int_users", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", String, unique=True, nullable=False),
+    Column("team_name", String, nullable=False),
+)
+int_prs = Table(
+    "bench_int_prs", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("pull_request_id", String, unique=True, nullable=False),
+    Column("status", String, nullable=False),
+)
+int_reviewers = Table(
+    "bench_int_pr_reviewers", metadata,
+    Column("pull_request_pk", Integer, ForeignKey("bench_int_prs.id"), primary_key=True),
+    Column("user_pk", Integer, ForeignKey("bench_int_users.id"), primary_key=True),
+    Index("ix_bench_int_pr_reviewers_user_pk", "user_pk"),
+)
+
+# Same logical query against both layouts: open reviews of one user, and the
+# per-reviewer assignment totals that /stats needs.
+JOIN_QUERIES = {
+    "str": {
+        "user_reviews": """
+            SELECT p.pull_request_id, p.status
+            FROM bench_str_pr_reviewers r
+            JOIN bench_str_prs p ON p.pull_request_id = r.pull_request_id
+            WHERE r.user_id = :user_id
+        """,
+        "assignments_per_team": """
+            SELECT u.team_name, COUNT(*)
+            FROM bench_str_pr_reviewers r
+            JOIN bench_str_users u ON u.user_id = r.user_id
+            JOIN bench_str_prs p ON p.pull_request_id = r.pull_request_id
+            WHERE p.status = 'OPEN'
+            GROUP BY u.team_name
+        """,
+    },
+    "int": {
+        "user_reviews": """
+            SELECT p.pull_request_id, p.status
+            FROM bench_int_pr_reviewers r
+            JOIN bench_int_prs p ON p.id = r.pull_request_pk
+            JOIN bench_int_users u ON u.id = r.user_pk
+            WHERE u.user_id = :user_id
+        """,
+        "assignments_per_team": """
+            SELECT u.team_name, COUNT(*)
+            FROM bench_int_pr_reviewers r
+            JOIN bench_int_users u ON u.id = r.user_pk
+            JOIN bench_int_prs p ON p.id = r.pull_request_pk
+            WHERE p.status = 'OPEN'
+            GROUP BY u.team_name
+        """,
+    },
+}
+
+
+def insert_batches(conn, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(table.insert(), rows[start:start + BATCH_SIZE])
+
+
+def uuid_like(rng: random.Random) -> str:
+    """Realistic external id width (32 hex chars, like a UUID)"""
+    return "%032x" % rng.getrandbits(128)
+
+
+def populate(engine, assignments: int, users: int, teams: int):
+    """Fill both layouts with identical data: two reviewers per PR"""
+    rng = random.Random(42)
+    num_prs = assignments // 2
+    user_ids = [f"user-{uuid_like(rng)}" for _ in range(users)]
+    user_rows = [
+        {"id": i + 1, "user_id": uid, "team_name": f"team-{i % teams}"}
+        for i, uid in enumerate(user_ids)
+    ]
+    pr_rows = [
+        {"id": i + 1, "pull_request_id": f"pr-{uuid_like(rng)}", "status": "OPEN" if i % 5 else "MERGED"}
+        for i in range(num_prs)
+    ]
+    pairs = []
+    for pr_pk in range(1, num_prs + 1):
+        first, second = rng.sample(range(users), 2)
+        pairs.append((pr_pk, first + 1))
+        pairs.append((pr_pk, second + 1))
+
+    with engine.begin() as conn:
+        insert_batches(conn, str_users, [{"user_id": r["user_id"], "team_name": r["team_name"]} for r in user_rows])
+        insert_batches(conn, str_prs, [{"pull_request_id": r["pull_request_id"], "status": r["status"]} for r in pr_rows])
+        insert_batches(conn, str_reviewers, [
+            {"pull_request_id": pr_rows[pr_pk - 1]["pull_request_id"], "user_id": user_rows[user_pk - 1]["user_id"]}
+            for pr_pk, user_pk in pairs
+        ])
+        insert_batches(conn, int_users, user_rows)
+        insert_batches(conn, int_prs, pr_rows)
+        insert_batches(conn, int_reviewers, [{"pull_request_pk": p, "user_pk": u} for p, u in pairs])
+    return user_ids
+
+
+def table_and_index_sizes(engine, table_name: str) -> tuple[int, int]:
+    """Return (table bytes, index bytes) for the join table"""
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            row = conn.execute(
+                text("SELECT pg_table_size(:t), pg_indexes_size(:t)"), {"t": table_name}
+            ).one()
+            return int(row[0]), int(row[1])
+        conn.execute(text("ANALYZE"))
+        sizes = dict(conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")).all())
+        index_names = [
+            r[0] for r in conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"),
+                {"t": table_name},
+            )
+        ]
+        return sizes.get(table_name, 0), sum(sizes.get(name, 0) for name in index_names)
+
+
+def time_query(engine, sql: str, params_list: list[dict]) -> float:
+    """Average latency in milliseconds"""
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        for params in params_list:
+            conn.execute(text(sql), params).all()
+        return (time.perf_counter() - started) * 1000 / len(params_list)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--assignments", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--lookups", type=int, default=500)
+    args = parser.parse_args()
+
+    engine = create_engine(BENCH_DATABASE_URL)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    started = time.perf_counter()
+    user_ids = populate(engine, args.assignments, args.users, args.teams)
+    print(f"Loaded {args.assignments:,} assignments in {time.perf_counter() - started:.1f}s "
+          f"({engine.dialect.name})")
+
+    rng = random.Random(7)
+    lookups = [{"user_id": rng.choice(user_ids)} for _ in range(args.lookups)]
+
+    print(f"{'layout':<8}{'table MB':>10}{'index MB':>10}{'user_reviews ms':>18}{'per_team ms':>14}")
+    for layout, table in (("str", str_reviewers), ("int", int_reviewers)):
+        table_bytes, index_bytes = table_and_index_sizes(engine, table.name)
+        reviews_ms = time_query(engine, JOIN_QUERIES[layout]["user_reviews"], lookups)
+        per_team_ms = time_query(engine, JOIN_QUERIES[layout]["assignments_per_team"], [{}] * 3)
+        print(f"{layout:<8}{table_bytes / 2**20:>10.1f}{index_bytes / 2**20:>10.1f}"
+              f"{reviews_ms:>18.3f}{per_team_ms:>14.1f}")
+
+    metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
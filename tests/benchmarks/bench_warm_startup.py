@@ -0,0 +1,112 @@
+"""
+Benchmark: time to first request and first-request latency, cold vs warmed start.
+
+Starts the service with uvicorn twice (WARMUP_ENABLED=false / true) against the
+same seeded database and measures:
+- time until /health answers (process up)
+- time until /ready answers 200 (what a load balancer waits for)
+- latency of the first real request and the median of the following ones
+
+Run with: python -m tests.benchmarks.bench_warm_startup [--teams 200 --team-size 10]
+Uses BENCH_DATABASE_URL (default: sqlite:///./bench.db).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///./bench.db")
+PORT = int(os.getenv("BENCH_PORT", "8099"))
+
+
+def seed(teams: int, team_size: int):
+    from app import services
+    from app.database import Base
+
+    engine = create_engine(BENCH_DATABASE_URL)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    for t in range(teams):
+        services.create_team(db, f"team-{t}", [
+            {"user_id": f"u-{t}-{i}", "username": f"User {t}-{i}", "is_active": True}
+            for i in range(team_size)
+        ])
+    db.close()
+
+
+def wait_for(client: httpx.Client, path: str, timeout: float = 30.0) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{path} did not become available")
+
+
+def run(warmup: bool, teams: int, requests: int, run_id: str) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=BENCH_DATABASE_URL,
+        INVALIDATION_BUS="none",
+        WARMUP_ENABLED="true" if warmup else "false",
+    )
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{PORT}", timeout=10) as client:
+            health_at = wait_for(client, "/health")
+            ready_at = wait_for(client, "/ready")
+
+            latencies = []
+            for i in range(requests):
+                request_started = time.perf_counter()
+                response = client.post("/pullRequest/create", json={
+                    "pull_request_id": f"pr-{run_id}-{i}",
+                    "pull_request_name": "Benchmark",
+                    "author_id": f"u-{i % teams}-0",
+                })
+                latencies.append((time.perf_counter() - request_started) * 1000)
+                response.raise_for_status()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "health_s": health_at - started,
+        "ready_s": ready_at - started,
+        "first_ms": latencies[0],
+        "median_ms": statistics.median(latencies[1:]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--team-size", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    seed(args.teams, args.team_size)
+
+    print(f"{'mode':<8}{'/health s':>11}{'/ready s':>10}{'first ms':>10}{'median ms':>11}")
+    for mode, warmup in (("cold", False), ("warm", True)):
+        result = run(warmup, args.teams, args.requests, mode)
+        print(f"{mode:<8}{result['health_s']:>11.2f}{result['ready_s']:>10.2f}"
+              f"{result['first_ms']:>10.1f}{result['median_ms']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
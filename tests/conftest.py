@@ -1,25 +1,77 @@
+import os
+import shutil
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.database import Base, get_db
-from app.main import app
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+# One database per pytest process: parallel workers (pytest -n, PYTEST_XDIST_WORKER)
+# never share a file
+TEST_DATABASE_DIR = tempfile.mkdtemp(prefix="pr-reviewer-tests-")
+TEST_DATABASE_URL = f"sqlite:///{TEST_DATABASE_DIR}/{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.db"
+
+# Must be set before the app modules read their configuration. Assigned rather
+# than defaulted: xdist workers inherit the controller's environment
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+os.environ["INVALIDATION_SOCKET_DIR"] = tempfile.mkdtemp(prefix="pr-reviewer-bus-")
+os.environ.setdefault("INVALIDATION_BUS", "local")
 
-TEST_DATABASE_URL = "sqlite:///./test.db"
+from app.cache import assignment_index, team_responses  # noqa: E402
+from app.database import Base, get_db  # noqa: E402
+from app.main import app  # noqa: E402
 
 engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-@pytest.fixture(scope="function")
-def db_session():
+# pysqlite defers BEGIN on its own and breaks SAVEPOINT; let SQLAlchemy emit it
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _begin(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Schema built once per test process"""
     Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        shutil.rmtree(TEST_DATABASE_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="function")
+def db_connection(database):
+    """Connection whose outer transaction is rolled back after the test"""
+    connection = database.connect()
+    transaction = connection.begin()
+    try:
+        yield connection
+    finally:
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture(scope="function")
+def db_session(db_connection):
+    # commit() inside the services only releases a SAVEPOINT
+    db = Session(bind=db_connection, autoflush=False, join_transaction_mode="create_savepoint")
+    # Caches must not outlive the rows they were loaded from
+    assignment_index.clear()
+    team_responses.clear()
     try:
         yield db
     finally:
         db.close()
-        Base.metadata.drop_all(bind=engine)
+        assignment_index.clear()
+        team_responses.clear()
 
 
 @pytest.fixture(scope="function")
@@ -34,4 +86,3 @@ def client(db_session):
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
-
@@ -1,5 +1,12 @@
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+from app import changes, services
 
 
 def test_create_team(client: TestClient):
@@ -328,3 +335,1182 @@ def test_bulk_deactivate(client: TestClient):
     members = user_response.json()["members"]
     assert all(not member["is_active"] for member in members)
 
+
+def test_bulk_deactivate_retries_conflicts(client: TestClient, monkeypatch):
+    """Test that a conflict on the first attempt reruns the whole transaction"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "retry_team",
+            "members": [
+                {"user_id": "r1", "username": "Rita", "is_active": True},
+                {"user_id": "r2", "username": "Roman", "is_active": True}
+            ]
+        }
+    )
+    client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-retry", "pull_request_name": "Retry PR", "author_id": "r1"}
+    )
+
+    record = changes.record
+    calls = []
+
+    def locked_once(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+        return record(*args, **kwargs)
+
+    monkeypatch.setattr(changes, "record", locked_once)
+    response = client.post("/users/bulkDeactivate", json={"team_name": "retry_team"})
+    monkeypatch.undo()
+    assert response.status_code == 200
+    assert len(calls) > 1
+
+    members = client.get("/team/get?team_name=retry_team").json()["members"]
+    assert all(not member["is_active"] for member in members)
+
+
+def test_create_team_reload_is_not_retried(db_session, monkeypatch):
+    """Test that a failed read after the commit does not rerun the committed insert"""
+    refresh = db_session.refresh
+    calls = []
+
+    def locked_once(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise OperationalError("SELECT", {}, sqlite3.OperationalError("database is locked"))
+        return refresh(*args, **kwargs)
+
+    monkeypatch.setattr(db_session, "refresh", locked_once)
+    # The read error surfaces as is instead of a rerun answering TEAM_EXISTS
+    with pytest.raises(OperationalError):
+        services.create_team(db_session, "reloaded", [{"user_id": "rl1", "username": "Lena", "is_active": True}])
+    monkeypatch.undo()
+
+    assert [user.user_id for user in services.get_team_by_name(db_session, "reloaded").members] == ["rl1"]
+
+
+def test_user_reviews_resolve_string_ids(client: TestClient):
+    """Test that reviews stored by surrogate keys come back with public string ids"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "keys",
+            "members": [
+                {"user_id": "k1", "username": "Xena", "is_active": True},
+                {"user_id": "k2", "username": "Yuri", "is_active": True}
+            ]
+        }
+    )
+    create_response = client.post(
+        "/pullRequest/create",
+        json={
+            "pull_request_id": "pr-keys",
+            "pull_request_name": "Surrogate keys",
+            "author_id": "k1"
+        }
+    )
+    assert create_response.json()["assigned_reviewers"] == ["k2"]
+
+    response = client.get("/users/getReview?user_id=k2")
+    assert response.status_code == 200
+    prs = response.json()["pull_requests"]
+    assert [pr["pull_request_id"] for pr in prs] == ["pr-keys"]
+    assert prs[0]["author_id"] == "k1"
+
+
+def test_stats_timeseries(client: TestClient, db_session):
+    """Test time-series stats are maintained by create and merge"""
+    from app import rollups
+    from app.models import StatsRollup
+    from app.sketch import LogHistogram
+
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "analytics",
+            "members": [
+                {"user_id": "a1", "username": "Ann", "is_active": True},
+                {"user_id": "a2", "username": "Ben", "is_active": True},
+                {"user_id": "a3", "username": "Cid", "is_active": True}
+            ]
+        }
+    )
+    for pr_id in ["pr-ts-1", "pr-ts-2"]:
+        client.post(
+            "/pullRequest/create",
+            json={"pull_request_id": pr_id, "pull_request_name": pr_id, "author_id": "a1"}
+        )
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-ts-1"})
+    # Idempotent merge must not be counted twice
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-ts-1"})
+
+    for params in ["bucket=hour", "bucket=day&team_name=analytics"]:
+        response = client.get(f"/stats/timeseries?{params}")
+        assert response.status_code == 200
+        data = response.json()
+        assert sum(p["opened"] for p in data["points"]) == 2
+        assert sum(p["merged"] for p in data["points"]) == 1
+        assert sum(p["assignments"] for p in data["points"]) == 4
+        assert data["time_to_merge_seconds"]["p50"] >= 0
+
+    response = client.get("/stats/timeseries?team_name=unknown")
+    assert response.json()["points"] == []
+
+    # Organisation-wide series sum the shard rows; there is no row written by every merge
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "platform",
+            "members": [
+                {"user_id": "b1", "username": "Bo", "is_active": True},
+                {"user_id": "b2", "username": "Bea", "is_active": True}
+            ]
+        }
+    )
+    client.post("/pullRequest/create", json={"pull_request_id": "pr-ts-3", "pull_request_name": "x", "author_id": "b1"})
+    client.post("/pullRequest/bulkMerge", json={"pull_request_ids": ["pr-ts-2", "pr-ts-3"]})
+    data = client.get("/stats/timeseries?bucket=day").json()
+    assert sum(p["opened"] for p in data["points"]) == 3
+    assert sum(p["merged"] for p in data["points"]) == 3
+    shards = {rollups.org_shard("analytics"), rollups.org_shard("platform")}
+    assert {row.team_name for row in db_session.query(StatsRollup)} == {"analytics", "platform", *shards}
+    assert shards < set(rollups.ORG_SHARD_NAMES)
+
+    # The stored sketch is merged by the upsert, not overwritten
+    for row in db_session.query(StatsRollup).filter(StatsRollup.team_name == "analytics", StatsRollup.period == "day"):
+        assert LogHistogram.from_json(row.ttm_sketch).count == row.merged == 2
+
+
+def test_ready_after_warmup(client: TestClient):
+    """Test that /ready reports ready once startup warm-up has finished"""
+    deadline = time.monotonic() + 5
+    response = client.get("/ready")
+    while response.status_code != 200 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        response = client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert client.get("/health").json() == {"status": "ok"}
+
+
+def test_assignment_index_tracks_open_reviews(client: TestClient, db_session):
+    """Test that the in-memory assignment index follows create, reassign and merge"""
+    from app.assignment_index import AssignmentIndex
+    from app.cache import assignment_index
+
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "indexed",
+            "members": [
+                {"user_id": "i1", "username": "Ida", "is_active": True},
+                {"user_id": "i2", "username": "Ivo", "is_active": True},
+                {"user_id": "i3", "username": "Ira", "is_active": True},
+                {"user_id": "i4", "username": "Ilo", "is_active": True}
+            ]
+        }
+    )
+    reviewers = client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-idx", "pull_request_name": "Index", "author_id": "i1"}
+    ).json()["assigned_reviewers"]
+    client.post(
+        "/pullRequest/reassign",
+        json={"pull_request_id": "pr-idx", "old_user_id": reviewers[0]}
+    )
+
+    def open_reviews(index):
+        return {r.user_id: r.open_reviews for r in index.team_members(db_session, "indexed")}
+
+    # Incrementally maintained counts match a fresh load from the database
+    fresh = AssignmentIndex()
+    assert open_reviews(assignment_index) == open_reviews(fresh)
+    assert sum(open_reviews(assignment_index).values()) == 2
+    assert open_reviews(assignment_index)[reviewers[0]] == 0
+
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-idx"})
+    assert sum(open_reviews(assignment_index).values()) == 0
+
+    # Post-commit deltas of concurrent transactions may arrive out of order; none is lost
+    assignment_index.add_open_reviews(["i2"], -1)
+    assignment_index.add_open_reviews(["i2"], 1)
+    assert open_reviews(assignment_index)["i2"] == 0
+
+    # Selection takes the least loaded candidates: three PRs spread evenly over three reviewers
+    for i in range(3):
+        client.post(
+            "/pullRequest/create",
+            json={"pull_request_id": f"pr-load-{i}", "pull_request_name": "Load", "author_id": "i1"}
+        )
+    assert open_reviews(assignment_index) == {"i1": 0, "i2": 2, "i3": 2, "i4": 2}
+
+
+def test_bulk_merge(client: TestClient):
+    """Test bulk merge is idempotent per item and reports errors per item"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "release",
+            "members": [
+                {"user_id": "r1", "username": "Rob", "is_active": True},
+                {"user_id": "r2", "username": "Rex", "is_active": True}
+            ]
+        }
+    )
+    for pr_id in ["pr-bm-1", "pr-bm-2"]:
+        client.post(
+            "/pullRequest/create",
+            json={"pull_request_id": pr_id, "pull_request_name": pr_id, "author_id": "r1"}
+        )
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-bm-2"})
+
+    response = client.post(
+        "/pullRequest/bulkMerge",
+        json={"pull_request_ids": ["pr-bm-1", "pr-bm-2", "pr-missing"]}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["pull_request_id"] for r in results] == ["pr-bm-1", "pr-bm-2", "pr-missing"]
+    assert results[0]["pr"]["status"] == "MERGED"
+    assert results[0]["pr"]["mergedAt"] is not None
+    assert results[1]["pr"]["status"] == "MERGED"
+    assert results[2]["error"]["code"] == "NOT_FOUND"
+
+    stats = client.get("/stats").json()
+    assert stats["merged_prs"] == 2
+
+
+def test_bulk_reassign(client: TestClient, db_session):
+    """Test bulk reassign applies valid items and reports errors per item"""
+    from app.models import User
+
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "rotation",
+            "members": [
+                {"user_id": "o1", "username": "Olga", "is_active": True},
+                {"user_id": "o2", "username": "Oleg", "is_active": True},
+                {"user_id": "o3", "username": "Omar", "is_active": True},
+                {"user_id": "o4", "username": "Orla", "is_active": True}
+            ]
+        }
+    )
+    open_reviewers = client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-br-1", "pull_request_name": "Open", "author_id": "o1"}
+    ).json()["assigned_reviewers"]
+    merged_reviewers = client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-br-2", "pull_request_name": "Merged", "author_id": "o1"}
+    ).json()["assigned_reviewers"]
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-br-2"})
+    # Author plus exactly two reviewers: nobody left to replace them with
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "rotation-small",
+            "members": [
+                {"user_id": "s1", "username": "Sia", "is_active": True},
+                {"user_id": "s2", "username": "Sol", "is_active": True},
+                {"user_id": "s3", "username": "Sue", "is_active": True}
+            ]
+        }
+    )
+    client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-br-3", "pull_request_name": "Small", "author_id": "s1"}
+    )
+
+    response = client.post(
+        "/pullRequest/bulkReassign",
+        json={
+            "items": [
+                {"pull_request_id": "pr-br-1", "old_user_id": open_reviewers[0]},
+                {"pull_request_id": "pr-br-2", "old_user_id": merged_reviewers[0]},
+                {"pull_request_id": "pr-br-1", "old_user_id": "o1"},
+                {"pull_request_id": "pr-br-3", "old_user_id": "s2"}
+            ]
+        }
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    new_reviewer = results[0]["replaced_by"]
+    assert new_reviewer not in open_reviewers + ["o1"]
+    assert sorted(results[0]["pr"]["assigned_reviewers"]) == sorted([new_reviewer, open_reviewers[1]])
+    assert [r["error"]["code"] if r["error"] else None for r in results] == [
+        None, "PR_MERGED", "NOT_ASSIGNED", "NO_CANDIDATE"
+    ]
+
+    reviews = client.get(f"/users/getReview?user_id={new_reviewer}").json()["pull_requests"]
+    assert "pr-br-1" in [pr["pull_request_id"] for pr in reviews]
+
+    # The only candidate left was deactivated by a write this worker's index hasn't seen:
+    # replacements are claimed from the database like in a single reassign
+    db_session.query(User).filter(User.user_id == open_reviewers[0]).update({User.is_active: False})
+    db_session.commit()
+    response = client.post(
+        "/pullRequest/bulkReassign",
+        json={"items": [{"pull_request_id": "pr-br-1", "old_user_id": open_reviewers[1]}]}
+    )
+    assert response.json()["results"][0]["error"]["code"] == "NO_CANDIDATE"
+
+
+def test_group_commit_create(client: TestClient, db_session, monkeypatch):
+    """Test that concurrent creations are committed together with per-item results"""
+    from sqlalchemy.orm import sessionmaker
+
+    from app import services
+    from app.group_commit import create_committer
+
+    batch_sizes = []
+    create_pull_requests = services.create_pull_requests
+
+    def recording_create_pull_requests(db, items):
+        batch_sizes.append(len(items))
+        return create_pull_requests(db, items)
+
+    monkeypatch.setattr(services, "create_pull_requests", recording_create_pull_requests)
+    monkeypatch.setattr(create_committer, "window", 0.2)
+    monkeypatch.setattr(create_committer, "session_factory", sessionmaker(bind=db_session.get_bind(), join_transaction_mode="create_savepoint"))
+
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "burst",
+            "members": [
+                {"user_id": "b1", "username": "Bea", "is_active": True},
+                {"user_id": "b2", "username": "Bob", "is_active": True},
+                {"user_id": "b3", "username": "Bud", "is_active": True}
+            ]
+        }
+    )
+    requests = [
+        {"pull_request_id": "pr-gc-1", "pull_request_name": "One", "author_id": "b1"},
+        {"pull_request_id": "pr-gc-2", "pull_request_name": "Two", "author_id": "b2"},
+        {"pull_request_id": "pr-gc-1", "pull_request_name": "Duplicate", "author_id": "b3"},
+        {"pull_request_id": "pr-gc-3", "pull_request_name": "Ghost", "author_id": "nobody"},
+    ]
+    with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+        responses = list(pool.map(lambda body: client.post("/pullRequest/create", json=body), requests))
+
+    assert batch_sizes == [4]
+    codes = sorted(r.status_code for r in responses)
+    assert codes == [201, 201, 404, 409]
+    created = [r.json() for r in responses if r.status_code == 201]
+    assert {pr["pull_request_id"] for pr in created} == {"pr-gc-1", "pr-gc-2"}
+    for pr in created:
+        assert len(pr["assigned_reviewers"]) == 2
+        assert pr["author_id"] not in pr["assigned_reviewers"]
+        assert pr["createdAt"] is not None
+
+    assert client.get("/stats").json()["total_prs"] == 2
+
+
+def test_group_commit_batch_claims_and_retries(client: TestClient, db_session, db_connection, monkeypatch):
+    """Test that a batch claims all its reviewers in one query and is retried whole on a conflict"""
+    import sqlite3
+
+    from sqlalchemy import event
+    from sqlalchemy.exc import OperationalError
+
+    from app import rollups, services
+
+    client.post("/team/add", json={
+        "team_name": "batch",
+        "members": [{"user_id": f"g{i}", "username": "G", "is_active": True} for i in range(5)]
+    })
+    attempts = []
+    record_prs_opened = rollups.record_prs_opened
+
+    def locked_once(db, opened):
+        attempts.append(len(opened))
+        if len(attempts) == 1:
+            raise OperationalError("INSERT", {}, sqlite3.OperationalError("database is locked"))
+        return record_prs_opened(db, opened)
+
+    def single_create(*args):
+        raise AssertionError("the batch must not fall back to single creates")
+
+    claims = []
+
+    def count_claims(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT users.") and "users.user_id IN" in statement:
+            claims.append(statement)
+
+    monkeypatch.setattr(rollups, "record_prs_opened", locked_once)
+    monkeypatch.setattr(services, "create_pull_request", single_create)
+    event.listen(db_connection, "before_cursor_execute", count_claims)
+    try:
+        results = services.create_pull_requests(db_session, [(f"pr-g-{i}", "G", f"g{i}") for i in range(4)])
+    finally:
+        event.remove(db_connection, "before_cursor_execute", count_claims)
+
+    assert attempts == [4, 4]
+    assert len(claims) == 2
+    assert all(len(result["assigned_reviewers"]) == 2 for result in results)
+    assert client.get("/stats", params={"fields": "total_prs"}).json() == {"total_prs": 4}
+
+
+def test_reviewer_workload(client: TestClient):
+    """Test top-N reviewer workload with team, status, limit and order"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "load",
+            "members": [
+                {"user_id": "l1", "username": "Lea", "is_active": True},
+                {"user_id": "l2", "username": "Leo", "is_active": True},
+                {"user_id": "l3", "username": "Lou", "is_active": True}
+            ]
+        }
+    )
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "other",
+            "members": [
+                {"user_id": "x1", "username": "Xia", "is_active": True},
+                {"user_id": "x2", "username": "Xan", "is_active": True}
+            ]
+        }
+    )
+    # l1 authors three PRs reviewed by l2 and l3; l2 authors one reviewed by l1 and l3
+    for i in range(3):
+        client.post(
+            "/pullRequest/create",
+            json={"pull_request_id": f"pr-wl-{i}", "pull_request_name": "Load", "author_id": "l1"}
+        )
+    client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-wl-3", "pull_request_name": "Load", "author_id": "l2"}
+    )
+    client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-wl-x", "pull_request_name": "Other", "author_id": "x1"}
+    )
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-wl-0"})
+
+    data = client.get("/stats/reviewers?team_name=load").json()
+    assert data["status"] == "OPEN"
+    assert [(r["user_id"], r["assignments"]) for r in data["reviewers"]] == [
+        ("l3", 3), ("l2", 2), ("l1", 1)
+    ]
+
+    data = client.get("/stats/reviewers?team_name=load&status=ALL&limit=1").json()
+    assert [(r["user_id"], r["assignments"]) for r in data["reviewers"]] == [("l3", 4)]
+
+    data = client.get("/stats/reviewers?status=MERGED&order=asc").json()
+    assert [(r["user_id"], r["assignments"]) for r in data["reviewers"]] == [("l2", 1), ("l3", 1)]
+
+    data = client.get("/stats/reviewers").json()
+    assert {r["user_id"] for r in data["reviewers"]} == {"l1", "l2", "l3", "x2"}
+
+
+def test_team_statistics(client: TestClient):
+    """Test per-team aggregates from counters and the open-review distribution"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "core",
+            "members": [
+                {"user_id": "c1", "username": "Cid", "is_active": True},
+                {"user_id": "c2", "username": "Cal", "is_active": True},
+                {"user_id": "c3", "username": "Cat", "is_active": True},
+                {"user_id": "c4", "username": "Cob", "is_active": False}
+            ]
+        }
+    )
+    client.post("/team/add", json={"team_name": "empty", "members": []})
+    for i in range(3):
+        client.post(
+            "/pullRequest/create",
+            json={"pull_request_id": f"pr-ts-{i}", "pull_request_name": "Core", "author_id": "c1"}
+        )
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-ts-0"})
+
+    data = client.get("/stats/teams").json()
+    assert [t["team_name"] for t in data["teams"]] == ["core", "empty"]
+    core, empty = data["teams"]
+    assert core == {
+        "team_name": "core",
+        "members": 4,
+        "active_members": 3,
+        "open_prs": 2,
+        "merged_prs": 1,
+        "open_assignments": 4,
+        "max_open_assignments": 2,
+        "idle_active_members": 1
+    }
+    assert empty["members"] == 0 and empty["open_prs"] == 0
+
+    data = client.get("/stats/teams?team_name=core").json()
+    assert data["teams"] == [core]
+
+    response = client.get("/stats/teams?team_name=missing")
+    assert response.status_code == 404
+
+
+def test_change_feed(client: TestClient, db_session):
+    """Test the change feed pages through committed changes and compacts old ones"""
+    from datetime import datetime, timedelta, timezone
+
+    from app import changes
+    from app.models import ChangeLogEntry
+
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "feed",
+            "members": [
+                {"user_id": "f1", "username": "Fay", "is_active": True},
+                {"user_id": "f2", "username": "Fox", "is_active": True},
+                {"user_id": "f3", "username": "Fin", "is_active": True},
+                {"user_id": "f4", "username": "Flo", "is_active": True}
+            ]
+        }
+    )
+    pr = client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-feed", "pull_request_name": "Feed", "author_id": "f1"}
+    ).json()
+    old_user_id = pr["assigned_reviewers"][0]
+    client.post("/pullRequest/reassign", json={"pull_request_id": "pr-feed", "old_user_id": old_user_id})
+    client.post("/pullRequest/merge", json={"pull_request_id": "pr-feed"})
+    client.post("/users/setIsActive", json={"user_id": "f4", "is_active": False})
+    # Failed mutations leave no trace
+    client.post("/pullRequest/merge", json={"pull_request_id": "missing"})
+
+    data = client.get("/changes").json()
+    assert [(c["entity"], c["entity_id"], c["event"]) for c in data["changes"]] == [
+        ("team", "feed", "team.created"),
+        ("pull_request", "pr-feed", "pull_request.created"),
+        ("pull_request", "pr-feed", "pull_request.reassigned"),
+        ("pull_request", "pr-feed", "pull_request.merged"),
+        ("user", "f4", "user.deactivated")
+    ]
+    assert data["has_more"] is False
+    assert len(data["changes"][0]["data"]["members"]) == 4
+    reassigned = data["changes"][2]["data"]
+    assert reassigned["old_user_id"] == old_user_id
+    assert reassigned["replaced_by"] in reassigned["assigned_reviewers"]
+    assert data["changes"][3]["data"]["status"] == "MERGED"
+
+    page = client.get("/changes?limit=2").json()
+    assert [c["event"] for c in page["changes"]] == ["team.created", "pull_request.created"]
+    assert page["has_more"] is True
+    page = client.get(f"/changes?since={page['next_cursor']}&limit=2").json()
+    assert [c["event"] for c in page["changes"]] == ["pull_request.reassigned", "pull_request.merged"]
+
+    cursor = data["next_cursor"]
+    assert client.get(f"/changes?since={cursor}").json() == {
+        "changes": [], "next_cursor": cursor, "has_more": False
+    }
+
+    # A transaction that took its id before the entries above but commits now
+    # is still served after the cursor
+    first_id = db_session.query(ChangeLogEntry.id).order_by(ChangeLogEntry.id).first()[0]
+    db_session.add(ChangeLogEntry(
+        id=first_id - 1, entity="user", entity_id="f3", event="user.updated",
+        payload='{"user_id": "f3"}', created_at=datetime.now(timezone.utc)
+    ))
+    db_session.commit()
+    late = client.get(f"/changes?since={cursor}").json()
+    assert [c["event"] for c in late["changes"]] == ["user.updated"]
+    assert late["next_cursor"] == cursor + 1
+
+    # Compaction keeps only the latest entry per entity
+    assert changes.compact(db_session, timedelta(0)) == 2
+    data = client.get("/changes").json()
+    assert [c["event"] for c in data["changes"]] == [
+        "team.created", "pull_request.merged", "user.deactivated", "user.updated"
+    ]
+
+    # Entries no consumer has read are compacted as well
+    client.post("/users/setIsActive", json={"user_id": "f4", "is_active": True})
+    client.post("/users/setIsActive", json={"user_id": "f4", "is_active": False})
+    assert changes.compact(db_session, timedelta(0)) == 2
+    assert db_session.query(ChangeLogEntry).filter(ChangeLogEntry.entity_id == "f4").count() == 1
+
+
+def test_review_long_poll(client: TestClient):
+    """Test long-poll answers immediately on a stale version and wakes up on assignment"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "poll",
+            "members": [
+                {"user_id": "p1", "username": "Pam", "is_active": True},
+                {"user_id": "p2", "username": "Pat", "is_active": True}
+            ]
+        }
+    )
+    client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-poll-1", "pull_request_name": "Poll", "author_id": "p1"}
+    )
+
+    first = client.get("/users/reviewPoll?user_id=p2").json()
+    assert [pr["pull_request_id"] for pr in first["pull_requests"]] == ["pr-poll-1"]
+
+    # Nothing changes: the poll times out with the same version
+    unchanged = client.get(f"/users/reviewPoll?user_id=p2&version={first['version']}&timeout=0.1").json()
+    assert unchanged["version"] == first["version"]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        started = time.monotonic()
+        waiting = executor.submit(
+            client.get, f"/users/reviewPoll?user_id=p2&version={first['version']}&timeout=10"
+        )
+        time.sleep(0.2)
+        client.post("/pullRequest/merge", json={"pull_request_id": "pr-poll-1"})
+        changed = waiting.result(timeout=10).json()
+    assert time.monotonic() - started < 5
+    assert changed["version"] != first["version"]
+    assert changed["pull_requests"][0]["status"] == "MERGED"
+
+    assert client.get("/users/reviewPoll?user_id=missing").status_code == 404
+    assert client.get("/users/reviewStream?user_id=missing").status_code == 404
+
+
+def test_review_stream_events():
+    """Test the SSE stream sends a snapshot, keepalives and events published from other threads"""
+    import asyncio
+
+    from app import review_stream
+
+    pr = {"pull_request_id": "pr-sse", "pull_request_name": "SSE", "author_id": "s0", "status": "OPEN"}
+
+    async def scenario():
+        queue = review_stream.hub.subscribe("s1")
+        stream = review_stream.sse_events("s1", queue, {"user_id": "s1"}, keepalive=0.05)
+        assert await anext(stream) == 'event: snapshot\ndata: {"user_id": "s1"}\n\n'
+        assert await anext(stream) == ": keepalive\n\n"
+
+        # Write paths publish from the threadpool
+        await asyncio.to_thread(review_stream.notify_reviewers, "assigned", ["s1", "s2"], pr)
+        chunk = await anext(stream)
+        assert chunk.startswith("event: assigned\n")
+        assert '"pull_request_id": "pr-sse"' in chunk
+
+        await stream.aclose()
+        return len(review_stream.hub)
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_team_membership_changes(client: TestClient, db_session):
+    """Test adding, moving and removing members keeps rosters, counters and reviews current"""
+    from app.cache import assignment_index
+
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "alpha",
+            "members": [
+                {"user_id": "a1", "username": "Ada", "is_active": True},
+                {"user_id": "a2", "username": "Abe", "is_active": True},
+                {"user_id": "a3", "username": "Ava", "is_active": True}
+            ]
+        }
+    )
+    client.post(
+        "/team/add",
+        json={"team_name": "beta", "members": [{"user_id": "b1", "username": "Bea", "is_active": True}]}
+    )
+    pr = client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-m1", "pull_request_name": "Members", "author_id": "a1"}
+    ).json()
+    assert set(pr["assigned_reviewers"]) == {"a2", "a3"}
+
+    response = client.post(
+        "/team/members/add",
+        json={"team_name": "alpha", "members": [{"user_id": "a4", "username": "Ari", "is_active": True}]}
+    )
+    assert response.status_code == 200
+    assert response.json()["members"] == [
+        {"user_id": "a4", "username": "Ari", "team_name": "alpha", "is_active": True}
+    ]
+    # Loaded rosters are patched in place
+    assert [r.user_id for r in assignment_index._teams["alpha"]] == ["a1", "a2", "a3", "a4"]
+
+    # a2 leaves; its review goes to the only other free alpha member
+    data = client.post(
+        "/team/members/move",
+        json={"team_name": "beta", "user_ids": ["a2"], "reassign_reviews": True}
+    ).json()
+    assert data["members"][0]["team_name"] == "beta"
+    assert [(r["pull_request_id"], r["old_user_id"], r["replaced_by"]) for r in data["reassigned"]] == [
+        ("pr-m1", "a2", "a4")
+    ]
+    assert [r.user_id for r in assignment_index._teams["alpha"]] == ["a1", "a3", "a4"]
+    assert assignment_index.get_user(db_session, "a4").open_reviews == 1
+    assert assignment_index.active_candidates(db_session, "beta") == ["a2", "b1"]
+
+    # Moving the author carries its PR counters to the new team
+    client.post("/team/members/move", json={"team_name": "beta", "user_ids": ["a1"]})
+    teams = {t["team_name"]: t for t in client.get("/stats/teams").json()["teams"]}
+    assert (teams["alpha"]["open_prs"], teams["beta"]["open_prs"]) == (0, 1)
+    assert (teams["alpha"]["members"], teams["beta"]["members"]) == (2, 3)
+
+    # No one left in alpha to take a3's review: reported, review stays
+    data = client.post(
+        "/team/members/remove",
+        json={"team_name": "alpha", "user_ids": ["a3"], "reassign_reviews": True}
+    ).json()
+    assert data["members"][0]["team_name"] is None
+    assert data["reassigned"][0]["error"]["code"] == "NO_CANDIDATE"
+    assert [pr["pull_request_id"] for pr in client.get("/users/getReview?user_id=a3").json()["pull_requests"]] == ["pr-m1"]
+    assert assignment_index.active_candidates(db_session, "alpha") == ["a4"]
+    # Removed reviewers still show up in the workload report, without a team
+    workload = client.get("/stats/reviewers")
+    assert workload.status_code == 200
+    assert {r["user_id"]: r["team_name"] for r in workload.json()["reviewers"]}["a3"] is None
+
+    # Members without a team still author PRs, they just get no reviewers
+    response = client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-m2", "pull_request_name": "Solo", "author_id": "a3"}
+    )
+    assert response.status_code == 201
+    assert response.json()["assigned_reviewers"] == []
+
+    response = client.post("/team/members/remove", json={"team_name": "alpha", "user_ids": ["b1"]})
+    assert response.status_code == 404
+    response = client.post("/team/members/move", json={"team_name": "gamma", "user_ids": ["b1"]})
+    assert response.status_code == 404
+
+
+def test_add_members_with_reassignment_keeps_edits(client: TestClient):
+    """Test that moving members with their reviews reassigned still saves their new name and status"""
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "source",
+            "members": [
+                {"user_id": "s1", "username": "Sal", "is_active": True},
+                {"user_id": "s2", "username": "Sam", "is_active": True},
+                {"user_id": "s3", "username": "Sid", "is_active": True},
+                {"user_id": "s4", "username": "Sue", "is_active": True}
+            ]
+        }
+    )
+    client.post(
+        "/team/add",
+        json={"team_name": "target", "members": [{"user_id": "t1", "username": "Tia", "is_active": True}]}
+    )
+    pr = client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-edit", "pull_request_name": "Edit", "author_id": "s1"}
+    ).json()
+    moved = pr["assigned_reviewers"][0]
+
+    data = client.post(
+        "/team/members/add",
+        json={
+            "team_name": "target",
+            "members": [{"user_id": moved, "username": "RENAMED", "is_active": False}],
+            "reassign_reviews": True
+        }
+    ).json()
+    assert data["members"] == [{"user_id": moved, "username": "RENAMED", "team_name": "target", "is_active": False}]
+    assert [(r["old_user_id"], r["error"]) for r in data["reassigned"]] == [(moved, None)]
+
+    members = {m["user_id"]: m for m in client.get("/team/get?team_name=target").json()["members"]}
+    assert members[moved] == {"user_id": moved, "username": "RENAMED", "is_active": False}
+
+
+def test_bulk_set_user_active(client: TestClient, db_session):
+    """Test bulk activation across teams with per-user outcomes and batched reassignment"""
+    from app.cache import assignment_index
+
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "oncall",
+            "members": [
+                {"user_id": "o1", "username": "Oda", "is_active": True},
+                {"user_id": "o2", "username": "Oli", "is_active": True},
+                {"user_id": "o3", "username": "Ora", "is_active": True},
+                {"user_id": "o4", "username": "Oto", "is_active": False}
+            ]
+        }
+    )
+    client.post(
+        "/team/add",
+        json={
+            "team_name": "vacation",
+            "members": [
+                {"user_id": "v1", "username": "Val", "is_active": True},
+                {"user_id": "v2", "username": "Vic", "is_active": True}
+            ]
+        }
+    )
+    pr = client.post(
+        "/pullRequest/create",
+        json={"pull_request_id": "pr-bsa", "pull_request_name": "Bulk", "author_id": "o1"}
+    ).json()
+    assert set(pr["assigned_reviewers"]) == {"o2", "o3"}
+
+    # o2 goes on vacation, o4 comes back and takes its review
+    data = client.post(
+        "/users/bulkSetIsActive",
+        json={
+            "users": [
+                {"user_id": "o4", "is_active": True},
+                {"user_id": "o2", "is_active": False},
+                {"user_id": "v1", "is_active": True},
+                {"user_id": "v2", "is_active": False},
+                {"user_id": "ghost", "is_active": False}
+            ],
+            "reassign_reviews": True
+        }
+    ).json()
+    results = {r["user_id"]: r for r in data["results"]}
+    assert [r["user_id"] for r in data["results"]] == ["o4", "o2", "v1", "v2", "ghost"]
+    assert results["o4"]["changed"] is True and results["o4"]["user"]["is_active"] is True
+    assert results["v1"]["changed"] is False
+    assert results["ghost"]["error"]["code"] == "NOT_FOUND"
+    assert [(r["old_user_id"], r["replaced_by"]) for r in results["o2"]["reassigned"]] == [("o2", "o4")]
+
+    assert assignment_index.active_candidates(db_session, "oncall") == ["o1", "o3", "o4"]
+    assert assignment_index.active_candidates(db_session, "vacation") == ["v1"]
+    team = client.get("/team/get?team_name=vacation").json()
+    assert {m["user_id"]: m["is_active"] for m in team["members"]} == {"v1": True, "v2": False}
+
+    assert [pr["pull_request_id"] for pr in client.get("/users/getReview?user_id=o4").json()["pull_requests"]] == ["pr-bsa"]
+
+    # Without anyone left to take over, the review stays and the outcome says why
+    data = client.post(
+        "/users/bulkSetIsActive",
+        json={"users": [{"user_id": "o3", "is_active": False}], "reassign_reviews": True}
+    ).json()
+    assert [r["error"]["code"] for r in data["results"][0]["reassigned"]] == ["NO_CANDIDATE"]
+
+
+def test_team_get_response_cache(client: TestClient, monkeypatch):
+    """Test that /team/get serves cached bytes until a write bumps the team version"""
+    from app import services
+    from app.cache import team_responses
+
+    for team_name, prefix in (("cached", "c"), ("other", "o")):
+        client.post("/team/add", json={
+            "team_name": team_name,
+            "members": [
+                {"user_id": f"{prefix}1", "username": "One", "is_active": True},
+                {"user_id": f"{prefix}2", "username": "Two", "is_active": True}
+            ]
+        })
+    first = client.get("/team/get", params={"team_name": "cached"})
+    client.get("/team/get", params={"team_name": "other"})
+    assert len(team_responses) == 2
+
+    def no_queries(db, team_name):
+        raise AssertionError("cache hit must not query")
+
+    get_team_member_rows = services.get_team_member_rows
+    monkeypatch.setattr(services, "get_team_member_rows", no_queries)
+    second = client.get("/team/get", params={"team_name": "cached"})
+    assert second.content == first.content
+    assert second.headers["content-type"] == "application/json"
+    monkeypatch.setattr(services, "get_team_member_rows", get_team_member_rows)
+
+    def active(team_name):
+        members = client.get("/team/get", params={"team_name": team_name}).json()["members"]
+        return {m["user_id"]: m["is_active"] for m in members}
+
+    client.post("/users/setIsActive", json={"user_id": "c2", "is_active": False})
+    assert active("cached") == {"c1": True, "c2": False}
+
+    # A move names only the target team; the source must refresh as well
+    client.post("/team/members/move", json={"team_name": "other", "user_ids": ["c1"]})
+    assert active("cached") == {"c2": False}
+    assert active("other") == {"c1": True, "o1": True, "o2": True}
+
+    client.post("/users/bulkDeactivate", json={"team_name": "other"})
+    assert active("other") == {"c1": False, "o1": False, "o2": False}
+    assert client.get("/team/get", params={"team_name": "missing"}).status_code == 404
+
+
+def test_team_response_cache_bounds():
+    """Test that the response cache evicts least recently used bodies and rejects stale ones"""
+    from app.response_cache import TeamResponseCache
+
+    cache = TeamResponseCache(max_bytes=100)
+    for team_name in ("a", "b"):
+        cache.put(team_name, cache.version(team_name), b"x" * 40, [f"{team_name}1"])
+    cache.get("a")
+    cache.put("c", cache.version("c"), b"x" * 40, ["c1"])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size == 80
+
+    # Built before a write committed: never stored
+    version = cache.version("a")
+    cache.invalidate("a")
+    cache.put("a", version, b"stale", ["a1"])
+    assert cache.get("a") is None
+
+    # A member event voids bodies that were being built while it happened
+    version = cache.version("d")
+    cache.apply_members([(1, "a1", "e", True, 0)])
+    cache.put("d", version, b"stale", ["d1"])
+    assert cache.get("d") is None
+
+    # Variants of a team share its version and are dropped together
+    size = cache.size
+    cache.put("f", cache.version("f"), b"x" * 10, ["f1"])
+    cache.put("f", cache.version("f"), b"y" * 5, ["f1"], variant="gzip")
+    assert cache.get("f", "gzip") == b"y" * 5 and cache.size == size + 15
+    cache.invalidate("f")
+    assert cache.get("f") is None and cache.get("f", "gzip") is None and cache.size == size
+
+
+def test_response_compression_and_fields(client: TestClient, monkeypatch):
+    """Test that large bodies are gzipped when accepted and that fields trims the payload"""
+    from app import compression, config, services
+
+    monkeypatch.setattr(config, "RESPONSE_COMPRESSION_MIN_BYTES", 200)
+    client.post("/team/add", json={
+        "team_name": "wide",
+        "members": [{"user_id": f"w{i}", "username": f"Wide {i}", "is_active": True} for i in range(10)]
+    })
+    created = client.post("/pullRequest/create", json={
+        "pull_request_id": "pr-wide", "pull_request_name": "Wide", "author_id": "w0"
+    }).json()
+    gzip = {"Accept-Encoding": "gzip"}
+
+    compressed = client.get("/team/get", params={"team_name": "wide"}, headers=gzip)
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    plain = client.get("/team/get", params={"team_name": "wide"}, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert int(compressed.headers["content-length"]) < len(plain.content)
+    assert compressed.json() == plain.json()
+
+    # The compressed body is cached next to the plain one: no query, no gzip on a hit
+    def unused(*args):
+        raise AssertionError("cache hit must not rebuild the body")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(services, "get_team_member_rows", unused)
+        patched.setattr(compression, "gzip", unused)
+        again = client.get("/team/get", params={"team_name": "wide"}, headers=gzip)
+    assert again.headers["content-encoding"] == "gzip" and again.json() == plain.json()
+
+    ids = client.get("/team/get", params={"team_name": "wide", "fields": "user_id"}).json()
+    assert ids["members"] == [{"user_id": f"w{i}"} for i in range(10)]
+    assert client.get("/team/get", params={"team_name": "wide", "fields": "password"}).status_code == 422
+
+    reviewer_id = created["assigned_reviewers"][0]
+    reviews = client.get("/users/getReview", params={"user_id": reviewer_id, "fields": ["status", "pull_request_id"]})
+    assert reviews.json()["pull_requests"] == [{"pull_request_id": "pr-wide", "status": "OPEN"}]
+
+    stats = client.get("/stats", params={"fields": ["total_prs", "open_prs"]}, headers=gzip)
+    assert stats.json() == {"total_prs": 1, "open_prs": 1}
+    assert "content-encoding" not in stats.headers
+    # The documented model does not promise fields that were not selected
+    assert "required" not in client.get("/openapi.json").json()["components"]["schemas"]["StatsResponse"]
+    assert set(client.get("/stats").json()["reviewer_assignments"].values()) == {1}
+
+    # Small bodies and clients that refuse gzip get plain bodies
+    assert "content-encoding" not in client.get("/health", headers=gzip).headers
+    refused = client.get("/team/get", params={"team_name": "wide"}, headers={"Accept-Encoding": "gzip;q=0, *"})
+    assert "content-encoding" not in refused.headers
+
+
+def test_sampling_profiler(client: TestClient, monkeypatch):
+    """Test that admins can record a sampling profile and download collapsed stacks"""
+    from app import config
+
+    assert client.post("/admin/profile/start").status_code == 403
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    assert client.get("/admin/profile", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    admin = {"X-Admin-Token": "secret"}
+
+    client.post("/team/add", json={
+        "team_name": "profiled",
+        "members": [{"user_id": f"p{i}", "username": "P", "is_active": True} for i in range(3)]
+    })
+    started = client.post("/admin/profile/start", params={"duration_s": 10, "interval_ms": 1}, headers=admin)
+    assert started.status_code == 200
+    assert started.json()["running"] is True and started.json()["mode"] == "window"
+    assert client.post("/admin/profile/start", headers=admin).status_code == 409
+
+    deadline = time.monotonic() + 5
+    i = 0
+    profile = ""
+    while "app.services:" not in profile and time.monotonic() < deadline:
+        client.post("/pullRequest/create", json={
+            "pull_request_id": f"pr-prof-{i}", "pull_request_name": "Profiled", "author_id": "p0"
+        })
+        i += 1
+        profile = client.get("/admin/profile", headers=admin).text
+
+    stopped = client.post("/admin/profile/stop", headers=admin).json()
+    assert stopped["running"] is False and stopped["samples"] > 0
+
+    response = client.get("/admin/profile", headers=admin)
+    assert "profile.collapsed" in response.headers["content-disposition"]
+    lines = response.text.splitlines()
+    assert any("app.services:" in line for line in lines)
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert stack and int(count) > 0
+
+
+def test_fallback_candidate_pools(client: TestClient):
+    """Test that reassignments borrow from fallback teams in priority order"""
+    for team_name, members in (
+        ("backend", [("b1", True), ("b2", True)]),
+        ("infra", [("i1", False)]),
+        ("platform", [("p1", True), ("p2", True)])
+    ):
+        client.post("/team/add", json={
+            "team_name": team_name,
+            "members": [{"user_id": u, "username": u.upper(), "is_active": a} for u, a in members]
+        })
+
+    assert client.post("/team/setFallbacks", json={"team_name": "backend", "fallback_teams": ["backend"]}).status_code == 400
+    assert client.post("/team/setFallbacks", json={"team_name": "backend", "fallback_teams": ["missing"]}).status_code == 404
+    response = client.post("/team/setFallbacks", json={"team_name": "backend", "fallback_teams": ["infra", "platform"]})
+    assert response.status_code == 200
+    assert client.get("/team/fallbacks", params={"team_name": "backend"}).json()["fallback_teams"] == ["infra", "platform"]
+
+    # b2 is backend's only other member and infra has no one active: platform is next
+    pr = client.post("/pullRequest/create", json={"pull_request_id": "pr-fb-1", "pull_request_name": "FB", "author_id": "b1"}).json()
+    assert pr["assigned_reviewers"] == ["b2"]
+    response = client.post("/pullRequest/reassign", json={"pull_request_id": "pr-fb-1", "old_user_id": "b2"})
+    assert response.status_code == 200
+    borrowed = response.json()["replaced_by"]
+    assert borrowed in ("p1", "p2")
+
+    # The borrowed reviewer is replaced from their own team
+    response = client.post("/pullRequest/reassign", json={"pull_request_id": "pr-fb-1", "old_user_id": borrowed})
+    assert response.json()["replaced_by"] == ({"p1", "p2"} - {borrowed}).pop()
+
+    # Deactivating a team hands its reviews to the fallbacks
+    client.post("/pullRequest/create", json={"pull_request_id": "pr-fb-2", "pull_request_name": "FB", "author_id": "b1"})
+    response = client.post("/users/bulkDeactivate", json={"team_name": "backend"})
+    assert response.json()["reassigned_prs"] == 1
+    reviews = client.get("/users/getReview", params={"user_id": "b2"}).json()["pull_requests"]
+    assert [pr["pull_request_id"] for pr in reviews] == []
+
+    client.post("/team/setFallbacks", json={"team_name": "backend", "fallback_teams": []})
+    client.post("/users/setIsActive", json={"user_id": "b2", "is_active": True})
+    client.post("/users/setIsActive", json={"user_id": "b1", "is_active": True})
+    client.post("/pullRequest/create", json={"pull_request_id": "pr-fb-3", "pull_request_name": "FB", "author_id": "b1"})
+    response = client.post("/pullRequest/reassign", json={"pull_request_id": "pr-fb-3", "old_user_id": "b2"})
+    assert response.status_code == 409
+    assert response.json()["error"]["code"] == "NO_CANDIDATE"
+
+
+def test_idempotency_keys(client: TestClient, db_session, monkeypatch):
+    """Test that repeated writes with an Idempotency-Key replay the first response"""
+    from datetime import datetime, timedelta, timezone
+
+    from app import config, idempotency, schemas
+    from app.models import PullRequest
+
+    client.post("/team/add", json={
+        "team_name": "retried",
+        "members": [{"user_id": f"i{i}", "username": "I", "is_active": True} for i in range(6)]
+    })
+    create = {"pull_request_id": "pr-idem", "pull_request_name": "Idem", "author_id": "i0"}
+    first = client.post("/pullRequest/create", json=create, headers={"Idempotency-Key": "k-create"})
+    again = client.post("/pullRequest/create", json=create, headers={"Idempotency-Key": "k-create"})
+    assert first.status_code == again.status_code == 201
+    assert again.content == first.content and again.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+
+    # A retried reassign doesn't pick a second reviewer
+    reassign = {"pull_request_id": "pr-idem", "old_user_id": first.json()["assigned_reviewers"][0]}
+    first = client.post("/pullRequest/reassign", json=reassign, headers={"Idempotency-Key": "k-reassign"})
+    again = client.post("/pullRequest/reassign", json=reassign, headers={"Idempotency-Key": "k-reassign"})
+    assert first.status_code == 200 and again.json() == first.json()
+    reviewers = db_session.query(PullRequest).filter(PullRequest.pull_request_id == "pr-idem").one().assigned_reviewers
+    assert sorted(r.user_id for r in reviewers) == sorted(first.json()["pr"]["assigned_reviewers"])
+
+    # Errors are responses too; the same key with another request is refused
+    failed = client.post("/pullRequest/create", json=create, headers={"Idempotency-Key": "k-exists"})
+    assert failed.status_code == 409 and failed.json()["error"]["code"] == "PR_EXISTS"
+    assert client.post("/pullRequest/create", json=create, headers={"Idempotency-Key": "k-exists"}).content == failed.content
+    reused = client.post("/pullRequest/create", json={**create, "pull_request_id": "pr-other"}, headers={"Idempotency-Key": "k-create"})
+    assert reused.status_code == 400 and reused.json()["error"]["code"] == "IDEMPOTENCY_KEY_REUSED"
+
+    # A repeat of a request still running waits for it, then gives up
+    deactivate = schemas.BulkDeactivateRequest(team_name="retried")
+    fingerprint = idempotency.fingerprint("/users/bulkDeactivate", deactivate)
+    assert idempotency.claim(db_session, "k-running", fingerprint) is None
+    monkeypatch.setattr(config, "IDEMPOTENCY_WAIT_S", 0.05)
+    waiting = client.post("/users/bulkDeactivate", json={"team_name": "retried"}, headers={"Idempotency-Key": "k-running"})
+    assert waiting.status_code == 409 and waiting.json()["error"]["code"] == "IDEMPOTENCY_IN_PROGRESS"
+    idempotency.complete(db_session, "k-running", 200, b'{"reassigned_prs":0}')
+    done = client.post("/users/bulkDeactivate", json={"team_name": "retried"}, headers={"Idempotency-Key": "k-running"})
+    assert done.json() == {"reassigned_prs": 0}
+
+    # A first request that died without an answer loses the key once its lease runs out
+    died = datetime.now(timezone.utc) - timedelta(seconds=config.IDEMPOTENCY_LEASE_S + 1)
+    assert idempotency.claim(db_session, "k-died", fingerprint, now=died) is None
+    response = client.post("/users/bulkDeactivate", json={"team_name": "retried"}, headers={"Idempotency-Key": "k-died"})
+    assert response.status_code == 200 and "message" in response.json()
+
+    expired = datetime.now(timezone.utc) + timedelta(hours=config.IDEMPOTENCY_TTL_HOURS + 1)
+    assert idempotency.purge_expired(db_session, now=expired) == 5
+
+
+def test_queries_per_endpoint(client: TestClient, db_session, db_connection):
+    """Test how many statements each endpoint runs once the assignment index is warm"""
+    from sqlalchemy import event
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        # The test transaction's savepoints are not the endpoint's work
+        if not statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+            statements.append(statement)
+
+    client.post("/team/add", json={
+        "team_name": "counted",
+        "members": [{"user_id": f"q{i}", "username": "Q", "is_active": True} for i in range(5)]
+    })
+    client.post("/pullRequest/create", json={"pull_request_id": "pr-q-0", "pull_request_name": "Q", "author_id": "q0"})
+
+    def queries(method: str, url: str, **kwargs) -> int:
+        # Requests share the test session; in production each starts with an empty loader
+        db_session.info.pop("loader", None)
+        statements.clear()
+        response = getattr(client, method)(url, **kwargs)
+        assert response.status_code < 300, response.text
+        return len(statements)
+
+    event.listen(db_connection, "before_cursor_execute", count)
+    try:
+        # Members are looked up with one IN query, not one query each
+        assert queries("post", "/team/add", json={
+            "team_name": "recounted",
+            "members": [{"user_id": f"r{i}", "username": "R", "is_active": True} for i in range(5)]
+        }) == 11
+        assert queries("get", "/team/get", params={"team_name": "counted"}) == 1
+        assert queries("post", "/pullRequest/create", json={
+            "pull_request_id": "pr-q-1", "pull_request_name": "Q", "author_id": "q0"
+        }) == 9
+        pr = client.post("/pullRequest/create", json={
+            "pull_request_id": "pr-q-2", "pull_request_name": "Q", "author_id": "q0"
+        }).json()
+        assert queries("post", "/pullRequest/reassign", json={
+            "pull_request_id": "pr-q-2", "old_user_id": pr["assigned_reviewers"][0]
+        }) == 8
+        assert queries("post", "/pullRequest/merge", json={"pull_request_id": "pr-q-2"}) == 7
+        # Idempotent merge: the locked PR and its reload
+        assert queries("post", "/pullRequest/merge", json={"pull_request_id": "pr-q-2"}) == 2
+        assert queries("get", "/users/getReview", params={"user_id": "q1"}) == 1
+        assert queries("post", "/users/setIsActive", json={"user_id": "q4", "is_active": False}) == 6
+        assert queries("post", "/pullRequest/bulkMerge", json={"pull_request_ids": ["pr-q-0", "pr-q-1"]}) == 6
+    finally:
+        event.remove(db_connection, "before_cursor_execute", count)
@@ -0,0 +1,125 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import archive, services
+from app.cache import assignment_index
+from app.database import Base, get_db
+from app.exceptions import PRExistsError
+from app.main import app
+from app.models import ArchivedPullRequest, PullRequest, TeamStats, pr_reviewers
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """Eight PRs merged 40 days ago, one merged today, one open; small blocks"""
+    engine = create_engine(f"sqlite:///{tmp_path}/archive.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(archive, "BLOCK_RECORDS", 3)
+    monkeypatch.setattr(archive, "reader", archive.ArchiveReader(str(tmp_path / "segments")))
+    assignment_index.clear()
+
+    db = Session()
+    services.create_team(db, "old", [
+        {"user_id": f"a{i}", "username": f"A{i}", "is_active": True} for i in range(3)
+    ])
+    services.create_team(db, "new", [{"user_id": "n1", "username": "N1", "is_active": True}])
+    for i in range(10):
+        services.create_pull_request(db, f"pr-{i}", f"PR {i}", "a0")
+        if i < 9:
+            services.merge_pull_request(db, f"pr-{i}")
+    db.query(PullRequest).filter(PullRequest.pull_request_id.in_([f"pr-{i}" for i in range(8)])).update(
+        {PullRequest.merged_at: datetime.utcnow() - timedelta(days=40)}, synchronize_session=False
+    )
+    db.commit()
+    db.close()
+    try:
+        yield engine, Session, str(tmp_path / "segments")
+    finally:
+        engine.dispose()
+        assignment_index.clear()
+
+
+def test_archive_moves_old_merged_prs_to_segments(history):
+    """Test that old merged PRs leave the database and stay readable from segments"""
+    engine, Session, directory = history
+    counts = archive.archive(engine, older_than_days=30, directory=directory, batch_size=3)
+    assert counts["pull_requests"] == 8 and counts["segments"] == 1 and counts["pr_reviewers"] == 16
+
+    db = Session()
+    assert sorted(pr_id for (pr_id,) in db.query(PullRequest.pull_request_id)) == ["pr-8", "pr-9"]
+    archived_ids = [f"pr-{i}" for i in range(8)]
+    assert db.query(pr_reviewers).count() == 4
+    (partition,) = os.listdir(directory)
+    assert partition == (datetime.utcnow() - timedelta(days=40)).strftime("%Y-%m-%d")
+    files = sorted(os.listdir(os.path.join(directory, partition)))
+    assert [name.rsplit(".", 1)[1] for name in files] == ["idx", "seg"]
+
+    records = list(archive.reader.iter_records())
+    assert [r["pull_request_id"] for r in records] == [f"pr-{i}" for i in range(8)]
+    assert all(len(r["reviewers"]) == 2 and r["status"] == "MERGED" for r in records)
+    assert len(archive.reader.segments()[0].index["blocks"]) == 3
+
+    # getReview reads archived PRs only when asked
+    app.dependency_overrides[get_db] = lambda: db
+    try:
+        client = TestClient(app)
+        live = client.get("/users/getReview", params={"user_id": "a1"}).json()["pull_requests"]
+        full = client.get("/users/getReview", params={"user_id": "a1", "include_archived": True}).json()
+        # /stats counts the rows left in the database, the team counters all PRs ever merged
+        stats = client.get("/stats", params={"fields": ["total_prs", "merged_prs"]}).json()
+        (old,) = client.get("/stats/teams", params={"team_name": "old"}).json()["teams"]
+    finally:
+        app.dependency_overrides.clear()
+    archived = [r["pull_request_id"] for r in records if "a1" in r["reviewers"]]
+    assert [pr["pull_request_id"] for pr in full["pull_requests"]] == archived + [pr["pull_request_id"] for pr in live]
+    assert all(pr["status"] == "MERGED" for pr in full["pull_requests"][:len(archived)])
+    assert stats == {"total_prs": 2, "merged_prs": 1}
+    assert (old["open_prs"], old["merged_prs"]) == (1, 9)
+
+    # An archived id stays taken: it is not created again, alone or in a batch
+    with pytest.raises(PRExistsError):
+        services.create_pull_request(db, "pr-0", "Again", "a0")
+    db.rollback()
+    (result,) = services.create_pull_requests(db, [("pr-1", "Again", "a0")])
+    assert isinstance(result, PRExistsError)
+    assert sorted(pr_id for (pr_id,) in db.query(ArchivedPullRequest.pull_request_id)) == archived_ids
+
+    # Moving the author carries archived PRs in the team counters as well
+    services.move_team_members(db, "new", ["a0"])
+    stats = {row.team_name: (row.open_prs, row.merged_prs) for row in db.query(TeamStats)}
+    assert stats["new"] == (1, 9) and stats["old"] == (0, 0)
+    db.close()
+
+    # Nothing left to archive: a second run writes no segment
+    assert archive.archive(engine, older_than_days=30, directory=directory)["segments"] == 0
+
+
+def test_interrupted_archive_is_rolled_forward(history, monkeypatch):
+    """Test that segments written by a run that died before deleting rows are completed, not duplicated"""
+    engine, Session, directory = history
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("killed")
+
+    delete_rows = archive._delete_rows
+    monkeypatch.setattr(archive, "_delete_rows", crash)
+    with pytest.raises(RuntimeError):
+        archive.archive(engine, older_than_days=30, directory=directory)
+    # Written but not published: readers don't see it, the rows are still there
+    assert archive.reader.segments() == []
+    db = Session()
+    assert db.query(PullRequest).count() == 10
+
+    monkeypatch.setattr(archive, "_delete_rows", delete_rows)
+    counts = archive.archive(engine, older_than_days=30, directory=directory)
+    assert counts["recovered_segments"] == 1 and counts["segments"] == 0
+    assert db.query(PullRequest).count() == 2
+    assert len(list(archive.reader.iter_records())) == 8
+    assert db.query(ArchivedPullRequest).count() == 8
+    db.close()
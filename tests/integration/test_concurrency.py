@@ -0,0 +1,80 @@
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app import services
+from app.cache import assignment_index
+from app.database import Base
+from app.exceptions import ReviewerNotAssignedError
+from app.models import PullRequest, pr_reviewers
+
+THREADS = 8
+REASSIGNS_PER_THREAD = 25
+PRS = 6
+
+
+def test_concurrent_reassigns_stay_consistent(tmp_path):
+    """Test many simultaneous reassigns on a few PRs: no errors, no duplicate or lost reviewers"""
+    engine = create_engine(f"sqlite:///{tmp_path}/concurrency.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    assignment_index.clear()
+
+    db = Session()
+    services.create_team(db, "hot", [
+        {"user_id": f"h{i}", "username": f"Hot {i}", "is_active": True} for i in range(12)
+    ])
+    pull_request_ids = [f"pr-hot-{i}" for i in range(PRS)]
+    for pull_request_id in pull_request_ids:
+        services.create_pull_request(db, pull_request_id, "Hot", "h0")
+    db.close()
+
+    def worker(seed: int) -> Counter:
+        rng = random.Random(seed)
+        outcomes = Counter()
+        session = Session()
+        try:
+            for _ in range(REASSIGNS_PER_THREAD):
+                pull_request_id = rng.choice(pull_request_ids)
+                reviewers = services._load_prs_with_reviewers(session, [pull_request_id])[pull_request_id].assigned_reviewers
+                old_user_id = rng.choice(reviewers).user_id
+                session.rollback()
+                try:
+                    services.reassign_reviewer(session, pull_request_id, old_user_id)
+                    outcomes["reassigned"] += 1
+                except ReviewerNotAssignedError:
+                    # Someone else replaced that reviewer first: a correct, reported outcome
+                    session.rollback()
+                    outcomes["stale"] += 1
+        finally:
+            session.close()
+        return outcomes
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=THREADS) as executor:
+        outcomes = sum((f.result() for f in [executor.submit(worker, seed) for seed in range(THREADS)]), Counter())
+    elapsed = time.monotonic() - started
+
+    assert outcomes["reassigned"] + outcomes["stale"] == THREADS * REASSIGNS_PER_THREAD
+    assert outcomes["reassigned"] > THREADS * REASSIGNS_PER_THREAD // 2
+    assert elapsed < 30
+
+    db = Session()
+    try:
+        for pull_request_id in pull_request_ids:
+            reviewers = [r.user_id for r in db.query(PullRequest).filter(
+                PullRequest.pull_request_id == pull_request_id
+            ).one().assigned_reviewers]
+            assert len(reviewers) == 2 and len(set(reviewers)) == 2 and "h0" not in reviewers
+
+        # Every committed reassign was applied to the in-memory counts exactly once
+        counts = dict(db.query(pr_reviewers.c.user_pk, func.count()).group_by(pr_reviewers.c.user_pk).all())
+        for record in assignment_index.team_members(db, "hot"):
+            assert record.open_reviews == counts.get(record.pk, 0)
+    finally:
+        db.close()
+        assignment_index.clear()
@@ -0,0 +1,185 @@
+import json
+import multiprocessing
+import time
+import uuid
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import services
+from app.cache import assignment_index
+from app.database import Base
+from app.invalidation import MAX_EVENT_BYTES, LocalSocketTransport, bus
+
+WORKERS = 3
+
+
+def _worker(database_url: str, socket_dir: str, conn):
+    """Stand-in for a uvicorn worker: own engine, own caches, joined to the bus"""
+    engine = create_engine(database_url)
+    Session = sessionmaker(bind=engine)
+    bus.start(LocalSocketTransport(socket_dir))
+    conn.send("ready")
+    while True:
+        command, team_name = conn.recv()
+        if command == "stop":
+            break
+        db = Session()
+        try:
+            conn.send(tuple(assignment_index.active_candidates(db, team_name)))
+        finally:
+            db.close()
+    bus.stop()
+
+
+def _rosters(pipes, team_name):
+    for pipe in pipes:
+        pipe.send(("roster", team_name))
+    return [pipe.recv() for pipe in pipes]
+
+
+def _spawn_workers(database_url: str, socket_dir: str):
+    ctx = multiprocessing.get_context("spawn")
+    pipes, processes = [], []
+    for _ in range(WORKERS):
+        parent, child = ctx.Pipe()
+        process = ctx.Process(target=_worker, args=(database_url, socket_dir, child), daemon=True)
+        process.start()
+        pipes.append(parent)
+        processes.append(process)
+    return pipes, processes
+
+
+def _stop_workers(pipes, processes):
+    for pipe in pipes:
+        pipe.send(("stop", None))
+    for process in processes:
+        process.join(timeout=5)
+
+
+def _wait_for_rosters(pipes, team_name, expected):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        if _rosters(pipes, team_name) == [expected] * WORKERS:
+            break
+        time.sleep(0.05)
+    assert _rosters(pipes, team_name) == [expected] * WORKERS
+
+
+def test_roster_caches_stay_coherent_across_workers(tmp_path):
+    """Test that a write in one process invalidates cached rosters in every worker"""
+    database_url = f"sqlite:///{tmp_path}/workers.db"
+    socket_dir = str(tmp_path / "bus")
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+
+    services.create_team(db, "platform", [
+        {"user_id": "w1", "username": "One", "is_active": True},
+        {"user_id": "w2", "username": "Two", "is_active": True},
+        {"user_id": "w3", "username": "Three", "is_active": True},
+    ])
+
+    pipes, processes = _spawn_workers(database_url, socket_dir)
+    bus.start(LocalSocketTransport(socket_dir))
+    try:
+        for pipe in pipes:
+            assert pipe.recv() == "ready"
+
+        # Warm every worker's cache
+        assert _rosters(pipes, "platform") == [("w1", "w2", "w3")] * WORKERS
+
+        services.set_user_active(db, "w2", False)
+        _wait_for_rosters(pipes, "platform", ("w1", "w3"))
+    finally:
+        bus.stop()
+        _stop_workers(pipes, processes)
+        db.close()
+        assignment_index.clear()
+
+
+class RecordingTransport(LocalSocketTransport):
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.sent: list[str] = []
+
+    def send(self, payload: str):
+        self.sent.append(payload)
+        super().send(payload)
+
+
+def test_large_member_changes_fit_the_event_limit(tmp_path):
+    """Test that adding many members with long ids is published in events Postgres accepts"""
+    database_url = f"sqlite:///{tmp_path}/workers.db"
+    socket_dir = str(tmp_path / "bus")
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    services.create_team(db, "platform", [{"user_id": "w1", "username": "One", "is_active": True}])
+
+    pipes, processes = _spawn_workers(database_url, socket_dir)
+    transport = RecordingTransport(socket_dir)
+    bus.start(transport)
+    try:
+        for pipe in pipes:
+            assert pipe.recv() == "ready"
+        assert _rosters(pipes, "platform") == [("w1",)] * WORKERS
+
+        new_ids = [f"{uuid.UUID(int=i)}@example.com" for i in range(300)]
+        services.add_team_members(db, "platform", [
+            {"user_id": user_id, "username": "New", "is_active": True} for user_id in new_ids
+        ])
+        events = [json.loads(payload) for payload in transport.sent]
+        assert len(events) > 1 and all(event["kind"] == "member" and event["key"] for event in events)
+        assert max(len(payload.encode()) for payload in transport.sent) <= MAX_EVENT_BYTES
+        _wait_for_rosters(pipes, "platform", tuple(sorted(["w1", *new_ids])))
+    finally:
+        bus.stop()
+        _stop_workers(pipes, processes)
+        db.close()
+        assignment_index.clear()
+
+
+class FlakyTransport:
+    def __init__(self):
+        self.broken = False
+        self.sent: list[dict] = []
+
+    def start(self, deliver):
+        pass
+
+    def stop(self):
+        pass
+
+    def send(self, payload: str):
+        if self.broken:
+            raise OSError("connection lost")
+        self.sent.append(json.loads(payload))
+
+
+def test_failed_or_oversized_events_flush_peers(monkeypatch):
+    """Test that an event peers cannot get is replaced by a flush instead of being dropped"""
+    from app import invalidation
+
+    monkeypatch.setattr(invalidation, "FLUSH_RETRY_S", 0.01)
+    local = invalidation.InvalidationBus()
+    received = []
+    local.subscribe("review", received.append)
+    transport = FlakyTransport()
+    local.start(transport)
+    try:
+        # Too long for NOTIFY: applied locally, peers drop everything of the kind
+        local.publish("review", "x" * MAX_EVENT_BYTES)
+        assert received == ["x" * MAX_EVENT_BYTES]
+        assert transport.sent[-1]["kind"] == "review" and transport.sent[-1]["key"] is None
+
+        # Lost while the transport is down: FLUSH_ALL once it is back, without waiting for a write
+        transport.broken = True
+        local.publish("team", "platform")
+        transport.broken = False
+        deadline = time.monotonic() + 5
+        while not transport.sent[1:] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [event["kind"] for event in transport.sent[1:]] == [invalidation.FLUSH_ALL]
+    finally:
+        local.stop()
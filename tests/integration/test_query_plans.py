@@ -0,0 +1,95 @@
+import os
+import re
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app import seed, services
+from app.assignment_index import AssignmentIndex
+from app.cache import assignment_index
+from app.database import Base
+
+# Plans are checked on a seeded SQLite file; point this at a disposable Postgres
+# database to check its plans as well (the contents are replaced)
+PLAN_TEST_DATABASE_URL = os.getenv("PLAN_TEST_DATABASE_URL")
+BIG_TABLES = {"users", "pull_requests", "pr_reviewers"}
+
+# (name, service call, big tables it may scan in full)
+HOT_QUERIES = [
+    ("candidate selection", lambda db: services.assign_reviewers(db, "u-3-1"), ()),
+    ("replacement pool", lambda db: AssignmentIndex().candidate_pool(db, "team-3"), ()),
+    ("reviewer history", lambda db: services.get_user_review_rows(db, "u-3-1"), ()),
+    ("open reviews of users", lambda db: services._open_review_items(db, [1, 2, 3]), ()),
+    # Startup loads every user by design, but open-review counts must start from open PRs
+    ("assignment index rebuild", lambda db: AssignmentIndex().rebuild(db), ("users",)),
+    ("team workload", lambda db: services.get_reviewer_workload(db, "team-3"), ()),
+    ("org workload", lambda db: services.get_reviewer_workload(db), ("users",)),
+    ("team statistics", lambda db: services.get_team_statistics(db, "team-3"), ()),
+    ("org team statistics", lambda db: services.get_team_statistics(db), ("users",)),
+    # /stats counts every user; PR counts must come from the status index
+    ("statistics", lambda db: services.get_statistics(db, include_assignments=False), ("users",)),
+    # reviewer_assignments counts every assignment by design
+    ("statistics with assignments", lambda db: services.get_statistics(db), ("users", "pr_reviewers")),
+]
+
+
+@pytest.fixture(scope="module")
+def seeded_engine(tmp_path_factory):
+    url = PLAN_TEST_DATABASE_URL or f"sqlite:///{tmp_path_factory.mktemp('plans')}/plans.db"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    seed.seed(engine, teams=20, prs=20_000, truncate=True)
+    yield engine
+    engine.dispose()
+
+
+def _postgres_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _postgres_nodes(child)
+
+
+def full_scans(conn, statement: str, parameters) -> set[str]:
+    """Big tables the statement's plan reads in full (table or whole-index scans)"""
+    if conn.dialect.name == "postgresql":
+        # Seq scans only remain where no index can serve the query
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        return {
+            node["Relation Name"] for node in _postgres_nodes(plan[0]["Plan"])
+            if node.get("Relation Name") in BIG_TABLES and (
+                node["Node Type"] == "Seq Scan"
+                or node["Node Type"] in ("Index Scan", "Index Only Scan") and "Index Cond" not in node
+            )
+        }
+    rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    # "SCAN t", "SCAN t USING [COVERING] INDEX i" are full scans; "SEARCH t ..." is not
+    return {match.group(1) for *_, detail in rows if (match := re.match(r"SCAN (\w+)", detail))} & BIG_TABLES
+
+
+@pytest.mark.parametrize("name, call, allowed", HOT_QUERIES, ids=[name for name, _, _ in HOT_QUERIES])
+def test_hot_query_plans(seeded_engine, name, call, allowed):
+    """Test that hot service queries use indexes instead of scanning the big tables"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    db = sessionmaker(bind=seeded_engine)()
+    assignment_index.clear()
+    event.listen(seeded_engine, "before_cursor_execute", capture)
+    try:
+        call(db)
+    finally:
+        event.remove(seeded_engine, "before_cursor_execute", capture)
+        db.rollback()
+        db.close()
+        assignment_index.clear()
+
+    assert statements
+    with seeded_engine.connect() as conn:
+        for statement, parameters in statements:
+            scans = full_scans(conn, statement, parameters) - set(allowed)
+            assert not scans, f"{name}: full scan of {sorted(scans)} in\n{statement}"
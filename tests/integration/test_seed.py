@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app import rollups, seed, services
+from app.database import Base
+from app.models import PullRequest, StatsRollup, TeamFallback, TeamStats, User, pr_reviewers
+
+
+def test_seeded_data_matches_incremental_state(tmp_path):
+    """Test that seeded counters and rollups agree with the rows and with later writes"""
+    engine = create_engine(f"sqlite:///{tmp_path}/seed.db")
+    Base.metadata.create_all(bind=engine)
+    counts = seed.seed(engine, teams=4, min_team_size=2, max_team_size=6, prs=600,
+                       history_days=1, open_ratio=0.25, batch_size=100)
+    db = sessionmaker(bind=engine)()
+
+    assert db.query(PullRequest).count() == counts["pull_requests"] == 600
+    assert db.query(pr_reviewers).count() == counts["pr_reviewers"]
+    open_prs = db.query(PullRequest).filter(PullRequest.status == "OPEN").count()
+
+    # team_stats equals what the incremental paths would have counted
+    counted = {
+        (team_name, status): count for team_name, status, count in db.query(
+            User.team_name, PullRequest.status, func.count()
+        ).join(PullRequest, PullRequest.author_id == User.user_id).group_by(User.team_name, PullRequest.status)
+    }
+    for row in db.query(TeamStats):
+        assert row.open_prs == counted.get((row.team_name, "OPEN"), 0)
+        assert row.merged_prs == counted.get((row.team_name, "MERGED"), 0)
+
+    # Open PRs wait on active reviewers other than their author
+    inactive_or_author = db.query(pr_reviewers).join(
+        PullRequest, PullRequest.id == pr_reviewers.c.pull_request_pk
+    ).join(User, User.id == pr_reviewers.c.user_pk).filter(
+        PullRequest.status == "OPEN", (User.is_active.is_(False)) | (User.user_id == PullRequest.author_id)
+    ).count()
+    assert inactive_or_author == 0
+
+    series = rollups.get_timeseries(db, "hour", start=datetime.now(timezone.utc) - timedelta(days=2))
+    assert sum(point["opened"] for point in series["points"]) == 600
+    assert sum(point["merged"] for point in series["points"]) == 600 - open_prs
+    assert series["time_to_merge_seconds"]["p50"] > 0
+
+    # A write through the service lands in the seeded bucket instead of a duplicate
+    author = db.query(User).filter(User.is_active.is_(True)).first()
+    services.create_pull_request(db, "pr-after-seed", "After seed", author.user_id)
+    duplicates = db.query(StatsRollup.period, StatsRollup.team_name, StatsRollup.bucket_start).group_by(
+        StatsRollup.period, StatsRollup.team_name, StatsRollup.bucket_start
+    ).having(func.count() > 1).count()
+    assert duplicates == 0
+    assert db.query(func.sum(StatsRollup.opened)).filter(
+        StatsRollup.period == "day", StatsRollup.team_name.in_(rollups.ORG_SHARD_NAMES)
+    ).scalar() == 601
+    db.close()
+
+    with pytest.raises(SystemExit):
+        seed.seed(engine, teams=1, prs=1)
+
+    db = sessionmaker(bind=engine)()
+    services.set_team_fallbacks(db, "team-0", ["team-1"])
+    db.close()
+    assert seed.seed(engine, teams=1, min_team_size=3, max_team_size=3, prs=5, truncate=True)["users"] == 3
+    # Every table is emptied: nothing of the previous organisation re-attaches to the new
+    # team-N names, no stored response is replayed for a reused PR id
+    assert set(seed.TABLES) == set(Base.metadata.tables)
+    db = sessionmaker(bind=engine)()
+    assert db.query(TeamFallback).count() == 0
+    db.close()